@@ -52,6 +52,13 @@ class Roleable(object):
       'access_control_list': lambda obj: obj.acl_json,
   }
 
+  _projection_loads = {
+      'access_control_list': (
+          '_access_control_list.ac_role',
+          '_access_control_list.access_control_people.person',
+      ),
+  }
+
   def __init__(self, *args, **kwargs):
     for ac_role in role.get_ac_roles_for(self.type).values():
       AccessControlList(
@@ -139,29 +146,6 @@ class Roleable(object):
         ),
     )
 
-  @classmethod
-  def indexed_query(cls):
-    """Query used by the indexer"""
-    query = super(Roleable, cls).indexed_query()
-    return query.options(
-        orm.subqueryload(
-            '_access_control_list'
-        ).joinedload(
-            "ac_role"
-        ).load_only(
-            "id", "name", "object_type", "internal"
-        ),
-        orm.subqueryload(
-            '_access_control_list'
-        ).joinedload(
-            "access_control_people"
-        ).joinedload(
-            "person"
-        ).load_only(
-            "id", "name", "email"
-        ),
-    )
-
   @property
   def acl_json(self):
     """Get json representation of access_control_list.
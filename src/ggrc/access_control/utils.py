@@ -13,6 +13,7 @@ import logging
 import sqlalchemy as sa
 
 from ggrc import db
+from ggrc.cache import utils as cache_utils
 from ggrc.models import all_models
 from ggrc import utils
 
@@ -89,3 +90,8 @@ def insert_select_acls(select_statement):
         logger.exception(error)
       else:
         inserted_successfully = True
+
+  # people of the base ACL entries get access to the propagated objects
+  cache_utils.track_propagated_acls(
+      (record.base_id, record.object_type) for record in to_insert
+  )
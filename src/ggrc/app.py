@@ -9,7 +9,6 @@ import time
 
 from logging import getLogger
 from logging.config import dictConfig as setup_logging
-import sqlalchemy
 
 import flask
 from flask import Flask
@@ -80,16 +79,8 @@ def setup_user_timezone_offset():
 def check_if_under_maintenance():
   """Check if the site is in maintenance mode."""
   with benchmark('Check for maintenance'):
-    from ggrc.models.maintenance import Maintenance
-    try:
-      db_row = db.session.query(Maintenance).get(1)
-    except sqlalchemy.exc.ProgrammingError as error:
-      if re.search(r"\(1146, \"Table '.+' doesn't exist\"\)$", error.message):
-        db_row = None
-      else:
-        raise
-    condition = (db_row and
-                 db_row.under_maintenance and
+    from ggrc.utils import maintenance_state
+    condition = (maintenance_state.is_under_maintenance() and
                  request.path != url_for('maintenance_') and
                  request.path != '/_ah/start')
     if condition:
@@ -288,6 +279,21 @@ def register_indexing():
     return response
 
 
+def register_revision_content_storing():
+  """Register after request hook for storing populated revision contents"""
+  from ggrc.models import revision_content
+
+  # pylint: disable=unused-variable
+  @app.after_request
+  def store_revision_contents(response):
+    """Store populated revision contents built during the request"""
+    if response.status_code < 400:
+      revision_content.store_pending()
+    else:
+      revision_content.discard_pending()
+    return response
+
+
 setup_error_handlers(app)
 init_models(app)
 configure_flask_login(app)
@@ -300,6 +306,7 @@ init_permissions_provider()
 init_extra_listeners()
 notifications.register_notification_listeners()
 register_indexing()
+register_revision_content_storing()
 
 _enable_debug_toolbar()
 _display_sql_queries()
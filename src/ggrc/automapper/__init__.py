@@ -3,6 +3,7 @@
 
 """Automapper generator."""
 
+import collections
 from datetime import datetime
 import logging
 
@@ -48,6 +49,10 @@ class AutomapperGenerator(object):
     self.auto_mappings = set()
     self.automapping_ids = set()
     self.related_cache = RelationshipsCache()
+    # Automappings generated for parent relationships and not inserted yet
+    self.generated = []
+    self.pending = collections.defaultdict(set)
+    self.update_permissions = {}
 
   def related(self, obj):
     """Return obj's relationship stubs"""
@@ -58,16 +63,61 @@ class AutomapperGenerator(object):
     # results in a few steps. This drastically reduces number of queries.
     stubs = {s for rel in self.queue for s in rel}
     stubs.add(obj)
-    self.related_cache.populate_cache(stubs)
+    self._populate_cache(stubs)
 
     return self.related_cache.cache[obj]
 
+  def _populate_cache(self, stubs):
+    """Fetch neighborhood of stubs including not inserted automappings."""
+    stubs = {stub for stub in stubs if stub not in self.related_cache.cache}
+    if not stubs:
+      return
+    self.related_cache.populate_cache(stubs)
+    for stub in stubs:
+      self.related_cache.cache[stub].update(self.pending[stub])
+    self._prefetch_permissions(stubs.union(*(
+        self.related_cache.cache[stub] for stub in stubs
+    )))
+
+  def _prefetch_permissions(self, stubs):
+    """Check update permissions of all given objects at once."""
+    stubs = [stub for stub in stubs if stub not in self.update_permissions]
+    if stubs:
+      self.update_permissions.update(
+          permissions.is_allowed_bulk("update", stubs))
+
+  def _is_allowed_update(self, stub):
+    """Check update permission of an object once per generator."""
+    if stub not in self.update_permissions:
+      self._prefetch_permissions([stub])
+    return self.update_permissions[stub]
+
   @staticmethod
   def order(src, dst):
     return (src, dst) if src < dst else (dst, src)
 
+  def generate_all(self, relationships):
+    """Generate and insert automappings for all given relationships.
+
+    Neighborhoods of all relationships are fetched at once and automappings
+    of all relationships are inserted together by `flush`.
+    """
+    with benchmark("Automapping prefetch relationships"):
+      self._populate_cache({
+          stub for relationship in relationships
+          for stub in (Stub.from_source(relationship),
+                       Stub.from_destination(relationship))
+      })
+    with benchmark("Automapping generate_automappings"):
+      for relationship in relationships:
+        self.generate_automappings(relationship)
+    self.flush()
+
   def generate_automappings(self, relationship):
-    """Generate Automappings for a given relationship"""
+    """Generate Automappings for a given relationship.
+
+    Generated automappings are inserted into the database by `flush`.
+    """
     self.auto_mappings = set()
 
     # initial relationship is special since it is already created and
@@ -86,8 +136,8 @@ class AutomapperGenerator(object):
         # Mapping between some objects should be created even if there is no
         # permission to edit (+map) this objects. Thus permissions check for
         # them should be skipped.
-        if not (permissions.is_allowed_update(src.type, src.id, None) and
-                permissions.is_allowed_update(dst.type, dst.id, None)):
+        if not (self._is_allowed_update(src) and
+                self._is_allowed_update(dst)):
           continue
 
       created = self._ensure_relationship(src, dst)
@@ -99,29 +149,52 @@ class AutomapperGenerator(object):
       self._step(src, dst)
       self._step(dst, src)
 
-    if len(self.auto_mappings) <= self.COUNT_LIMIT:
-      self._flush(relationship)
-    else:
+    if len(self.auto_mappings) > self.COUNT_LIMIT:
       logger.error("Automapping limit exceeded: limit=%s, count=%s",
                    self.COUNT_LIMIT, len(self.auto_mappings))
+    elif self.auto_mappings:
+      self.generated.append((relationship, self.auto_mappings))
+      for src, dst in self.auto_mappings:
+        self.pending[src].add(dst)
+        self.pending[dst].add(src)
 
-  def _flush(self, parent_relationship):
-    """Manually INSERT generated automappings."""
-    if not self.auto_mappings:
+  def _insert_automappings(self):
+    """Insert Automapping rows for all parent relationships.
+
+    Returns:
+      dict with automapping ids by parent relationship ids.
+    """
+    parents = [relationship for relationship, _ in self.generated]
+    result = db.session.execute(
+        Automapping.__table__.insert().values([{
+            "relationship_id": parent.id,
+            "source_id": parent.source_id,
+            "source_type": parent.source_type,
+            "destination_id": parent.destination_id,
+            "destination_type": parent.destination_type,
+        } for parent in parents])
+    )
+    # Ids of rows inserted by a single statement are not less than the id of
+    # the first row, which limits the lookup to the newest rows.
+    first_id = result.inserted_primary_key[0]
+    return dict(db.session.query(
+        Automapping.relationship_id, Automapping.id,
+    ).filter(
+        Automapping.id >= first_id,
+        Automapping.relationship_id.in_([parent.id for parent in parents]),
+    ))
+
+  def flush(self):
+    """Manually INSERT generated automappings.
+
+    Automapping rows are inserted with a single statement, relationships are
+    inserted with one statement per parent relationship.
+    """
+    if not self.generated:
       return
     with benchmark("Automapping flush"):
       current_user_id = login.get_current_user_id()
-      automapping_result = db.session.execute(
-          Automapping.__table__.insert().values(
-              relationship_id=parent_relationship.id,
-              source_id=parent_relationship.source_id,
-              source_type=parent_relationship.source_type,
-              destination_id=parent_relationship.destination_id,
-              destination_type=parent_relationship.destination_type,
-          )
-      )
-      automapping_id = automapping_result.inserted_primary_key[0]
-      self.automapping_ids.add(automapping_id)
+      automapping_ids = self._insert_automappings()
       now = datetime.utcnow()
       # We are doing an INSERT IGNORE INTO here to mitigate a race condition
       # that happens when multiple simultaneous requests create the same
@@ -129,26 +202,33 @@ class AutomapperGenerator(object):
       # it means that the mapping was already created by another request
       # and we can safely ignore it.
       inserter = Relationship.__table__.insert().prefix_with("IGNORE")
-      original = self.order(Stub.from_source(parent_relationship),
-                            Stub.from_destination(parent_relationship))
-      db.session.execute(inserter.values([{
-          "id": None,
-          "modified_by_id": current_user_id,
-          "created_at": now,
-          "updated_at": now,
-          "source_id": src.id,
-          "source_type": src.type,
-          "destination_id": dst.id,
-          "destination_type": dst.type,
-          "context_id": None,
-          "status": None,
-          "parent_id": parent_relationship.id,
-          "automapping_id": automapping_id,
-          "is_external": False}
-          for src, dst in self.auto_mappings
-          if (src, dst) != original]))  # (src, dst) is sorted
-
-      self._set_audit_id_for_issues(automapping_id)
+      for parent_relationship, auto_mappings in self.generated:
+        automapping_id = automapping_ids[parent_relationship.id]
+        original = self.order(Stub.from_source(parent_relationship),
+                              Stub.from_destination(parent_relationship))
+        rows = [{
+            "id": None,
+            "modified_by_id": current_user_id,
+            "created_at": now,
+            "updated_at": now,
+            "source_id": src.id,
+            "source_type": src.type,
+            "destination_id": dst.id,
+            "destination_type": dst.type,
+            "context_id": None,
+            "status": None,
+            "parent_id": parent_relationship.id,
+            "automapping_id": automapping_id,
+            "is_external": False}
+            for src, dst in auto_mappings
+            if (src, dst) != original]  # (src, dst) is sorted
+        if rows:
+          db.session.execute(inserter.values(rows))
+      self.automapping_ids.update(automapping_ids.itervalues())
+      self.generated = []
+      self.pending.clear()
+
+      self._set_audit_id_for_issues(automapping_ids.values())
 
       cache = Cache.get_cache(create=True)
       if cache:
@@ -157,8 +237,8 @@ class AutomapperGenerator(object):
         # will be created.
         cache.new.update(
             (relationship, relationship.log_json())
-            for relationship in Relationship.query.filter_by(
-                automapping_id=automapping_id,
+            for relationship in Relationship.query.filter(
+                Relationship.automapping_id.in_(automapping_ids.values()),
             )
         )
 
@@ -177,7 +257,7 @@ class AutomapperGenerator(object):
     acl.add_relationships(relationship_ids)
 
   @staticmethod
-  def _set_audit_id_for_issues(automapping_id):
+  def _set_audit_id_for_issues(automapping_ids):
     """Set audit_id and context_id in automapped Issues."""
     iss, rel, aud = Issue.__table__, Relationship.__table__, Audit.__table__
     db.session.execute(
@@ -188,7 +268,7 @@ class AutomapperGenerator(object):
         })
         .where(
             sa.and_(
-                rel.c.automapping_id == automapping_id,
+                rel.c.automapping_id.in_(automapping_ids),
                 rel.c.source_type == Audit.__name__,
                 rel.c.source_id == aud.c.id,
                 rel.c.destination_type == Issue.__name__,
@@ -264,9 +344,7 @@ def register_automapping_listeners():
         del flask.g.referenced_object_stubs
       if hasattr(flask.g, "_request_permissions"):
         del flask.g._request_permissions
-      with benchmark("Automapping generate_automappings"):
-        for obj in relationships:
-          automapper.generate_automappings(obj)
+      automapper.generate_all(relationships)
       automapper.propagate_acl()
       if referenced_objects:
         flask.g.referenced_object_stubs = referenced_objects
@@ -74,6 +74,8 @@ def get_db():  # noqa
         del flask.g.user_creator_roles_cache
       from ggrc.models.hooks import acl
       acl.after_commit()
+      from ggrc.cache import utils as cache_utils
+      cache_utils.clear_changed_permissions()
 
   database.session.post_commit_hooks = post_commit_hooks
   database.session.pre_commit_hooks = pre_commit_hooks
@@ -0,0 +1,159 @@
+# Copyright (C) 2019 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""Batched access to REST resources cached in memcache.
+
+Resources are stored in memcache under `collection:{table}:{id}` keys. A
+collection request reads all its keys with a single get_multi call and adds
+missing resources with a single add_multi call.
+
+Recently used resources are also kept in a small per-process LRU cache for
+RESOURCE_CACHE_L1_TTL seconds. Keys dropped from memcache by this process are
+dropped from the LRU cache as well, so other instances see a change after at
+most RESOURCE_CACHE_L1_TTL seconds. DeleteOp entries of ongoing commits are
+checked for LRU cache hits too, so a resource being changed is never served
+from the LRU cache.
+"""
+
+import collections
+import logging
+import threading
+import time
+
+from ggrc import settings
+
+
+logger = logging.getLogger(__name__)
+
+DELETE_OP_PREFIX = "DeleteOp:"
+
+
+class LRUCache(object):
+  """Least recently used cache with expiring entries.
+
+  The cache is shared by all threads of the process, so all access to the
+  entries is guarded by a lock.
+  """
+
+  def __init__(self, size, ttl):
+    self.size = size
+    self.ttl = ttl
+    self._entries = collections.OrderedDict()
+    self._lock = threading.Lock()
+
+  @property
+  def active(self):
+    return self.size > 0 and self.ttl > 0
+
+  def get(self, key):
+    """Get value of a key that has not expired yet or None."""
+    with self._lock:
+      entry = self._entries.pop(key, None)
+      if entry is None:
+        return None
+      expires_at, value = entry
+      if expires_at <= time.time():
+        return None
+      self._entries[key] = entry
+      return value
+
+  def set(self, key, value):
+    """Store value evicting the least recently used keys."""
+    if not self.active:
+      return
+    with self._lock:
+      self._entries.pop(key, None)
+      self._entries[key] = (time.time() + self.ttl, value)
+      while len(self._entries) > self.size:
+        self._entries.popitem(last=False)
+
+  def delete(self, key):
+    with self._lock:
+      self._entries.pop(key, None)
+
+  def clear(self):
+    with self._lock:
+      self._entries.clear()
+
+
+_L1_CACHE = LRUCache(settings.RESOURCE_CACHE_L1_SIZE,
+                     settings.RESOURCE_CACHE_L1_TTL)
+
+
+def forget(keys):
+  """Drop keys deleted from memcache from the per-process cache."""
+  for key in keys:
+    _L1_CACHE.delete(key)
+
+
+def forget_all():
+  """Drop all entries of the per-process cache after memcache flush."""
+  _L1_CACHE.clear()
+
+
+class ResourceCache(object):
+  """Batched resource cache access of a single request with metrics."""
+
+  def __init__(self, memcache_client):
+    self.memcache_client = memcache_client
+    self.hits = 0
+    self.misses = 0
+    self.keys = 0
+    self.io_time = 0.0
+
+  def get_multi(self, keys):
+    """Get cached resources.
+
+    Returns:
+      tuple of a dict with cached values by key and a set of keys blocked by
+      DeleteOp entries of ongoing commits, such keys must not be cached.
+    """
+    self.keys += len(keys)
+    result = {}
+    missing = []
+    for key in keys:
+      value = _L1_CACHE.get(key)
+      if value is None:
+        missing.append(key)
+      else:
+        result[key] = value
+    blocked = set()
+    if keys:
+      start = time.time()
+      values = self.memcache_client.get_multi(
+          missing + [DELETE_OP_PREFIX + key for key in keys])
+      self.io_time += time.time() - start
+      for key in keys:
+        if DELETE_OP_PREFIX + key in values:
+          blocked.add(key)
+          result.pop(key, None)
+          _L1_CACHE.delete(key)
+        elif key not in result and values.get(key):
+          result[key] = values[key]
+          _L1_CACHE.set(key, values[key])
+    self.hits += len(result)
+    self.misses += len(keys) - len(result)
+    return result, blocked
+
+  def add_multi(self, mapping):
+    """Add resources that are not cached yet."""
+    if not mapping:
+      return
+    start = time.time()
+    self.memcache_client.add_multi(mapping)
+    self.io_time += time.time() - start
+
+  def delete(self, key):
+    _L1_CACHE.delete(key)
+    start = time.time()
+    self.memcache_client.delete(key)
+    self.io_time += time.time() - start
+
+  def log_metrics(self, name):
+    """Log hit rate, number of keys and time spent in memcache calls."""
+    lookups = self.hits + self.misses
+    logger.info(
+        "CACHE: %s resources: %s keys, hit rate %.2f, cache I/O %.3fs",
+        name, self.keys, float(self.hits) / lookups if lookups else 0,
+        self.io_time,
+    )
@@ -3,18 +3,25 @@
 
 """Common operations on cache managers."""
 
+import collections
 import logging
 
 import flask
 
 from ggrc import cache
+from ggrc import db
 import ggrc.models
-from ggrc.utils.memcache import blob_get_chunk_keys
+import ggrc.utils
+from ggrc.cache import resource_cache
 from ggrc.cache.memcache import has_memcache
 
 
 logger = logging.getLogger(__name__)
 
+PERMISSION_CACHE_TIMEOUT = 3600  # 60 minutes
+
+DELETE_CHUNK_SIZE = 500
+
 
 def get_cache_manager():
   """Returns an instance of CacheManager."""
@@ -153,15 +160,15 @@ def update_memcache_after_commit(context):
     context: POST/PUT/DELETE HTTP request or import Converter contextual object
     modified_objects:  objects in cache maintained prior to committing to DB
   Returns:
-    None
+    list of deleted cache keys
 
   """
   if not has_memcache():
-    return
+    return []
 
   if context.cache_manager is None:
     logger.error("CACHE: Error in initiaizing cache manager")
-    return
+    return []
 
   cache_manager = context.cache_manager
 
@@ -173,6 +180,7 @@ def update_memcache_after_commit(context):
   memcache_mark_for_deletion(context, related_objs)
 
   # TODO(dan): check for duplicates in marked_for_delete
+  resource_cache.forget(cache_manager.marked_for_delete)
   if cache_manager.marked_for_delete:
     delete_result = cache_manager.bulk_delete(
         cache_manager.marked_for_delete, 0)
@@ -191,8 +199,9 @@ def update_memcache_after_commit(context):
     if delete_result is not True:
       logger.error("CACHE: Failed to remove status entries from cache")
 
-  clear_permission_cache()
+  deleted_keys = cache_manager.marked_for_delete
   cache_manager.clear_cache()
+  return deleted_keys
 
 
 def build_cache_status(data, key, expiry_timeout, status):
@@ -210,6 +219,37 @@ def build_cache_status(data, key, expiry_timeout, status):
   data[key] = {'expiry': expiry_timeout, 'status': status}
 
 
+def get_permissions_key(user_id):
+  """Get memcache key of the permission segments index of the user."""
+  return 'permissions:{}'.format(user_id)
+
+
+def get_permission_segment_key(user_id, segment):
+  """Get memcache key of a single permission segment of the user."""
+  return 'permissions:{}:{}'.format(user_id, segment)
+
+
+def get_acl_segment(object_type):
+  """Get name of the permission segment with ACL entries of object_type."""
+  return 'acl:{}'.format(object_type)
+
+
+def _get_permission_keys(client, user_keys):
+  """Get all memcache keys with cached permissions of the given users."""
+  keys = list(user_keys)
+  for index in client.get_multi(user_keys).itervalues():
+    if isinstance(index, dict):
+      keys.extend(index.itervalues())
+    elif isinstance(index, list):
+      # chunks of permissions stored in a single blob
+      keys.extend(index)
+  segment_keys = keys[len(user_keys):]
+  for chunk_keys in client.get_multi(segment_keys).itervalues():
+    if isinstance(chunk_keys, list):
+      keys.extend(chunk_keys)
+  return keys
+
+
 def clear_permission_cache():
   """Drop cached permissions for all users."""
   if not has_memcache():
@@ -219,10 +259,9 @@ def clear_permission_cache():
 
   # We delete all the cached user permissions as well as
   # the permissions:list value itself
-  keys_to_delete = list('permissions:list')
-  for user_key in client.get('permissions:list') or set():
-    keys_to_delete.append(user_key)
-    keys_to_delete.extend(blob_get_chunk_keys(client, user_key))
+  keys_to_delete = ['permissions:list']
+  keys_to_delete.extend(_get_permission_keys(
+      client, list(client.get('permissions:list') or set())))
 
   client.delete_multi(keys_to_delete)
 
@@ -234,17 +273,201 @@ def clear_users_permission_cache(user_ids):
 
   client = get_cache_manager().cache_object.memcache_client
 
-  keys_to_delete = list()
+  user_keys = list()
   cached_keys_set = client.get('permissions:list') or set()
   for user_id in user_ids:
-    key = 'permissions:{}'.format(user_id)
+    key = get_permissions_key(user_id)
     if key in cached_keys_set:
       cached_keys_set.remove(key)
-      keys_to_delete.append(key)
-      keys_to_delete.extend(blob_get_chunk_keys(client, key))
+      user_keys.append(key)
 
   client.set('permissions:list', cached_keys_set)
-  client.delete_multi(keys_to_delete)
+  client.delete_multi(_get_permission_keys(client, user_keys))
+
+
+def clear_permission_segments(user_segments):
+  """Drop cached permission segments of the given users.
+
+  Dropped segments are kept in the index of user segments, so they are
+  rebuilt on the next permissions load while all other segments are taken
+  from memcache. The index is rewritten with compare-and-set even if it has
+  not changed, so loaders that have read it before are not able to store
+  segments built from outdated data. Users whose index can not be updated
+  get all their permissions dropped.
+
+  Args:
+    user_segments: dict with sets of segment names by user id.
+  """
+  if not has_memcache() or not user_segments:
+    return
+
+  client = get_cache_manager().cache_object.memcache_client
+
+  cached_keys_set = client.get('permissions:list') or set()
+  user_keys = {
+      get_permissions_key(user_id): user_id for user_id in user_segments
+      if get_permissions_key(user_id) in cached_keys_set
+  }
+  if not user_keys:
+    return
+
+  indexes = client.get_multi(user_keys.keys(), for_cas=True)
+  updated_indexes = {}
+  segment_keys = []
+  uncached_user_ids = []
+  for user_key, user_id in user_keys.iteritems():
+    index = indexes.get(user_key)
+    if not isinstance(index, dict):
+      # permissions of the user are being loaded right now
+      uncached_user_ids.append(user_id)
+      continue
+    index = dict(index)
+    for segment in user_segments[user_id]:
+      index[segment] = get_permission_segment_key(user_id, segment)
+      segment_keys.append(index[segment])
+    updated_indexes[user_key] = index
+
+  if updated_indexes:
+    failed_keys = client.cas_multi(
+        updated_indexes, time=PERMISSION_CACHE_TIMEOUT) or []
+    uncached_user_ids.extend(user_keys[key] for key in failed_keys)
+  if segment_keys:
+    keys_to_delete = list(segment_keys)
+    for chunk_keys in client.get_multi(segment_keys).itervalues():
+      keys_to_delete.extend(chunk_keys)
+    client.delete_multi(keys_to_delete)
+  clear_users_permission_cache(uncached_user_ids)
+
+
+def _get_permission_changes():
+  """Get permission changes collected in the current request."""
+  if not has_memcache() or not flask.has_app_context():
+    return None
+  if not hasattr(flask.g, "permission_changes"):
+    flask.g.permission_changes = {
+        "all": False,
+        "segments": collections.defaultdict(set),
+        "acl_people": set(),
+        "propagated_acls": set(),
+    }
+  return flask.g.permission_changes
+
+
+def track_all_permissions():
+  """Mark cached permissions of all users as outdated."""
+  changes = _get_permission_changes()
+  if changes is not None:
+    changes["all"] = True
+
+
+def track_permission_segment(user_id, segment):
+  """Mark a single permission segment of the user as outdated."""
+  changes = _get_permission_changes()
+  if changes is not None and not changes["all"]:
+    changes["segments"][user_id].add(segment)
+
+
+def track_acl_people(acl_people):
+  """Mark ACL segments of people assigned to or removed from ACL entries.
+
+  Args:
+    acl_people: iterable of (person_id, ac_list_id) pairs.
+  """
+  changes = _get_permission_changes()
+  if changes is not None and not changes["all"]:
+    changes["acl_people"].update(acl_people)
+
+
+def track_propagated_acls(propagated_acls):
+  """Mark ACL segments of people getting access with propagated ACL entries.
+
+  Args:
+    propagated_acls: iterable of (base_id, object_type) pairs.
+  """
+  changes = _get_permission_changes()
+  if changes is not None and not changes["all"]:
+    changes["propagated_acls"].update(propagated_acls)
+
+
+def clear_changed_permissions():
+  """Drop cached permission segments affected by the tracked changes."""
+  changes = _get_permission_changes()
+  if changes is None:
+    return
+  del flask.g.permission_changes
+  if changes["all"]:
+    clear_permission_cache()
+    return
+
+  acl = ggrc.models.all_models.AccessControlList
+  acp = ggrc.models.all_models.AccessControlPerson
+  user_segments = collections.defaultdict(set, changes["segments"])
+
+  acl_ids = {acl_id for _, acl_id in changes["acl_people"]}
+  if acl_ids:
+    types_by_base = collections.defaultdict(set)
+    query = db.session.query(acl.base_id, acl.object_type).filter(
+        acl.base_id.in_(acl_ids),
+    ).distinct()
+    for base_id, object_type in query:
+      types_by_base[base_id].add(object_type)
+    for person_id, acl_id in changes["acl_people"]:
+      user_segments[person_id].update(
+          get_acl_segment(object_type)
+          for object_type in types_by_base[acl_id]
+      )
+
+  base_ids = {base_id for base_id, _ in changes["propagated_acls"]}
+  if base_ids:
+    people_by_base = collections.defaultdict(set)
+    query = db.session.query(acp.ac_list_id, acp.person_id).filter(
+        acp.ac_list_id.in_(base_ids),
+    )
+    for base_id, person_id in query:
+      people_by_base[base_id].add(person_id)
+    for base_id, object_type in changes["propagated_acls"]:
+      for person_id in people_by_base[base_id]:
+        user_segments[person_id].add(get_acl_segment(object_type))
+
+  clear_permission_segments(user_segments)
+
+
+def discard_permission_changes():
+  """Forget permission changes tracked in the current request.
+
+  Used when the changes are rolled back and cached permissions stay valid.
+  """
+  if flask.has_app_context() and hasattr(flask.g, "permission_changes"):
+    del flask.g.permission_changes
+
+
+def delete_keys(keys):
+  """Delete given keys from memcache in batched delete_multi calls."""
+  if not has_memcache() or not keys:
+    return
+  client = get_cache_manager().cache_object.memcache_client
+  keys = list(keys)
+  resource_cache.forget(keys)
+  for chunk in ggrc.utils.list_chunks(keys, chunk_size=DELETE_CHUNK_SIZE):
+    if not client.delete_multi(chunk):
+      logger.error("CACHE: Failed to remove %s keys from cache", len(chunk))
+
+
+def get_hit_rate():
+  """Get ratio of memcache hits to all memcache lookups.
+
+  Returns:
+    float hit rate or None if memcache statistics are not available.
+  """
+  if not has_memcache():
+    return None
+  stats = get_cache_manager().cache_object.memcache_client.get_stats()
+  if not stats:
+    return None
+  lookups = stats.get("hits", 0) + stats.get("misses", 0)
+  if not lookups:
+    return None
+  return float(stats.get("hits", 0)) / lookups
 
 
 def clear_memcache():
@@ -253,4 +476,5 @@ def clear_memcache():
   if not has_memcache():
     return
 
+  resource_cache.forget_all()
   get_cache_manager().clean()
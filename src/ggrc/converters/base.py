@@ -3,6 +3,7 @@
 
 """Base objects for csv file converters."""
 
+import logging
 from collections import defaultdict
 
 from flask import g
@@ -12,7 +13,7 @@ from ggrc import login
 from ggrc import settings
 from ggrc.utils import benchmark
 from ggrc.utils import structures
-from ggrc.cache.utils import clear_memcache
+from ggrc.cache import utils as cache_utils
 from ggrc.converters import get_exportables
 from ggrc.converters import import_helper
 from ggrc.converters import base_block
@@ -20,15 +21,21 @@ from ggrc.converters.snapshot_block import SnapshotBlockConverter
 from ggrc.converters.import_helper import extract_relevant_data
 from ggrc.converters.import_helper import split_blocks
 from ggrc.converters.import_helper import CsvStringBuilder
+from ggrc.converters.import_helper import CsvStreamBuilder
+from ggrc.converters.object_index import ObjectIndex
 from ggrc.fulltext import get_indexer
 
 
+logger = logging.getLogger(__name__)
+
+
 class BaseConverter(object):
   """Base class for csv converters."""
   # pylint: disable=too-few-public-methods
   def __init__(self):
     self.new_objects = defaultdict(structures.CaseInsensitiveDict)
     self.shared_state = {}
+    self.object_index = ObjectIndex()
     self.response_data = []
     self.exportable = get_exportables()
 
@@ -59,6 +66,8 @@ class ImportConverter(BaseConverter):
     self.ie_job = ie_job
     self.dry_run = dry_run
     self.csv_data = csv_data or []
+    # Memcache keys dropped on commits of imported objects
+    self.cache_keys = set()
     self.indexer = get_indexer()
     super(ImportConverter, self).__init__()
 
@@ -88,6 +97,7 @@ class ImportConverter(BaseConverter):
     """Process import and post import jobs."""
 
     revision_ids = []
+    hit_rate = None if self.dry_run else cache_utils.get_hit_rate()
     for converter in self.initialize_block_converters():
       if not converter.ignore:
         converter.import_csv_data()
@@ -97,6 +107,9 @@ class ImportConverter(BaseConverter):
     if not self.dry_run and settings.ISSUE_TRACKER_ENABLED:
       self._start_issuetracker_update(revision_ids)
     self.drop_cache()
+    if not self.dry_run:
+      logger.info("CACHE: hit rate before import %s, after import %s",
+                  hit_rate, cache_utils.get_hit_rate())
 
   def _start_issuetracker_update(self, revision_ids):
     """Create or update issuetracker tickets for all imported instances."""
@@ -124,9 +137,21 @@ class ImportConverter(BaseConverter):
           cur_user.id
       )
 
-  @classmethod
-  def drop_cache(cls):
-    clear_memcache()
+  def drop_cache(self):
+    """Drop cached data changed by the import.
+
+    Only resources of the imported objects and their mappings and the
+    permissions of affected users are dropped, the rest of memcache is kept.
+    Permissions removed with ACL entries of unmapped or deleted objects are
+    tracked by the ACL propagation before the entries are deleted.
+    Dry run changes are rolled back, so nothing is dropped for them.
+    """
+    if self.dry_run:
+      cache_utils.discard_permission_changes()
+      return
+    with benchmark("Drop cache of imported objects"):
+      cache_utils.delete_keys(self.cache_keys)
+      cache_utils.clear_changed_permissions()
 
 
 class ExportConverter(BaseConverter):
@@ -188,29 +213,51 @@ class ExportConverter(BaseConverter):
       except ValueError:
         return ""
 
-  def build_csv_from_row_data(self):
-    """Export each block separated by empty lines."""
+  def stream_csv_data(self, sink):
+    """Export csv data passing it to sink in chunks.
+
+    Args:
+      sink: callable that receives consecutive chunks of the csv data.
+    """
+    with benchmark("Initialize block converters."):
+      self.initialize_block_converters()
+    with benchmark("Stream csv data."):
+      try:
+        csv_stream_builder = CsvStreamBuilder(self.table_width, sink)
+      except ValueError:
+        return
+      self.write_csv_data(csv_stream_builder)
+      csv_stream_builder.flush()
+
+  @property
+  def table_width(self):
+    """Width of the csv table including 'Object type' column."""
     table_width = max([converter.block_width
                        for converter in self.block_converters])
-    table_width += 1  # One line for 'Object line' column
+    return table_width + 1  # One line for 'Object line' column
 
-    csv_string_builder = CsvStringBuilder(table_width)
+  def build_csv_from_row_data(self):
+    """Export each block separated by empty lines."""
+    csv_string_builder = CsvStringBuilder(self.table_width)
+    self.write_csv_data(csv_string_builder)
+    return csv_string_builder.get_csv_string()
+
+  def write_csv_data(self, csv_builder):
+    """Write each block separated by empty lines into csv builder."""
     for block_converter in self.block_converters:
       csv_header = block_converter.generate_csv_header()
       csv_header[0].insert(0, "Object type")
       csv_header[1].insert(0, block_converter.name)
 
-      csv_string_builder.append_line(csv_header[0])
-      csv_string_builder.append_line(csv_header[1])
+      csv_builder.append_line(csv_header[0])
+      csv_builder.append_line(csv_header[1])
 
       for line in block_converter.generate_row_data():
         line.insert(0, "")
-        csv_string_builder.append_line(line)
+        csv_builder.append_line(line)
 
-      csv_string_builder.append_line([])
-      csv_string_builder.append_line([])
-
-    return csv_string_builder.get_csv_string()
+      csv_builder.append_line([])
+      csv_builder.append_line([])
 
   def _get_exportable_queries(self):
     """Get a list of filtered object queries regarding exportable items.
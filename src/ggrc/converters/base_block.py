@@ -7,6 +7,7 @@ Each import block should contain data for one Object type. The blocks are
 separated in the csv file with empty lines.
 """
 
+import re
 from logging import getLogger
 from collections import defaultdict
 from collections import OrderedDict
@@ -14,25 +15,34 @@ from collections import Counter
 
 from cached_property import cached_property
 import sqlalchemy as sa
+from sqlalchemy import exc
 from sqlalchemy import or_
 from sqlalchemy import and_
 from flask import _app_ctx_stack
 
 from ggrc import db
 from ggrc import models
+from ggrc import settings
+from ggrc.cache import utils as cache_utils
 from ggrc.models import reflection
+from ggrc.models.cache import Cache
 from ggrc.rbac import permissions
 from ggrc.utils import benchmark
 from ggrc.utils import structures
 from ggrc.utils import list_chunks
 from ggrc.converters import errors
+from ggrc.converters import get_exportables
 from ggrc.converters import get_shared_unique_rules
 from ggrc.converters import base_row
+from ggrc.converters.handlers import handlers
 from ggrc.converters.import_helper import get_column_order
 from ggrc.converters.import_helper import get_object_column_definitions
 from ggrc.models.mixins import issue_tracker as issue_tracker_mixins
 from ggrc.models.exceptions import ReservedNameError
 from ggrc.services import signals
+from ggrc.services.common import get_modified_objects
+from ggrc.services.common import update_snapshot_index
+from ggrc.utils.log_event import log_event
 from ggrc_workflows.models.cycle_task_group_object_task import \
     CycleTaskGroupObjectTask
 
@@ -40,6 +50,53 @@ from ggrc_workflows.models.cycle_task_group_object_task import \
 logger = getLogger(__name__)
 
 
+def _get_user_keys(_, values):
+  """Get emails of people referenced by user column values."""
+  emails = set()
+  for value in values:
+    emails.update(re.split("[, ;\n]+", value.lower()))
+  return {(models.all_models.Person, "email"): emails}
+
+
+def _get_directive_keys(_, values):
+  """Get slugs of directives referenced by requirement directive values."""
+  return {
+      (directive_class, "slug"): set(values)
+      for directive_class in (models.all_models.Policy,
+                              models.all_models.Regulation,
+                              models.all_models.Standard,
+                              models.all_models.Contract)
+  }
+
+
+def _get_mapping_keys(header, values):
+  """Get slugs of objects referenced by mapping column values."""
+  mapping_object = get_exportables().get(header.get("attr_name", ""))
+  if not mapping_object or not hasattr(mapping_object, "slug"):
+    return {}
+  return {(mapping_object, "slug"): {
+      slug.strip().lower() for value in values for slug in value.splitlines()
+  }}
+
+
+def _get_parent_keys(header, values):
+  """Get slugs of parent objects referenced by parent column values."""
+  parent = header["handler"].parent
+  if parent is None:
+    return {}
+  return {(parent, "slug"): set(values)}
+
+
+# Getters of keys referenced by column values, the first matching handler
+# class is used for a column.
+REFERENCED_KEYS_GETTERS = (
+    (handlers.UserColumnHandler, _get_user_keys),
+    (handlers.RequirementDirectiveColumnHandler, _get_directive_keys),
+    (handlers.MappingColumnHandler, _get_mapping_keys),
+    (handlers.ParentColumnHandler, _get_parent_keys),
+)
+
+
 class BlockConverter(object):
   # pylint: disable=too-many-public-methods
   # pylint: disable=too-many-instance-attributes
@@ -423,22 +480,70 @@ class ImportBlockConverter(BlockConverter):
         k for k in self.headers if k not in self.converter.priority_columns
     ]
 
+  @property
+  def commit_batch_size(self):
+    """Number of rows committed in a single transaction.
+
+    Audit rows are always committed separately, as snapshots of a new audit
+    are created with a separate event during the row flush.
+    """
+    if self.converter.dry_run or self.object_class is models.all_models.Audit:
+      return 1
+    return max(settings.IMPORT_COMMIT_BATCH_SIZE, 1)
+
+  def _get_column_values(self, index):
+    """Get all non empty cells of the column with the given index."""
+    return [row[index].strip() for row in self.rows
+            if len(row) > index and row[index].strip()]
+
+  def _get_referenced_keys(self):
+    """Collect key values of all objects referenced by the block.
+
+    Returns:
+      dict with (model, key column name) tuples as keys and sets of key values
+      as values.
+    """
+    referenced = defaultdict(set)
+    for index, (attr_name, header) in enumerate(self.headers.iteritems()):
+      values = self._get_column_values(index)
+      if not values:
+        continue
+      if attr_name in ("slug", "email") and \
+         hasattr(self.object_class, attr_name):
+        referenced[(self.object_class, attr_name)].update(values)
+        continue
+      for handler_class, get_keys in REFERENCED_KEYS_GETTERS:
+        if issubclass(header["handler"], handler_class):
+          for model_key, keys in get_keys(header, values).iteritems():
+            referenced[model_key].update(keys)
+          break
+    return referenced
+
+  def prefetch_objects(self):
+    """Load all objects referenced by the block into the import index.
+
+    Column handlers find objects by slugs and people by emails in the index,
+    so the rows are processed without querying every referenced object.
+    Update permissions of the found objects are checked in bulk as well.
+    """
+    with benchmark("Prefetch objects referenced by import block"):
+      object_index = self.converter.object_index
+      for (model, key), values in self._get_referenced_keys().iteritems():
+        object_index.load(model, key, values)
+    with benchmark("Prefetch update permissions of import block objects"):
+      object_index.prefetch_update_permissions()
+
   def import_csv_data(self):
     """Perform import sequence for the block."""
     try:
-      for row in self.row_converters_from_csv():
-        try:
-          row.process_row()
-        except ReservedNameError:
-          db.session.rollback()
-          row.add_error(errors.DUPLICATE_CAD_NAME)
-          logger.exception(errors.DUPLICATE_CAD_NAME)
-        except Exception:  # pylint: disable=broad-except
-          db.session.rollback()
-          row.add_error(errors.UNKNOWN_ERROR)
-          logger.exception("Unexpected error on import")
-        self._update_info(row)
-        _app_ctx_stack.top.sqlalchemy_queries = []
+      self.prefetch_objects()
+      batch_size = self.commit_batch_size
+      if batch_size > 1:
+        self._import_rows_in_batches(batch_size)
+      else:
+        for row in self.row_converters_from_csv():
+          self._process_row(row)
+          self._update_info(row)
     except Exception:  # pylint: disable=broad-except
       logger.exception("Unexpected error on import")
     finally:
@@ -447,6 +552,163 @@ class ImportBlockConverter(BlockConverter):
       if is_final_commit_required:
         db.session.commit()
 
+  @staticmethod
+  def _process_row(row, commit=True, savepoint=None):
+    """Process a single row and handle unexpected errors.
+
+    Args:
+      row: ImportRowConverter instance.
+      commit: commit the row right after processing.
+      savepoint: nested transaction opened for the row, on error only this
+        transaction is rolled back if it is still active.
+    """
+    try:
+      row.process_row(commit=commit)
+    except ReservedNameError:
+      if savepoint is None or savepoint.is_active:
+        db.session.rollback()
+      row.add_error(errors.DUPLICATE_CAD_NAME)
+      logger.exception(errors.DUPLICATE_CAD_NAME)
+    except Exception:  # pylint: disable=broad-except
+      if savepoint is None or savepoint.is_active:
+        db.session.rollback()
+      row.add_error(errors.UNKNOWN_ERROR)
+      logger.exception("Unexpected error on import")
+    _app_ctx_stack.top.sqlalchemy_queries = []
+
+  def _import_rows_in_batches(self, batch_size):
+    """Import rows committing batch_size rows in a single transaction.
+
+    Every row is processed inside a savepoint, so a failed row is rolled back
+    without touching other rows of the batch.
+    """
+    db.session.commit_hooks_enable_flag.disable()
+    batch = []
+    errors_state = None
+    for row in self.row_converters_from_csv():
+      if not batch:
+        errors_state = (len(self.row_errors), len(self.row_warnings))
+      savepoint = db.session.begin_nested()
+      self._process_row(row, commit=False, savepoint=savepoint)
+      if savepoint.is_active:
+        savepoint.commit()
+      batch.append(row)
+      if len(batch) >= batch_size:
+        self._commit_batch(batch, errors_state)
+        batch = []
+    if batch:
+      self._commit_batch(batch, errors_state)
+
+  def _commit_batch(self, rows, errors_state):
+    """Commit processed rows, retry them one by one if the commit fails."""
+    committed_rows = [row for row in rows if not row.ignore]
+    try:
+      with benchmark("Commit import batch"):
+        import_event, modified_objects = self.commit_rows(committed_rows)
+    except exc.SQLAlchemyError as err:
+      db.session.rollback()
+      logger.exception("Import of a batch failed with: %s", err.message)
+      rows = self._retry_rows(rows, errors_state)
+    else:
+      self.handle_after_commit(committed_rows, import_event,
+                               modified_objects)
+      for row in committed_rows:
+        row.send_post_commit_signals(event=import_event)
+    for row in rows:
+      self._update_info(row)
+
+  def _retry_rows(self, rows, errors_state):
+    """Import rows of a failed batch again committing every row separately.
+
+    Errors, unique values and new objects registered by the rows of the batch
+    are dropped first, as the rows are handled from scratch.
+
+    Returns:
+      list of new row converters.
+    """
+    errors_count, warnings_count = errors_state
+    del self.row_errors[errors_count:]
+    del self.row_warnings[warnings_count:]
+    lines = {row.line for row in rows}
+    for values in self.unique_values.values():
+      for value, line in values.items():
+        if line in lines:
+          del values[value]
+    batch_objects = {id(row.obj) for row in rows if row.obj is not None}
+    for new_objects in self.converter.new_objects.values():
+      for key, obj in new_objects.items():
+        if id(obj) in batch_objects:
+          del new_objects[key]
+    retried_rows = []
+    for row in rows:
+      row = base_row.ImportRowConverter(self, self.object_class, row=row.row,
+                                        headers=self.headers, line=row.line)
+      self._process_row(row)
+      retried_rows.append(row)
+    return retried_rows
+
+  def commit_rows(self, rows):
+    """Commit all changes of the session made for the given rows.
+
+    All changes are logged with a single event. Work that follows the
+    commit is done by `handle_after_commit`, so a failure of the commit can
+    be retried without importing committed rows again.
+
+    Args:
+      rows: list of processed ImportRowConverter instances.
+
+    Returns:
+      tuple of the Event created for the committed changes and the list of
+      committed objects.
+    """
+    for row in rows:
+      if not row.is_new:
+        Cache.add_to_cache(row.obj)
+    modified_objects = get_modified_objects(db.session)
+    import_event = log_event(db.session, None)
+    cache_utils.update_memcache_before_commit(
+        self,
+        modified_objects,
+        self.CACHE_EXPIRY_IMPORT,
+    )
+    for row in rows:
+      row.handle_before_commit(import_event)
+    db.session.commit_hooks_enable_flag.disable()
+    db.session.commit()
+    return import_event, modified_objects
+
+  def handle_after_commit(self, rows, import_event, modified_objects):
+    """Store revision ids and refresh caches and indexes of committed rows.
+
+    The rows are already committed, so a failed step does not fail the import.
+    Memcache is flushed if it can not be updated, and failures of the other
+    steps are reported as warnings of the committed rows.
+    """
+    try:
+      self.store_revision_ids(import_event)
+    except Exception:  # pylint: disable=broad-except
+      db.session.rollback()
+      logger.exception("Storing revision ids of imported rows failed")
+      for row in rows:
+        row.add_warning(errors.POST_COMMIT_WARNING,
+                        action="updating of dependent data")
+
+    try:
+      self.converter.cache_keys.update(
+          cache_utils.update_memcache_after_commit(self))
+    except Exception:  # pylint: disable=broad-except
+      logger.exception("Memcache update after import failed, flushing it")
+      cache_utils.clear_memcache()
+
+    try:
+      update_snapshot_index(modified_objects)
+    except Exception:  # pylint: disable=broad-except
+      db.session.rollback()
+      logger.exception("Snapshot reindex of imported rows failed")
+      for row in rows:
+        row.add_warning(errors.POST_COMMIT_WARNING,
+                        action="updating of search index")
+
   def get_unique_values_dict(self, object_class):
     """Get the varible to storing row numbers for unique values.
 
@@ -576,13 +838,18 @@ class ExportBlockConverter(BlockConverter):
           self.object_class.id.in_(ids_pool)
       ).execution_options(stream_results=True)
 
+      exported = []
       for obj in objects:
+        exported.append(obj)
         yield base_row.ExportRowConverter(self, self.object_class, obj=obj,
                                           headers=self.headers)
 
-      # Clear all objects from session (it helps to avoid memory leak)
-      for obj in db.session:
-        del obj
+      # Remove exported objects from session, so the memory usage does not
+      # grow with the number of exported objects. Expunge is cascaded to the
+      # owned objects like ACL entries and custom attribute values.
+      for obj in exported:
+        if obj in db.session:
+          db.session.expunge(obj)
 
   def generate_row_data(self):
     """Get row data from all row converters while exporting."""
@@ -203,3 +203,6 @@ NO_VALID_USERS_ERROR = (u"Line {line}: Required field '{column_name}' "
 NO_VERIFIER_WARNING = (u"Line {line}: Assessment without verifier cannot "
                        u"be moved to {status} state. "
                        u"The value will be ignored.")
+
+POST_COMMIT_WARNING = (u"Line {line}: Object has been imported, but "
+                       u"{action} failed.")
@@ -9,6 +9,7 @@ from datetime import datetime
 from dateutil.parser import parse
 
 from sqlalchemy import and_
+from sqlalchemy import inspect
 from sqlalchemy import or_
 
 from ggrc import db
@@ -246,8 +247,13 @@ class UserColumnHandler(ColumnHandler):
     from ggrc.utils import user_generator
     new_objects = self.row_converter.block_converter.converter.new_objects
     if email not in new_objects[all_models.Person]:
+      object_index = self.row_converter.block_converter.converter.object_index
       try:
-        new_objects[all_models.Person][email] = user_generator.find_user(email)
+        new_objects[all_models.Person][email] = user_generator.find_user(
+            email,
+            user_lookup=lambda email: object_index.find(
+                all_models.Person, "email", email),
+        )
       except ValueError as ex:
         self.add_error(
             errors.VALIDATION_ERROR,
@@ -504,9 +510,16 @@ class MappingColumnHandler(ColumnHandler):
     lines = set(self.raw_value.splitlines())
     slugs = set([slug.lower() for slug in lines if slug.strip()])
     objects = []
+    object_index = self.row_converter.block_converter.converter.object_index
 
     for slug in slugs:
-      obj = class_.query.filter_by(slug=slug).first()
+      obj = object_index.find(class_, "slug", slug)
+      if obj is None and not self.dry_run:
+        # Objects created by previous rows are already flushed, so they get
+        # the same checks as the existing ones
+        new_obj = self.new_slugs.get(slug)
+        if new_obj is not None and inspect(new_obj).persistent:
+          obj = new_obj
 
       if obj:
         is_allowed_by_type = self._is_allowed_mapping_by_type(
@@ -519,7 +532,7 @@ class MappingColumnHandler(ColumnHandler):
               destination=obj,
           )
           continue
-        if not permissions.is_allowed_update_for(obj):
+        if not object_index.is_allowed_update(obj):
           self.add_warning(
               errors.MAPPING_PERMISSION_ERROR,
               object_type=class_._inflector.human_singular.title(),
@@ -685,7 +698,8 @@ class ParentColumnHandler(ColumnHandler):
     slug = self.raw_value
     obj = self.new_objects.get(self.parent, {}).get(slug)
     if obj is None:
-      obj = self.parent.query.filter(self.parent.slug == slug).first()
+      obj = self.row_converter.block_converter.converter.object_index.find(
+          self.parent, "slug", slug)
     if obj is None:
       self.add_error(
           errors.UNKNOWN_OBJECT,
@@ -746,7 +760,8 @@ class RequirementDirectiveColumnHandler(MappingColumnHandler):
   def get_directive_from_slug(self, directive_class, slug):
     if slug in self.new_objects[directive_class]:
       return self.new_objects[directive_class][slug]
-    return directive_class.query.filter_by(slug=slug).first()
+    return self.row_converter.block_converter.converter.object_index.find(
+        directive_class, "slug", slug)
 
   def parse_item(self):
     """ get a directive from slug """
@@ -8,6 +8,7 @@ import chardet
 
 from flask import g
 
+from ggrc import settings
 from ggrc.app import app
 from ggrc.data_platform import computed_attributes
 from ggrc.models import person
@@ -278,3 +279,57 @@ class CsvStringBuilder(object):
   def get_csv_string(self):
     """Returns CSV string from buffer."""
     return self.output_buffer.getvalue()
+
+
+class CsvStreamBuilder(CsvStringBuilder):
+  """CSV builder that passes its data to sink in chunks.
+
+  The buffer is flushed to the sink callable each time it grows over
+  chunk_size bytes, so the memory usage does not depend on the size of the
+  whole csv file.
+  """
+
+  def __init__(self, table_width, sink, chunk_size=None):
+    super(CsvStreamBuilder, self).__init__(table_width)
+    self.sink = sink
+    self.chunk_size = chunk_size or settings.EXPORT_CHUNK_SIZE
+
+  def append_line(self, line):
+    """Append line to CSV buffer and flush the buffer if it is full."""
+    super(CsvStreamBuilder, self).append_line(line)
+    if self.output_buffer.tell() >= self.chunk_size:
+      self.flush()
+
+  def flush(self):
+    """Pass buffered data to the sink and clear the buffer."""
+    data = self.output_buffer.getvalue()
+    if data:
+      self.sink(data)
+    self.output_buffer.seek(0)
+    self.output_buffer.truncate()
+
+
+def iter_csv_lines(chunks):
+  """Split csv data given in chunks of encoded text into lines."""
+  tail = ""
+  for chunk in chunks:
+    lines = (tail + chunk).splitlines(True)
+    tail = lines.pop() if lines and not lines[-1].endswith("\n") else ""
+    for line in lines:
+      yield line
+  if tail:
+    yield tail
+
+
+def pad_csv_chunks(chunks, table_width, sink):
+  """Rewrite csv data given in chunks with all lines padded to table_width.
+
+  Args:
+    chunks: iterable of utf-8 encoded csv data chunks.
+    table_width: width of the resulting csv table.
+    sink: callable that receives chunks of the resulting csv data.
+  """
+  csv_stream_builder = CsvStreamBuilder(table_width, sink)
+  for row in csv.reader(iter_csv_lines(chunks)):
+    csv_stream_builder.append_line([value.decode("utf-8") for value in row])
+  csv_stream_builder.flush()
@@ -0,0 +1,113 @@
+# Copyright (C) 2019 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""Index of existing objects referenced in an imported csv file.
+
+Column handlers look up objects by slug and people by email for every value
+of every cell. Before rows of a block are processed, all values referenced by
+the block are collected and loaded with a few bulk queries, so handlers find
+objects in the index instead of querying them one by one.
+"""
+
+from collections import defaultdict
+
+import sqlalchemy as sa
+from sqlalchemy import orm
+
+from ggrc.models import all_models
+from ggrc.rbac import permissions
+from ggrc.utils import list_chunks
+from ggrc.utils import structures
+
+
+class ObjectIndex(object):
+  """Objects loaded by a key column and indexed by the key value.
+
+  The index also remembers values that have no matching object, so missing
+  objects are not queried again.
+  """
+
+  def __init__(self):
+    self._index = defaultdict(structures.CaseInsensitiveDict)
+    # Update permissions of indexed objects by (type, id)
+    self._update_permissions = {}
+
+  @staticmethod
+  def _get_query(model):
+    """Get base query for loading objects of the given model."""
+    query = model.query
+    if model is all_models.Person:
+      query = query.options(orm.undefer_group("Person_complete"))
+    return query
+
+  def load(self, model, key, values):
+    """Load objects of model with key column matching any of values.
+
+    Args:
+      model: model class.
+      key: name of the key column, e.g. "slug" or "email".
+      values: iterable of key values, values that are already in the index
+        are not queried again.
+    """
+    index = self._index[(model, key)]
+    missing = list({value for value in values if value and value not in index})
+    if not missing:
+      return
+    column = getattr(model, key)
+    for chunk in list_chunks(missing):
+      for obj in self._get_query(model).filter(column.in_(chunk)):
+        index[getattr(obj, key)] = obj
+    for value in missing:
+      if value not in index:
+        index[value] = None
+
+  def find(self, model, key, value):
+    """Find an object of model with the given key value.
+
+    Values that have not been loaded into the index and objects that are not
+    persistent anymore (e.g. deleted during the import) are queried from the
+    database.
+    """
+    index = self._index.get((model, key))
+    if index is None or value not in index:
+      return self._get_query(model).filter(
+          getattr(model, key) == value
+      ).first()
+    obj = index[value]
+    if obj is not None and not sa.inspect(obj).persistent:
+      obj = self._get_query(model).filter(
+          getattr(model, key) == value
+      ).first()
+      index[value] = obj
+    return obj
+
+  def prefetch_update_permissions(self):
+    """Check update permissions of all indexed objects at once.
+
+    Decisions are taken before the rows are processed and used only for
+    objects that have not been modified since, other objects are checked
+    one by one.
+    """
+    stubs = set()
+    for (_, key), index in self._index.iteritems():
+      if key != "slug":
+        continue
+      for obj in index.values():
+        if obj is None:
+          continue
+        state = sa.inspect(obj)
+        stub = (obj.__class__.__name__, state.identity[0])
+        if state.persistent and stub not in self._update_permissions:
+          stubs.add(stub)
+    if stubs:
+      self._update_permissions.update(
+          permissions.is_allowed_for_bulk("update", stubs))
+
+  def is_allowed_update(self, obj):
+    """Check update permission of an imported or mapped object."""
+    state = sa.inspect(obj)
+    if state.persistent and not state.modified:
+      stub = (obj.__class__.__name__, state.identity[0])
+      if stub in self._update_permissions:
+        return self._update_permissions[stub]
+    return permissions.is_allowed_update_for(obj)
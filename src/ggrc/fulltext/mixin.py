@@ -1,7 +1,7 @@
 # Copyright (C) 2019 Google Inc.
 # Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
 """Module contains Indexed mixin class"""
-import itertools
+import logging
 from collections import namedtuple
 
 from sqlalchemy import orm
@@ -13,6 +13,9 @@ from ggrc import utils
 from ggrc.models.reflection import AttributeInfo
 
 
+logger = logging.getLogger(__name__)
+
+
 class ReindexRule(namedtuple("ReindexRule", ["model", "rule", "fields"])):
   """Class for keeping reindex rules"""
   __slots__ = ()
@@ -39,11 +42,15 @@ class Indexed(object):
     return (self.__class__.__name__, self.id)
 
   @classmethod
-  def insert_records(cls, ids):
-    """Calculate and insert records into fulltext_record_properties table."""
+  def generate_records(cls, ids):
+    """Calculate records for objects with sent ids."""
     instances = cls.indexed_query().filter(cls.id.in_(ids))
     indexer = fulltext.get_indexer()
-    rows = itertools.chain(*[indexer.records_generator(i) for i in instances])
+    return indexer.bulk_records_generator(cls, instances)
+
+  @staticmethod
+  def _insert_rows(rows):
+    """Insert record rows into fulltext_record_properties table."""
     for vals_chunk in utils.iter_chunks(rows, chunk_size=10000):
       query = """
           INSERT INTO fulltext_record_properties (
@@ -55,6 +62,11 @@ class Indexed(object):
         return
       db.session.execute(query, values)
 
+  @classmethod
+  def insert_records(cls, ids):
+    """Calculate and insert records into fulltext_record_properties table."""
+    cls._insert_rows(cls.generate_records(ids))
+
   @classmethod
   def get_delete_query_for(cls, ids):
     """Return delete class record query. If ids are empty, will return None."""
@@ -77,14 +89,80 @@ class Indexed(object):
     """
     db.session.execute(query, {"obj_type": cls.__name__, "obj_ids": ids})
 
+  @classmethod
+  def update_records(cls, ids):
+    """Write only changed records into fulltext_record_properties table.
+
+    New records are compared with the stored ones on key, type, property and
+    subproperty, so unchanged rows are not rewritten.
+
+    Returns:
+      dict with counts of inserted, updated, deleted and skipped rows.
+    """
+    record = fulltext.get_indexer().record_type
+    stored = {
+        (row.key, row.type, row.property, row.subproperty): row.content
+        for row in db.session.query(
+            record.key,
+            record.type,
+            record.property,
+            record.subproperty,
+            record.content,
+        ).filter(
+            record.type == cls.__name__,
+            record.key.in_(ids),
+        )
+    }
+    to_insert = []
+    to_update = []
+    skipped = 0
+    for row in cls.generate_records(ids):
+      row_key = (row["key"], row["type"], row["property"], row["subproperty"])
+      if row_key not in stored:
+        to_insert.append(row)
+      elif stored.pop(row_key) == row["content"]:
+        skipped += 1
+      else:
+        to_update.append(row)
+
+    if stored:
+      db.session.execute(
+          """
+          DELETE FROM fulltext_record_properties
+          WHERE `key` = :key AND type = :type AND
+                property = :property AND subproperty = :subproperty
+          """,
+          [{"key": key, "type": type_, "property": prop, "subproperty": sub}
+           for key, type_, prop, sub in stored],
+      )
+    if to_update:
+      db.session.execute(
+          """
+          UPDATE fulltext_record_properties SET content = :content
+          WHERE `key` = :key AND type = :type AND
+                property = :property AND subproperty = :subproperty
+          """,
+          to_update,
+      )
+    cls._insert_rows(to_insert)
+
+    stats = {
+        "inserted": len(to_insert),
+        "updated": len(to_update),
+        "deleted": len(stored),
+        "skipped": skipped,
+    }
+    logger.info("Fulltext records of %s: %s inserted, %s updated, "
+                "%s deleted, %s skipped", cls.__name__, stats["inserted"],
+                stats["updated"], stats["deleted"], stats["skipped"])
+    return stats
+
   @classmethod
   def bulk_record_update_for(cls, ids):
     """Bulky update index records for current class"""
     if not ids:
-      return
-
-    cls.delete_records(ids)
-    cls.insert_records(ids)
+      return None
+    return cls.update_records(ids)
 
   @classmethod
   def indexed_query(cls):
@@ -3,13 +3,17 @@
 
 """Module for full text index record builder."""
 
+import collections
 import logging
 
+import sqlalchemy as sa
+
 from ggrc import db
 from ggrc.models import all_models
 from ggrc.models.reflection import AttributeInfo
 from ggrc.models.person import Person
 from ggrc.models.mixins import CustomAttributable
+from ggrc.fulltext.attributes import CustomRoleAttr
 from ggrc.fulltext.attributes import FullTextAttr
 from ggrc.fulltext.mixin import Indexed
 
@@ -26,7 +30,7 @@ class RecordBuilder(object):
         tgt_class, '_fulltext_attrs')
     self.indexer = indexer
 
-  def _get_properties(self, obj):
+  def _get_properties(self, obj, skip_roles=False):
     """Get indexable properties and values.
 
     Properties should be returned in the following format:
@@ -39,6 +43,7 @@ class RecordBuilder(object):
       ...
     }
     If there is no subproperty - empty string is used as a key
+    Custom role properties are not built if skip_roles is set.
     """
     if obj.type == "Snapshot":
       # Snapshots do not have any indexable content. The object content for
@@ -60,6 +65,8 @@ class RecordBuilder(object):
     for attr in self._fulltext_attrs:
       if isinstance(attr, basestring):
         properties[property_tmpl.format(attr)] = {"": getattr(obj, attr)}
+      elif skip_roles and isinstance(attr, CustomRoleAttr):
+        continue
       elif isinstance(attr, FullTextAttr):
         properties.update(attr.get_property_for(obj))
     return properties
@@ -183,3 +190,179 @@ class RecordBuilder(object):
     properties = self._get_properties(obj)
     properties.update(self._get_cav_properties(obj))
     return properties
+
+  def _get_bulk_acl_properties(self, keys):
+    """Return custom role properties for all sent (type, id) keys.
+
+    Args:
+      keys: set of (object type, object id) tuples.
+
+    Returns:
+      dict with properties of every key that has people assigned to roles.
+    """
+    if not any(isinstance(attr, CustomRoleAttr)
+               for attr in self._fulltext_attrs):
+      return {}
+    acl = all_models.AccessControlList
+    acp = all_models.AccessControlPeople
+    acr = all_models.AccessControlRole
+    query = db.session.query(
+        acl.object_type,
+        acl.object_id,
+        acr.id,
+        acr.name,
+        acr.object_type,
+        Person.id,
+        Person.name,
+        Person.email,
+    ).join(
+        acr, acr.id == acl.ac_role_id,
+    ).join(
+        acp, acp.ac_list_id == acl.id,
+    ).join(
+        Person, Person.id == acp.person_id,
+    ).filter(
+        acl.object_type.in_({obj_type for obj_type, _ in keys}),
+        acl.object_id.in_({obj_id for _, obj_id in keys}),
+        acl.parent_id_nn == 0,
+        acr.internal.is_(False),
+    )
+    properties = collections.defaultdict(dict)
+    sort_emails = collections.defaultdict(
+        lambda: collections.defaultdict(list))
+    for row in query:
+      (obj_type, obj_id, role_id, role_name, role_object_type,
+       person_id, person_name, person_email) = row
+      if (obj_type, obj_id) not in keys:
+        continue
+      if obj_type != role_object_type:
+        LOGGER.warning("Reindex: role %s, id %s is skipped for %s, id %s, "
+                       "because it relates to %s", role_name, role_id,
+                       obj_type, obj_id, role_object_type)
+        continue
+      self.indexer.cache['people_map'][person_id] = (person_name,
+                                                     person_email)
+      role_props = properties[(obj_type, obj_id)].setdefault(role_name, {})
+      role_props["{}-email".format(person_id)] = person_email
+      role_props["{}-name".format(person_id)] = person_name
+      sort_emails[(obj_type, obj_id)][role_name].append(person_email)
+    for key, roles in sort_emails.iteritems():
+      for role_name, emails in roles.iteritems():
+        properties[key][role_name]["__sort__"] = u":".join(sorted(emails))
+    return properties
+
+  def _prefetch_people(self, person_ids):
+    """Add people missing in the people map cache with a single query."""
+    people_map = self.indexer.cache['people_map']
+    missing_ids = set(person_ids) - set(people_map)
+    if not missing_ids:
+      return
+    query = db.session.query(Person.id, Person.name, Person.email).filter(
+        Person.id.in_(missing_ids),
+    )
+    for person_id, name, email in query:
+      people_map[person_id] = (name, email)
+
+  def _get_bulk_cav_properties(self, model, keys):
+    """Return CAV properties for all sent (type, id) keys of the model.
+
+    Args:
+      model: custom attributable model.
+      keys: set of (object type, object id) tuples.
+
+    Returns:
+      dict with properties of every key.
+    """
+    # pylint: disable=too-many-locals
+    if not issubclass(model, CustomAttributable) or not keys:
+      return {}
+    cad = all_models.CustomAttributeDefinition
+    cav = all_models.CustomAttributeValue
+    # pylint: disable=protected-access
+    definition_type = model._inflector.table_singular
+    ids = {obj_id for _, obj_id in keys}
+
+    cads = collections.defaultdict(list)
+    cads_query = db.session.query(
+        cad.id,
+        cad.title,
+        cad.attribute_type,
+        cad.definition_id,
+    ).filter(
+        cad.definition_type == definition_type,
+        sa.or_(cad.definition_id.is_(None), cad.definition_id.in_(ids)),
+    )
+    for cad_row in cads_query:
+      cads[cad_row.definition_id].append(cad_row)
+    if not cads:
+      return {}
+
+    values = {}
+    cavs_query = db.session.query(
+        cav.attributable_type,
+        cav.attributable_id,
+        cav.custom_attribute_id,
+        cav.attribute_value,
+        cav.attribute_object_id,
+    ).filter(
+        cav.attributable_type.in_({obj_type for obj_type, _ in keys}),
+        cav.attributable_id.in_(ids),
+    )
+    for row in cavs_query:
+      values[(row.attributable_type, row.attributable_id,
+              row.custom_attribute_id)] = row
+    self._prefetch_people(
+        row.attribute_object_id for row in values.itervalues()
+        if row.attribute_object_id is not None
+    )
+    people_map = self.indexer.cache['people_map']
+
+    properties = {}
+    for obj_type, obj_id in keys:
+      obj_properties = properties[(obj_type, obj_id)] = {}
+      for cad_row in cads[None] + cads[obj_id]:
+        value = values.get((obj_type, obj_id, cad_row.id))
+        if cad_row.attribute_type == "Map:Person":
+          if value is None or value.attribute_value != "Person" or \
+             value.attribute_object_id not in people_map:
+            continue
+          person_id = value.attribute_object_id
+          person_name, person_email = people_map[person_id]
+          obj_properties[cad_row.title] = {
+              "{}-email".format(person_id): person_email,
+              "{}-name".format(person_id): person_name,
+              "__sort__": person_email,
+          }
+        else:
+          if value is not None:
+            attribute_value = value.attribute_value
+          else:
+            attribute_value = cad.get_default_value_for(
+                cad_row.attribute_type)
+          value_mapping = cad.ValidTypes.DEFAULT_VALUE_MAPPING.get(
+              cad_row.attribute_type) or {}
+          obj_properties[cad_row.title] = {
+              "": value_mapping.get(attribute_value, attribute_value),
+          }
+    return properties
+
+  def get_bulk_properties(self, model, instances):
+    """Generate record representations for instances of a single model.
+
+    Custom role and CAV properties are built for all instances at once with
+    set based queries, other properties are built for every instance.
+
+    Yields:
+      pairs of instance and its properties in the same format as returned by
+      get_properties.
+    """
+    instances = list(instances)
+    keys = {(obj.type, obj.id) for obj in instances}
+    acl_properties = self._get_bulk_acl_properties(keys)
+    cav_properties = self._get_bulk_cav_properties(model, keys)
+    for obj in instances:
+      key = (obj.type, obj.id)
+      properties = self._get_properties(obj, skip_roles=True)
+      properties.update(acl_properties.get(key, {}))
+      properties.update(cav_properties.get(key, {}))
+      yield obj, properties
@@ -0,0 +1,220 @@
+# Copyright (C) 2019 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""Resumable full text reindex of indexed models.
+
+Reindex progress is stored in reindex_checkpoints table. Every checkpoint
+covers a range of object ids of a single model and holds the last reindexed
+id, so an interrupted reindex continues from the place where it has stopped.
+All checkpoints of a single reindex run share the same started_at value. Once
+all ranges of a model are complete it is used by incremental reindex to skip
+objects that have not been changed since they were indexed.
+
+A worker claims a range before reindexing it and renews the claim with every
+committed chunk, so a range is never reindexed by two workers at once. Only
+the last completed run of every model is kept.
+"""
+
+import datetime
+import logging
+
+import sqlalchemy as sa
+
+from ggrc import db
+from ggrc import fulltext
+from ggrc.fulltext import mixin
+from ggrc.models import all_models
+from ggrc.models.maintenance import ReindexCheckpoint
+from ggrc.utils import benchmark
+
+
+logger = logging.getLogger(__name__)
+
+REINDEX_CHUNK_SIZE = 100
+
+# Claim of a range expires if its worker has not committed progress in time
+REINDEX_CLAIM_TIMEOUT = datetime.timedelta(minutes=10)
+
+
+def get_indexed_models():
+  """Get dict of all models that require global reindex."""
+  return {
+      m.__name__: m for m in all_models.all_models
+      if issubclass(m, mixin.Indexed) and m.REQUIRED_GLOBAL_REINDEX
+  }
+
+
+def get_unfinished_checkpoints():
+  """Get checkpoints of the interrupted reindex run."""
+  return ReindexCheckpoint.query.filter(
+      ReindexCheckpoint.is_complete.is_(False),
+  ).order_by(
+      ReindexCheckpoint.model_name,
+      ReindexCheckpoint.start_id,
+  ).all()
+
+
+def create_checkpoints(workers=1, chunk_size=REINDEX_CHUNK_SIZE):
+  """Create checkpoints for a new reindex run of all indexed models.
+
+  Args:
+    workers: number of id ranges the ids of every model are split into.
+    chunk_size: minimal number of ids in a single range.
+
+  Returns:
+    list of created checkpoints.
+  """
+  prune_checkpoints()
+  started_at = datetime.datetime.utcnow().replace(microsecond=0)
+  checkpoints = []
+  for model_name, model in sorted(get_indexed_models().items()):
+    min_id, max_id = db.session.query(
+        sa.func.min(model.id),
+        sa.func.max(model.id),
+    ).one()
+    if max_id is None:
+      continue
+    step = max((max_id - min_id) // workers + 1, chunk_size)
+    for start_id in range(min_id, max_id + 1, step):
+      checkpoints.append(ReindexCheckpoint(
+          model_name=model_name,
+          start_id=start_id,
+          end_id=min(start_id + step - 1, max_id),
+          last_id=start_id - 1,
+          started_at=started_at,
+      ))
+  db.session.add_all(checkpoints)
+  db.session.plain_commit()
+  return checkpoints
+
+
+def get_indexed_at(model_name):
+  """Get start time of the last reindex run completed for the model."""
+  checkpoint = ReindexCheckpoint
+  return db.session.query(
+      checkpoint.started_at,
+  ).filter(
+      checkpoint.model_name == model_name,
+  ).group_by(
+      checkpoint.started_at,
+  ).having(
+      sa.func.min(checkpoint.is_complete) == 1,
+  ).order_by(
+      checkpoint.started_at.desc(),
+  ).limit(1).scalar()
+
+
+def prune_checkpoints():
+  """Delete checkpoints of completed runs older than the last one."""
+  for model_name in get_indexed_models():
+    indexed_at = get_indexed_at(model_name)
+    if indexed_at is None:
+      continue
+    ReindexCheckpoint.query.filter(
+        ReindexCheckpoint.model_name == model_name,
+        ReindexCheckpoint.started_at < indexed_at,
+    ).delete(synchronize_session=False)
+  db.session.plain_commit()
+
+
+def claim_checkpoint(checkpoint, timeout=REINDEX_CLAIM_TIMEOUT):
+  """Claim an unfinished checkpoint range for the current worker.
+
+  The claim is an update of the checkpoint row conditioned on the range not
+  being complete or claimed by another active worker, so only one of the
+  workers racing for the range updates the row.
+
+  Returns:
+    True if the range has been claimed by this call.
+  """
+  table = ReindexCheckpoint.__table__
+  now = datetime.datetime.utcnow()
+  result = db.session.execute(table.update().where(sa.and_(
+      table.c.id == checkpoint.id,
+      table.c.is_complete.is_(False),
+      sa.or_(
+          table.c.claimed_at.is_(None),
+          table.c.claimed_at < now - timeout,
+      ),
+  )).values(claimed_at=now))
+  db.session.plain_commit()
+  if not result.rowcount:
+    return False
+  db.session.refresh(checkpoint)
+  return True
+
+
+def warm_indexer_cache():
+  """Fill indexer cache with data shared by records of all models."""
+  indexer = fulltext.get_indexer()
+  indexer.cache["people_map"] = {
+      p.id: (p.name, p.email) for p in db.session.query(
+          all_models.Person.id,
+          all_models.Person.name,
+          all_models.Person.email,
+      )
+  }
+  indexer.cache["ac_role_map"] = dict(db.session.query(
+      all_models.AccessControlRole.id,
+      all_models.AccessControlRole.name,
+  ))
+
+
+def _get_ids_query(model, end_id, indexed_at=None):
+  """Get query for ids to reindex up to end_id.
+
+  If indexed_at is set, objects that have not been updated since that time
+  and already have full text records are skipped.
+  """
+  query = db.session.query(model.id).filter(model.id <= end_id)
+  if indexed_at is not None and hasattr(model, "updated_at"):
+    record = fulltext.get_indexer().record_type
+    has_records = sa.exists().where(sa.and_(
+        record.key == model.id,
+        record.type == model.__name__,
+    ))
+    query = query.filter(sa.or_(
+        model.updated_at >= indexed_at,
+        ~has_records,
+    ))
+  return query.order_by(model.id)
+
+
+def reindex_checkpoint(checkpoint, incremental=False,
+                       chunk_size=REINDEX_CHUNK_SIZE):
+  """Reindex objects of the checkpoint range that are not handled yet.
+
+  Every chunk is committed together with the new checkpoint position. The
+  range is skipped if another worker has claimed it.
+
+  Args:
+    checkpoint: ReindexCheckpoint instance.
+    incremental: skip objects that have not been changed since the last
+      completed reindex of the model.
+    chunk_size: number of objects reindexed in a single transaction.
+  """
+  if not claim_checkpoint(checkpoint):
+    logger.info("Range %s of %s is reindexed by another worker",
+                checkpoint.id, checkpoint.model_name)
+    return
+  model_name = checkpoint.model_name
+  end_id = checkpoint.end_id
+  model = get_indexed_models().get(model_name)
+  if model is not None:
+    indexed_at = get_indexed_at(model_name) if incremental else None
+    query = _get_ids_query(model, end_id, indexed_at)
+    with benchmark("Create records for %s" % model_name):
+      while True:
+        ids = [id_ for id_, in query.filter(
+            model.id > checkpoint.last_id,
+        ).limit(chunk_size)]
+        if not ids:
+          break
+        model.bulk_record_update_for(ids)
+        checkpoint.last_id = ids[-1]
+        checkpoint.claimed_at = datetime.datetime.utcnow()
+        db.session.plain_commit()
+        logger.info("%s: %s / %s", model_name, ids[-1], end_id)
+  checkpoint.last_id = end_id
+  checkpoint.is_complete = True
+  db.session.plain_commit()
@@ -39,6 +39,18 @@ class SqlIndexer(object):
   def records_generator(self, instance):
     """Record generator method."""
     props = self.get_builder(instance.__class__).get_properties(instance)
+    return self._props_to_records(instance, props)
+
+  def bulk_records_generator(self, model, instances):
+    """Record generator for a chunk of instances of the given model."""
+    builder = self.get_builder(model)
+    for instance, props in builder.get_bulk_properties(model, instances):
+      for record in self._props_to_records(instance, props):
+        yield record
+
+  @staticmethod
+  def _props_to_records(instance, props):
+    """Convert properties of the instance into record dicts."""
     for prop, value in props.iteritems():
       for subproperty, content in value.iteritems():
         if content is not None:
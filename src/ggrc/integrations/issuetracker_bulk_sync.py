@@ -17,6 +17,7 @@ from ggrc.app import app
 from ggrc.integrations import integrations_errors, issues
 from ggrc.integrations.synchronization_jobs import sync_utils
 from ggrc.models import all_models, inflector
+from ggrc.models import latest_revision
 from ggrc.models import exceptions as ggrc_exceptions
 from ggrc.models.hooks.issue_tracker import integration_utils
 from ggrc.models.hooks.issue_tracker import assessment_integration
@@ -422,6 +423,7 @@ class IssueTrackerBulkCreator(object):
     ]
     inserter = all_models.Revision.__table__.insert()
     db.session.execute(inserter.values(revision_data))
+    latest_revision.update_for_payload(revision_data)
 
   @staticmethod
   def make_response(errors):
@@ -15,6 +15,7 @@ from ggrc import migrate
 from ggrc import settings
 from ggrc.models.maintenance import Maintenance
 from ggrc.models.maintenance import MigrationLog
+from ggrc.utils import maintenance_state
 
 from google.appengine.api import users
 from google.appengine.ext import deferred
@@ -78,6 +79,7 @@ def trigger_migration():
       maint_row = Maintenance(under_maintenance=True)
       db.session.add(maint_row)
     db.session.plain_commit()
+    maintenance_state.invalidate()
   except sqlalchemy.exc.ProgrammingError as e:
     if re.search(r"""\(1146, "Table '.+' doesn't exist"\)$""", e.message):
       mig_row = None
@@ -119,6 +121,7 @@ def _turn_off_maintenance_mode():
     db_row.under_maintenance = False
     db.session.add(db_row)
     db.session.commit()
+    maintenance_state.invalidate()
     return "Maintenance mode turned off successfully"
   return "Maintenance mode has was not turned on."
 
@@ -0,0 +1,67 @@
+# Copyright (C) 2019 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""
+Add export_blocks and import_export_chunks tables
+
+Create Date: 2019-02-15 12:00:00.000000
+"""
+# disable Invalid constant name pylint warning for mandatory Alembic variables.
+# pylint: disable=invalid-name
+
+import sqlalchemy as sa
+from sqlalchemy.dialects import mysql
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '3f2b6a1c9d47'
+down_revision = '57b14cb4a7b4'
+
+
+def upgrade():
+  """Upgrade database schema and/or data, creating a new revision."""
+  op.create_table(
+      'export_blocks',
+      sa.Column('id', sa.Integer(), nullable=False),
+      sa.Column('import_export_id', sa.Integer(), nullable=False),
+      sa.Column('block_index', sa.Integer(), nullable=False),
+      sa.Column('table_width', sa.Integer(), nullable=True),
+      sa.ForeignKeyConstraint(
+          ['import_export_id'], ['import_exports.id'],
+          name='fk_export_blocks_import_export_id',
+          ondelete='CASCADE',
+      ),
+      sa.PrimaryKeyConstraint('id'),
+  )
+  op.create_table(
+      'import_export_chunks',
+      sa.Column('id', sa.Integer(), nullable=False),
+      sa.Column('import_export_id', sa.Integer(), nullable=False),
+      sa.Column('export_block_id', sa.Integer(), nullable=True),
+      sa.Column('seq', sa.Integer(), nullable=False),
+      sa.Column('data', mysql.LONGTEXT(), nullable=False),
+      sa.ForeignKeyConstraint(
+          ['import_export_id'], ['import_exports.id'],
+          name='fk_import_export_chunks_import_export_id',
+          ondelete='CASCADE',
+      ),
+      sa.ForeignKeyConstraint(
+          ['export_block_id'], ['export_blocks.id'],
+          name='fk_import_export_chunks_export_block_id',
+          ondelete='CASCADE',
+      ),
+      sa.PrimaryKeyConstraint('id'),
+  )
+  op.create_index(
+      'ix_import_export_chunks_seq',
+      'import_export_chunks',
+      ['import_export_id', 'export_block_id', 'seq'],
+  )
+
+
+def downgrade():
+  """Downgrade database schema and/or data back to the previous revision."""
+  op.drop_table('import_export_chunks')
+  op.drop_table('export_blocks')
@@ -0,0 +1,41 @@
+# Copyright (C) 2019 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""
+Add revision_contents table
+
+Create Date: 2019-02-18 10:00:00.000000
+"""
+# disable Invalid constant name pylint warning for mandatory Alembic variables.
+# pylint: disable=invalid-name
+
+import sqlalchemy as sa
+from sqlalchemy.dialects import mysql
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '8a4d2c6e1b93'
+down_revision = '3f2b6a1c9d47'
+
+
+def upgrade():
+  """Upgrade database schema and/or data, creating a new revision."""
+  op.create_table(
+      'revision_contents',
+      sa.Column('revision_id', sa.Integer(), nullable=False),
+      sa.Column('version', sa.String(length=250), nullable=False),
+      sa.Column('content', mysql.LONGTEXT(), nullable=False),
+      sa.ForeignKeyConstraint(
+          ['revision_id'], ['revisions.id'],
+          name='fk_revision_contents_revision_id',
+          ondelete='CASCADE',
+      ),
+      sa.PrimaryKeyConstraint('revision_id'),
+  )
+
+
+def downgrade():
+  """Downgrade database schema and/or data back to the previous revision."""
+  op.drop_table('revision_contents')
@@ -0,0 +1,45 @@
+# Copyright (C) 2019 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""
+Add reindex_checkpoints table
+
+Create Date: 2019-02-19 10:00:00.000000
+"""
+# disable Invalid constant name pylint warning for mandatory Alembic variables.
+# pylint: disable=invalid-name
+
+import sqlalchemy as sa
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '5c7e9a1f3b26'
+down_revision = '8a4d2c6e1b93'
+
+
+def upgrade():
+  """Upgrade database schema and/or data, creating a new revision."""
+  op.create_table(
+      'reindex_checkpoints',
+      sa.Column('id', sa.Integer(), nullable=False),
+      sa.Column('model_name', sa.String(length=250), nullable=False),
+      sa.Column('start_id', sa.Integer(), nullable=False),
+      sa.Column('end_id', sa.Integer(), nullable=False),
+      sa.Column('last_id', sa.Integer(), nullable=False),
+      sa.Column('started_at', sa.DateTime(), nullable=False),
+      sa.Column('is_complete', sa.Boolean(), nullable=False),
+      sa.Column('claimed_at', sa.DateTime(), nullable=True),
+      sa.PrimaryKeyConstraint('id'),
+  )
+  op.create_index(
+      'ix_reindex_checkpoints_model_name',
+      'reindex_checkpoints',
+      ['model_name', 'started_at'],
+  )
+
+
+def downgrade():
+  """Downgrade database schema and/or data back to the previous revision."""
+  op.drop_table('reindex_checkpoints')
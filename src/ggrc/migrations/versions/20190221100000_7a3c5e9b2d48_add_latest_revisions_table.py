@@ -0,0 +1,55 @@
+# Copyright (C) 2019 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""
+Add latest_revisions table
+
+Create Date: 2019-02-21 10:00:00.000000
+"""
+# disable Invalid constant name pylint warning for mandatory Alembic variables.
+# pylint: disable=invalid-name
+
+import sqlalchemy as sa
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '7a3c5e9b2d48'
+down_revision = '5c7e9a1f3b26'
+
+
+def upgrade():
+  """Upgrade database schema and/or data, creating a new revision."""
+  op.create_table(
+      'latest_revisions',
+      sa.Column('resource_type', sa.String(length=250), nullable=False),
+      sa.Column('resource_id', sa.Integer(), nullable=False,
+                autoincrement=False),
+      sa.Column('revision_id', sa.Integer(), nullable=False),
+      sa.Column('action', sa.Enum(u'created', u'modified', u'deleted'),
+                nullable=False),
+      sa.ForeignKeyConstraint(
+          ['revision_id'], ['revisions.id'],
+          name='fk_latest_revisions_revision_id',
+          ondelete='CASCADE',
+      ),
+      sa.PrimaryKeyConstraint('resource_type', 'resource_id'),
+  )
+  op.execute("""
+      INSERT INTO latest_revisions (
+          resource_type, resource_id, revision_id, action
+      )
+      SELECT r.resource_type, r.resource_id, r.id, r.action
+      FROM revisions AS r
+      JOIN (
+          SELECT max(id) AS id
+          FROM revisions
+          GROUP BY resource_type, resource_id
+      ) AS latest ON latest.id = r.id
+  """)
+
+
+def downgrade():
+  """Downgrade database schema and/or data back to the previous revision."""
+  op.drop_table('latest_revisions')
@@ -0,0 +1,56 @@
+# Copyright (C) 2019 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""
+Add checkpoint to background operations and create_snapshots operation type
+
+Create Date: 2019-02-22 10:00:00.000000
+"""
+# disable Invalid constant name pylint warning for mandatory Alembic variables.
+# pylint: disable=invalid-name
+
+import sqlalchemy as sa
+
+from alembic import op
+
+from ggrc.migrations.utils import migrator
+
+
+# revision identifiers, used by Alembic.
+revision = '9b1d4f6a8c35'
+down_revision = '7a3c5e9b2d48'
+
+
+def upgrade():
+  """Upgrade database schema and/or data, creating a new revision."""
+  op.add_column(
+      'background_operations',
+      sa.Column('checkpoint', sa.Text(), nullable=True),
+  )
+  connection = op.get_bind()
+  migrator_id = migrator.get_migration_user_id(connection)
+  connection.execute(
+      sa.text("""
+          INSERT INTO background_operation_types(
+            `name`, modified_by_id, created_at, updated_at
+          )
+          VALUES('create_snapshots', :migrator_id, now(), now());
+      """),
+      migrator_id=migrator_id,
+  )
+
+
+def downgrade():
+  """Downgrade database schema and/or data back to the previous revision."""
+  op.execute("""
+      DELETE bo
+      FROM background_operations AS bo
+      JOIN background_operation_types AS bot
+          ON bot.id = bo.bg_operation_type_id
+      WHERE bot.name = 'create_snapshots'
+  """)
+  op.execute("""
+      DELETE FROM background_operation_types
+      WHERE name = 'create_snapshots'
+  """)
+  op.drop_column('background_operations', 'checkpoint')
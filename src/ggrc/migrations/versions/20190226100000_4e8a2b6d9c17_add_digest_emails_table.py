@@ -0,0 +1,44 @@
+# Copyright (C) 2019 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""
+Add digest_emails table
+
+Create Date: 2019-02-26 10:00:00.000000
+"""
+# disable Invalid constant name pylint warning for mandatory Alembic variables.
+# pylint: disable=invalid-name
+
+import sqlalchemy as sa
+
+from alembic import op
+from sqlalchemy.dialects import mysql
+
+
+# revision identifiers, used by Alembic.
+revision = '4e8a2b6d9c17'
+down_revision = '9b1d4f6a8c35'
+
+
+def upgrade():
+  """Upgrade database schema and/or data, creating a new revision."""
+  op.create_table(
+      'digest_emails',
+      sa.Column('id', sa.Integer(), nullable=False),
+      sa.Column('started_at', sa.DateTime(), nullable=False),
+      sa.Column('shard', sa.Integer(), nullable=False),
+      sa.Column('email', sa.String(length=250), nullable=False),
+      sa.Column('subject', sa.String(length=250), nullable=False),
+      sa.Column('body', mysql.LONGTEXT(), nullable=False),
+      sa.PrimaryKeyConstraint('id'),
+  )
+  op.create_index(
+      'ix_digest_emails_started_at_shard',
+      'digest_emails',
+      ['started_at', 'shard'],
+  )
+
+
+def downgrade():
+  """Downgrade database schema and/or data back to the previous revision."""
+  op.drop_table('digest_emails')
@@ -44,11 +44,14 @@ from ggrc.models.document import Document
 from ggrc.models.event import Event
 from ggrc.models.evidence import Evidence
 from ggrc.models.facility import Facility
+from ggrc.models.import_export import ContentChunk
+from ggrc.models.import_export import ExportBlock
 from ggrc.models.import_export import ImportExport
 from ggrc.models.issue import Issue
 from ggrc.models.issuetracker_issue import IssuetrackerIssue
 from ggrc.models.key_report import KeyReport
 from ggrc.models.label import Label
+from ggrc.models.latest_revision import LatestRevision
 from ggrc.models.maintenance import Maintenance
 from ggrc.models.market import Market
 from ggrc.models.metric import Metric
@@ -109,6 +112,7 @@ all_models = [  # pylint: disable=invalid-name
     Categorization,
     CategoryBase,
     Comment,
+    ContentChunk,
     Context,
     Contract,
     Control,
@@ -121,12 +125,14 @@ all_models = [  # pylint: disable=invalid-name
     Document,
     Event,
     Evidence,
+    ExportBlock,
     Facility,
     ImportExport,
     Issue,
     IssuetrackerIssue,
     KeyReport,
     Label,
+    LatestRevision,
     Maintenance,
     Market,
     Metric,
@@ -4,6 +4,7 @@
 """Module for ggrc background operations."""
 from ggrc import db
 from ggrc.models import mixins
+from ggrc.models.types import JsonType
 
 
 class BackgroundOperation(mixins.Base, db.Model):
@@ -18,5 +19,7 @@ class BackgroundOperation(mixins.Base, db.Model):
   object_type = db.Column(db.String, nullable=False)
   object_id = db.Column(db.Integer, nullable=False)
   bg_task_id = db.Column(db.Integer, db.ForeignKey('background_tasks.id'))
+  # Progress of a resumable operation, the format depends on the operation
+  checkpoint = db.Column(JsonType, nullable=True)
 
   bg_operation_type = db.relationship("BackgroundOperationType")
@@ -306,10 +306,41 @@ def bg_operation_running(operation_type, object_type, object_id):
   return db.session.query(tasks.exists()).scalar()
 
 
+class RetryTask(Exception):
+  """Exception raised by a queued task that should be run again.
+
+  The task queue retries the same BackgroundTask, so the task can continue
+  from the state stored in its BackgroundOperation.
+  """
+
+
+def _can_retry():
+  """Check if the task queue retries the current task request on failure."""
+  if not getattr(settings, "APP_ENGINE", False):
+    return False
+  retry_count = request.headers.get("X-Appengine-Taskretrycount")
+  if retry_count is None:
+    return False
+  return int(retry_count) < RETRY_OPTIONS["task_retry_limit"]
+
+
 def queued_task(func):
-  """Decorator for task queues."""
+  """Decorator for task queues.
+
+  Failed tasks are not retried unless they raise RetryTask.
+  """
   from ggrc.app import app
 
+  def fail(task):
+    """Store the failure of the task and respond without a retry."""
+    logger.exception("Task failed")
+    task.finish("Failure", app.make_response((
+        traceback.format_exc(), 200, [('Content-Type', 'text/html')])))
+
+    # Return 200 so that the task is not retried
+    return app.make_response((
+        'failure', 200, [('Content-Type', 'text/html')]))
+
   @wraps(func)
   def decorated_view(*args, **_):
     """Background task runner.
@@ -329,16 +360,17 @@ def queued_task(func):
     task.start()
     try:
       result = func(task)
+    except RetryTask:
+      if not _can_retry():
+        return fail(task)
+      logger.exception("Task failed, it will be retried")
+      db.session.rollback()
+      return app.make_response((
+          'retry', 503, [('Content-Type', 'text/html')]))
     except:  # pylint: disable=bare-except
       # Bare except is allowed here so that we can respond with the correct
       # message to all exceptions.
-      logger.exception("Task failed")
-      task.finish("Failure", app.make_response((
-          traceback.format_exc(), 200, [('Content-Type', 'text/html')])))
-
-      # Return 200 so that the task is not retried
-      return app.make_response((
-          'failure', 200, [('Content-Type', 'text/html')]))
+      return fail(task)
     task.finish("Success", result)
     return result
   return decorated_view
@@ -14,6 +14,8 @@ from ggrc.models.hooks import relationship
 from ggrc.models.hooks import acl
 from ggrc.models.hooks import proposal
 from ggrc.models.hooks import access_control_role
+from ggrc.models.hooks import permissions
+from ggrc.models.hooks import revision_content
 
 
 ALL_HOOKS = [
@@ -26,6 +28,8 @@ ALL_HOOKS = [
     custom_attribute_definition,
     acl,
     common,
+    revision_content,
+    permissions,
 
     # Keep IssueTracker at the end of list to make sure that all other hooks
     # are already executed and all data is final.
@@ -41,6 +41,20 @@ def add_relationships(relationship_ids):
   _add_or_update("deleted_objects", set())
 
 
+def add_acls(acl_ids):
+  """Add extra ACL entries to propagation queue.
+
+  This function is needed to allow propagation of ACL entries created from
+  raw SQL statements, such as ACL entries of cycles built in bulk.
+
+  Args:
+    acl_ids: set of ids of new ACL entries.
+  """
+  _add_or_update("new_acl_ids", acl_ids)
+  _add_or_update("new_relationship_ids", set())
+  _add_or_update("deleted_objects", set())
+
+
 def _get_propagation_entries(session):
   """Get object ids for objects that affect propagation.
 
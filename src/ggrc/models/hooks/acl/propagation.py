@@ -18,6 +18,7 @@ from ggrc import login
 from ggrc import utils
 from ggrc.utils import helpers
 from ggrc.access_control import utils as acl_utils
+from ggrc.cache import utils as cache_utils
 from ggrc.models import all_models
 from ggrc.models.hooks import access_control_role
 
@@ -296,6 +297,73 @@ def _propagate_relationships(relationship_ids, new_acl_ids, user_id):
   _propagate(child_ids, user_id)
 
 
+def _get_descendant_acl_ids(acl_ids):
+  """Get ids of ACL entries propagated from the given entries."""
+  acl_table = all_models.AccessControlList.__table__
+  all_ids = set(acl_ids)
+  for _ in range(PROPAGATION_DEPTH_LIMIT):
+    child_ids = set()
+    for ids_chunk in utils.list_chunks(list(acl_ids)):
+      child_ids.update(row.id for row in db.session.execute(
+          sa.select([acl_table.c.id]).where(
+              acl_table.c.parent_id.in_(ids_chunk)
+          )
+      ))
+    acl_ids = child_ids - all_ids
+    if not acl_ids:
+      break
+    all_ids.update(acl_ids)
+  return all_ids
+
+
+def _track_deleted_acl_people(deleted_objects):
+  """Track people losing access with ACL entries of deleted objects.
+
+  ACL entries of deleted objects and entries propagated from them are removed
+  with raw SQL and a foreign key cascade, so no ORM events track the people
+  who lose access through them. Base ACL entries of deleted objects are
+  deleted by the ORM before their people can be found, so permissions of all
+  users are dropped in that case.
+  """
+  if not cache_utils.has_memcache():
+    return
+  if any(obj_type == all_models.AccessControlList.__name__
+         for obj_type, _ in deleted_objects):
+    cache_utils.track_all_permissions()
+    return
+
+  acl_table = all_models.AccessControlList.__table__
+  acp_table = all_models.AccessControlPerson.__table__
+  acl_ids = {row.id for row in db.session.execute(
+      sa.select([acl_table.c.id]).where(
+          sa.tuple_(
+              acl_table.c.object_type,
+              acl_table.c.object_id
+          ).in_(
+              deleted_objects
+          )
+      )
+  )}
+  if not acl_ids:
+    return
+  acl_ids = _get_descendant_acl_ids(acl_ids)
+  for ids_chunk in utils.list_chunks(list(acl_ids)):
+    query = sa.select([
+        acp_table.c.person_id,
+        acl_table.c.object_type,
+    ]).select_from(
+        acl_table.join(
+            acp_table,
+            acp_table.c.ac_list_id == acl_table.c.base_id,
+        )
+    ).where(
+        acl_table.c.id.in_(ids_chunk)
+    ).distinct()
+    for person_id, object_type in db.session.execute(query):
+      cache_utils.track_permission_segment(
+          person_id, cache_utils.get_acl_segment(object_type))
+
+
 def _delete_orphan_acl_entries(deleted_objects):
   """Delete ACL entries for deleted objects.
 
@@ -307,6 +375,7 @@ def _delete_orphan_acl_entries(deleted_objects):
   if not deleted_objects:
     return
 
+  _track_deleted_acl_people(deleted_objects)
   acl_table = all_models.AccessControlList.__table__
   db.session.execute(
       acl_table.delete().where(
@@ -405,6 +474,7 @@ def _add_missing_acl_entries():
 def propagate_all():
   """Re-evaluate propagation for all objects."""
   with utils.benchmark("Run propagate_all"):
+    cache_utils.track_all_permissions()
     with utils.benchmark("Add missing acl entries"):
       _add_missing_acl_entries()
     with utils.benchmark("Get non propagated acl ids"):
@@ -427,3 +497,4 @@ def propagate_all():
         flask.g.new_relationship_ids = set()
         flask.g.deleted_objects = set()
         propagate()
+    cache_utils.clear_changed_permissions()
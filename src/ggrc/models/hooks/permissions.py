@@ -0,0 +1,34 @@
+# Copyright (C) 2019 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""Hooks tracking changes that make cached user permissions outdated.
+
+Changes are collected during the request and the affected permission
+segments are dropped from memcache after the commit, once ACL propagation
+has been done.
+"""
+
+import sqlalchemy as sa
+
+from ggrc.cache import utils as cache_utils
+from ggrc.models import all_models
+
+
+def handle_acp_change(mapper, connection, target):
+  # pylint: disable=unused-argument
+  """Track assignment or removal of a person from an ACL entry."""
+  cache_utils.track_acl_people([(target.person_id, target.ac_list_id)])
+
+
+def handle_acr_change(mapper, connection, target):
+  # pylint: disable=unused-argument
+  """Track change of a role, which can affect permissions of any user."""
+  cache_utils.track_all_permissions()
+
+
+def init_hook():
+  """Initialize hooks tracking permission changes."""
+  for event in ("after_insert", "after_update", "after_delete"):
+    sa.event.listen(all_models.AccessControlPerson, event, handle_acp_change)
+  for event in ("after_update", "after_delete"):
+    sa.event.listen(all_models.AccessControlRole, event, handle_acr_change)
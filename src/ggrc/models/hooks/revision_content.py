@@ -0,0 +1,17 @@
+# Copyright (C) 2019 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""Hooks that keep version stamps of populated revision contents fresh."""
+
+import sqlalchemy as sa
+
+from ggrc.models import all_models
+from ggrc.models import revision_content
+
+
+def init_hook():
+  """Initialize populated revision content hooks."""
+  for model in (all_models.AccessControlRole,
+                all_models.CustomAttributeDefinition):
+    for event in ("after_insert", "after_update", "after_delete"):
+      sa.event.listen(model, event, revision_content.invalidate_versions)
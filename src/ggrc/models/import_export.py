@@ -3,10 +3,12 @@
 
 """ ImportExport model."""
 
+import itertools
 import json
 from datetime import datetime, timedelta
 from logging import getLogger
 
+import sqlalchemy as sa
 from sqlalchemy.dialects import mysql
 
 from ggrc import db
@@ -61,7 +63,7 @@ class ImportExport(Identifiable, db.Model):
                                uselist=False)
   results = db.Column(mysql.LONGTEXT)
   title = db.Column(db.Text)
-  content = db.Column(mysql.LONGTEXT)
+  content = db.deferred(db.Column(mysql.LONGTEXT))
   gdrive_metadata = db.Column('gdrive_metadata', db.Text)
 
   def log_json(self, is_default=False):
@@ -85,6 +87,48 @@ class ImportExport(Identifiable, db.Model):
     return res
 
 
+class ExportBlock(Identifiable, db.Model):
+  """Single block of an export job built in parallel."""
+
+  __tablename__ = 'export_blocks'
+
+  import_export_id = db.Column(
+      db.Integer,
+      db.ForeignKey('import_exports.id', ondelete='CASCADE'),
+      nullable=False,
+  )
+  block_index = db.Column(db.Integer, nullable=False)
+  # Width of the block csv table, it is set when the block is finished
+  table_width = db.Column(db.Integer)
+
+
+class ContentChunk(Identifiable, db.Model):
+  """Chunk of the csv content of an export job or of one of its blocks."""
+
+  __tablename__ = 'import_export_chunks'
+
+  import_export_id = db.Column(
+      db.Integer,
+      db.ForeignKey('import_exports.id', ondelete='CASCADE'),
+      nullable=False,
+  )
+  export_block_id = db.Column(
+      db.Integer,
+      db.ForeignKey('export_blocks.id', ondelete='CASCADE'),
+  )
+  seq = db.Column(db.Integer, nullable=False)
+  data = db.Column(mysql.LONGTEXT, nullable=False)
+
+  @staticmethod
+  def _extra_table_args(_):
+    return (
+        db.Index("ix_import_export_chunks_seq",
+                 "import_export_id",
+                 "export_block_id",
+                 "seq"),
+    )
+
+
 def create_import_export_entry(**kwargs):
   """Create ImportExport entry"""
   meta = json.dumps(kwargs['gdrive_metadata']) if 'gdrive_metadata' in kwargs \
@@ -105,6 +149,76 @@ def create_import_export_entry(**kwargs):
   return ie_job
 
 
+def _chunks_filter(ie_id, block_id):
+  """Get the condition for chunks of an export job or of its block."""
+  table = ContentChunk.__table__
+  if block_id is None:
+    block_filter = table.c.export_block_id.is_(None)
+  else:
+    block_filter = table.c.export_block_id == block_id
+  return sa.and_(table.c.import_export_id == ie_id, block_filter)
+
+
+def content_writer(ie_id, block_id=None):
+  """Get a callable that writes the content of an export in chunks.
+
+  Previously written chunks are deleted first. Every chunk passed to the
+  returned callable is stored in a separate row, so the whole content is
+  never held in memory and the stored data is never rewritten.
+
+  Args:
+    ie_id: id of ImportExport entry.
+    block_id: id of ExportBlock entry if the content of a block is written.
+  """
+  table = ContentChunk.__table__
+  db.session.execute(table.delete().where(_chunks_filter(ie_id, block_id)))
+  seq = itertools.count()
+
+  def write(chunk):
+    db.session.execute(table.insert().values(
+        import_export_id=ie_id,
+        export_block_id=block_id,
+        seq=next(seq),
+        data=chunk,
+    ))
+
+  return write
+
+
+def iter_content(ie_id, block_id=None, batch_size=10):
+  """Read the chunks of an export content in the order they were written."""
+  table = ContentChunk.__table__
+  last_seq = -1
+  while True:
+    rows = db.session.execute(
+        sa.select([table.c.seq, table.c.data]).where(sa.and_(
+            _chunks_filter(ie_id, block_id),
+            table.c.seq > last_seq,
+        )).order_by(table.c.seq).limit(batch_size)
+    ).fetchall()
+    if not rows:
+      return
+    for row in rows:
+      yield row.data
+    last_seq = rows[-1].seq
+
+
+def get_content(ie_job):
+  """Get the content of ImportExport entry joined from its chunks.
+
+  Import jobs and exports finished before the content was stored in chunks
+  keep the content in the entry itself.
+  """
+  return u"".join(iter_content(ie_job.id)) or ie_job.content or u""
+
+
+def delete_export_blocks(ie_id):
+  """Delete blocks of a parallel export together with their chunks."""
+  ExportBlock.query.filter_by(
+      import_export_id=ie_id
+  ).delete(synchronize_session=False)
+
+
 def get_jobs(job_type, ids=None):
   """Get list of jobs by type and/or ids"""
   conditions = [ImportExport.created_by == get_current_user(),
@@ -0,0 +1,174 @@
+# Copyright (C) 2019 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""Pointers to the latest revision of every object.
+
+Finding the latest revision of an object in revisions table requires a
+max(id) aggregate over all revisions of the object. latest_revisions table
+keeps id and action of the latest revision of every object. It is updated in
+the same transaction as the revisions are inserted, so latest revisions are
+looked up by primary key.
+
+Revisions added to the session are handled by an after_flush listener,
+revisions inserted with bulk statements have to be passed to
+`update_for_payload`.
+"""
+
+import collections
+
+import sqlalchemy as sa
+from sqlalchemy.orm.session import Session
+from sqlalchemy.sql.expression import tuple_
+
+from ggrc import db
+from ggrc.models.inflector import ModelInflectorDescriptor
+from ggrc.utils import list_chunks
+
+
+# pylint: disable=too-few-public-methods
+class LatestRevision(db.Model):
+  """Db model for storing the latest revision of an object."""
+  __tablename__ = "latest_revisions"
+
+  resource_type = db.Column(db.String, primary_key=True)
+  resource_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+  revision_id = db.Column(
+      db.Integer,
+      db.ForeignKey("revisions.id", ondelete="CASCADE"),
+      nullable=False,
+  )
+  action = db.Column(db.Enum(u"created", u"modified", u"deleted"),
+                     nullable=False)
+
+  _inflector = ModelInflectorDescriptor()
+
+
+# Assignments of ON DUPLICATE KEY UPDATE are evaluated from left to right, so
+# action has to be compared with the old revision_id before it is replaced.
+_UPSERT_SQL = sa.text("""
+    INSERT INTO latest_revisions (
+        resource_type, resource_id, revision_id, action
+    )
+    VALUES (:resource_type, :resource_id, :revision_id, :action)
+    ON DUPLICATE KEY UPDATE
+        action = IF(VALUES(revision_id) > revision_id,
+                    VALUES(action), action),
+        revision_id = GREATEST(revision_id, VALUES(revision_id))
+""")
+
+
+def _store(rows):
+  """Point objects to the newest of the given revisions.
+
+  Args:
+    rows: iterable of (resource_type, resource_id, revision_id, action)
+      tuples.
+  """
+  latest = {}
+  for resource_type, resource_id, revision_id, action in rows:
+    key = (resource_type, resource_id)
+    if key not in latest or latest[key][0] < revision_id:
+      latest[key] = (revision_id, action)
+  if not latest:
+    return
+  db.session.execute(_UPSERT_SQL, [
+      {
+          "resource_type": resource_type,
+          "resource_id": resource_id,
+          "revision_id": revision_id,
+          "action": action,
+      }
+      for (resource_type, resource_id), (revision_id, action)
+      in latest.iteritems()
+  ])
+
+
+def update_for_revisions(revisions):
+  """Update pointers for flushed Revision instances."""
+  _store(
+      (rev.resource_type, rev.resource_id, rev.id, rev.action)
+      for rev in revisions
+  )
+
+
+def update_for_payload(payload):
+  """Update pointers for revisions inserted with a bulk insert statement.
+
+  Args:
+    payload: list of dicts with revision values used for the insert, the
+      inserted revisions are found by their event ids and resources.
+  """
+  from ggrc.models.revision import Revision
+  stubs_by_event = collections.defaultdict(set)
+  for row in payload:
+    stubs_by_event[row["event_id"]].add(
+        (row["resource_type"], row["resource_id"]))
+  rows = []
+  for event_id, stubs in stubs_by_event.iteritems():
+    for chunk in list_chunks(list(stubs)):
+      rows.extend(db.session.query(
+          Revision.resource_type,
+          Revision.resource_id,
+          Revision.id,
+          Revision.action,
+      ).filter(
+          Revision.event_id == event_id,
+          tuple_(Revision.resource_type, Revision.resource_id).in_(chunk),
+      ))
+  _store(rows)
+
+
+def get_latest_query(stubs=None, filters=None):
+  """Get query of latest revision ids of objects.
+
+  Args:
+    stubs: collection of (type, id) tuples, all objects are queried if it is
+      not given.
+    filters: predicates on the latest Revision, objects whose latest revision
+      does not match them are skipped.
+
+  Returns:
+    query of (revision_id, resource_type, resource_id) tuples.
+  """
+  from ggrc.models.revision import Revision
+  query = db.session.query(
+      LatestRevision.revision_id,
+      LatestRevision.resource_type,
+      LatestRevision.resource_id,
+  )
+  if stubs is not None:
+    query = query.filter(tuple_(
+        LatestRevision.resource_type,
+        LatestRevision.resource_id,
+    ).in_(stubs))
+  if filters:
+    query = query.join(
+        Revision, Revision.id == LatestRevision.revision_id
+    ).filter(*filters)
+  return query
+
+
+def get_latest_ids(stubs):
+  """Get latest revision ids of objects.
+
+  Returns:
+    dict with revision ids by (type, id) tuples.
+  """
+  result = {}
+  for chunk in list_chunks(list(stubs)):
+    result.update(
+        ((resource_type, resource_id), revision_id)
+        for revision_id, resource_type, resource_id in get_latest_query(chunk)
+    )
+  return result
+
+
+def handle_after_flush(session, _):
+  """Update pointers for all revisions inserted by the flush."""
+  from ggrc.models.revision import Revision
+  revisions = [obj for obj in session.new if isinstance(obj, Revision)]
+  if revisions:
+    update_for_revisions(revisions)
+
+
+sa.event.listen(Session, "after_flush", handle_after_flush)
@@ -43,3 +43,24 @@ class ReindexLog(Identifiable, db.Model):
 
   is_reindex_complete = db.Column(db.Boolean, nullable=False, default=True)
   log = db.Column(db.String)
+
+
+class ReindexCheckpoint(Identifiable, db.Model):
+  """Model holds full text reindex progress for a range of object ids."""
+  __tablename__ = 'reindex_checkpoints'
+
+  model_name = db.Column(db.String(250), nullable=False)
+  start_id = db.Column(db.Integer, nullable=False)
+  end_id = db.Column(db.Integer, nullable=False)
+  last_id = db.Column(db.Integer, nullable=False)
+  started_at = db.Column(db.DateTime, nullable=False)
+  is_complete = db.Column(db.Boolean, nullable=False, default=False)
+  # Time of the last progress of the worker that reindexes the range
+  claimed_at = db.Column(db.DateTime)
+
+  @staticmethod
+  def _extra_table_args(_):
+    return (
+        db.Index('ix_reindex_checkpoints_model_name',
+                 'model_name', 'started_at'),
+    )
@@ -21,7 +21,9 @@ from datetime import datetime
 from logging import getLogger
 
 from sqlalchemy import orm
+from sqlalchemy.ext.associationproxy import AssociationProxy
 from sqlalchemy.ext.declarative import declared_attr
+from sqlalchemy.orm.attributes import InstrumentedAttribute
 
 from ggrc import builder
 from ggrc import db
@@ -87,6 +89,37 @@ class Identifiable(object):
           .undefer_group(inclusion_class.__name__ + '_complete'))
     return query.options(*options)
 
+  @classmethod
+  def projection_query(cls, fields):
+    """Query that loads only the data needed to publish the given fields.
+
+    Own columns are loaded the same way as in eager_query, but only the
+    relationships required for the requested fields are loaded eagerly.
+    Relationships that are not published directly can be listed in
+    `_projection_loads` as `field name -> relationship paths` dict.
+    """
+    mapper_class = cls._sa_class_manager.mapper.base_mapper.class_
+    query = db.session.query(cls).options(
+        db.Load(mapper_class).undefer_group(
+            mapper_class.__name__ + '_complete'),
+    )
+    projection_loads = AttributeInfo.gather_attr_dicts(
+        cls, '_projection_loads')
+    options = []
+    for field in fields:
+      if field in projection_loads:
+        options.extend(orm.subqueryload_all(path)
+                       for path in projection_loads[field])
+        continue
+      class_attr = getattr(cls, field, None)
+      if isinstance(class_attr, AssociationProxy):
+        options.append(orm.subqueryload(class_attr.local_attr.key))
+      elif (isinstance(class_attr, InstrumentedAttribute) and
+            isinstance(class_attr.property,
+                       orm.properties.RelationshipProperty)):
+        options.append(orm.subqueryload(class_attr.key))
+    return query.options(*options)
+
   @declared_attr
   def __table_args__(cls):  # pylint: disable=no-self-argument
     extra_table_args = AttributeInfo.gather_attrs(cls, '_extra_table_args')
@@ -30,6 +30,10 @@ class Labeled(object):
       MultipleSubpropertyFullTextAttr("label", "labels", ["name"]),
   ]
 
+  _projection_loads = {
+      'labels': ('_object_labels.label', ),
+  }
+
   @declared_attr
   def _object_labels(cls):  # pylint: disable=no-self-argument
     """Object labels property"""
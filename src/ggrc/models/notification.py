@@ -3,11 +3,13 @@
 
 """GGRC notification SQLAlchemy layer data model extensions."""
 
+from sqlalchemy.dialects import mysql
 from sqlalchemy.orm import backref
 from sqlalchemy.ext.declarative import declared_attr
 
 from ggrc import db
 from ggrc.models.mixins import base
+from ggrc.models.mixins.base import Identifiable
 from ggrc.models.mixins import Base
 from ggrc.models import utils
 from ggrc.models import reflection
@@ -90,3 +92,24 @@ class Notification(BaseNotification):
 class NotificationHistory(BaseNotification):
   __tablename__ = 'notifications_history'
   notification_id = db.Column(db.Integer, nullable=False)
+
+
+class DigestEmail(Identifiable, db.Model):
+  """Rendered daily digest email waiting to be sent.
+
+  Emails of a single digest run share the started_at time and are split into
+  shards sent by separate workers. Every email is removed once it is sent.
+  """
+  __tablename__ = 'digest_emails'
+
+  started_at = db.Column(db.DateTime, nullable=False)
+  shard = db.Column(db.Integer, nullable=False)
+  email = db.Column(db.String(250), nullable=False)
+  subject = db.Column(db.String(250), nullable=False)
+  body = db.Column(mysql.LONGTEXT, nullable=False)
+
+  @staticmethod
+  def _extra_table_args(_):
+    return (
+        db.Index('ix_digest_emails_started_at_shard', 'started_at', 'shard'),
+    )
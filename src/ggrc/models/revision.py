@@ -3,12 +3,15 @@
 
 """Defines a Revision model for storing snapshots."""
 
+import copy
+
 from ggrc import builder
 from ggrc import db
 from ggrc.models.mixins import base
 from ggrc.models.mixins import Base
 from ggrc.models.mixins.filterable import Filterable
 from ggrc.models import reflection
+from ggrc.models import revision_content
 from ggrc.access_control import role
 from ggrc.models.types import LongJsonType
 from ggrc.utils.revisions_diff import builder as revisions_diff
@@ -34,6 +37,16 @@ class Revision(Filterable, base.ContextRBAC, Base, db.Model):
   destination_type = db.Column(db.String, nullable=True)
   destination_id = db.Column(db.Integer, nullable=True)
 
+  # Stored result of content property, queries reading contents of many
+  # revisions join it to avoid lazy loading it for each revision separately.
+  _populated_content = db.relationship(
+      revision_content.RevisionContent,
+      uselist=False,
+      lazy="select",
+      cascade="all, delete-orphan",
+      passive_deletes=True,
+  )
+
   @staticmethod
   def _extra_table_args(_):
     return (
@@ -80,6 +93,7 @@ class Revision(Filterable, base.ContextRBAC, Base, db.Model):
     return query.options(
         orm.subqueryload('modified_by'),
         orm.subqueryload('event'),  # used in description
+        orm.joinedload('_populated_content'),
     )
 
   def __init__(self, obj, modified_by_id, action, content):
@@ -555,11 +569,8 @@ class Revision(Filterable, base.ContextRBAC, Base, db.Model):
             cav["attributable_type"] = "Requirement"
         populated_content["custom_attribute_values"] = cavs
 
-  @builder.simple_property
-  def content(self):
-    """Property. Contains the revision content dict.
-
-    Updated by required values, generated from saved content dict."""
+  def _populate_content(self):
+    """Build the content dict from the saved content dict."""
     # pylint: disable=too-many-locals
     populated_content = self._content.copy()
     populated_content.update(self.populate_acl())
@@ -581,7 +592,26 @@ class Revision(Filterable, base.ContextRBAC, Base, db.Model):
 
     return populated_content
 
+  @builder.simple_property
+  def content(self):
+    """Property. Contains the revision content dict.
+
+    Updated by required values, generated from saved content dict. The result
+    is stored in revision_contents table and reused while its version matches
+    the current populate inputs."""
+    version = revision_content.get_version(self.resource_type,
+                                           self.resource_id)
+    stored = self._populated_content
+    if stored is not None and stored.version == version:
+      return copy.deepcopy(stored.content)
+    populated_content = self._populate_content()
+    if self.id is None:
+      return populated_content
+    return revision_content.queue(self.id, version, populated_content)
+
   @content.setter
   def content(self, value):
     """ Setter for content property."""
     self._content = value
+    self._populated_content = None
+    revision_content.discard(self.id)
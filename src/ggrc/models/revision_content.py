@@ -0,0 +1,177 @@
+# Copyright (C) 2019 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""Materialized populated content of revisions.
+
+Revision.content is built on every access from the stored revision content,
+the custom roles and the custom attribute definitions of the revision
+resource type. This module stores the built content in revision_contents
+table together with a version stamp of all those inputs. A stored content is
+used only while its version matches the current one, so any change of roles,
+CADs or of POPULATED_CONTENT_VERSION makes it stale.
+
+Contents missing from the table are collected during the request and written
+by `store_pending` after the request has been handled.
+"""
+
+import hashlib
+import json
+import logging
+
+import flask
+import sqlalchemy as sa
+
+from ggrc import db
+from ggrc import utils
+from ggrc.access_control import role
+from ggrc.models.types import LongJsonType
+from ggrc.utils import benchmark
+
+
+logger = logging.getLogger(__name__)
+
+# Bump this number on every change of the Revision populate rules, it makes
+# all stored populated contents stale.
+POPULATED_CONTENT_VERSION = 1
+
+FILL_CHUNK_SIZE = 100
+
+# Max number of populated contents queued during a single request. Contents
+# above this limit are not stored, they are queued again on a later access.
+MAX_PENDING_CONTENTS = 1000
+
+
+# pylint: disable=too-few-public-methods
+class RevisionContent(db.Model):
+  """Db model for storing populated revision content."""
+  __tablename__ = "revision_contents"
+
+  revision_id = db.Column(
+      db.Integer,
+      db.ForeignKey("revisions.id", ondelete="CASCADE"),
+      primary_key=True,
+  )
+  version = db.Column(db.String(250), nullable=False)
+  content = db.Column(LongJsonType, nullable=False)
+
+
+def get_version(resource_type, resource_id):
+  """Get version stamp of populated content for the given resource.
+
+  The stamp is built from the populate rules version and from the roles and
+  CADs used for populating the content. Stamps are memoized for the request.
+  """
+  from ggrc.models import custom_attribute_definition
+  from ggrc.models.mixins import CustomAttributable
+  if resource_type not in CustomAttributable.MODELS_WITH_LOCAL_CADS:
+    resource_id = None
+  if getattr(flask.g, "revision_content_versions", None) is None:
+    flask.g.revision_content_versions = {}
+  key = (resource_type, resource_id)
+  if key not in flask.g.revision_content_versions:
+    inputs = {
+        "roles": sorted(role.get_custom_roles_for(resource_type).items()),
+        "cads": custom_attribute_definition.get_custom_attributes_for(
+            resource_type, resource_id),
+    }
+    digest = hashlib.md5(utils.as_json(inputs, sort_keys=True)).hexdigest()
+    flask.g.revision_content_versions[key] = "{}:{}".format(
+        POPULATED_CONTENT_VERSION, digest)
+  return flask.g.revision_content_versions[key]
+
+
+def invalidate_versions(mapper, content, target):
+  # pylint: disable=unused-argument
+  """Clear memoized version stamps if a role or a CAD has been changed."""
+  if hasattr(flask.g, "revision_content_versions"):
+    del flask.g.revision_content_versions
+
+
+def queue(revision_id, version, content):
+  """Queue populated content to be stored after the request.
+
+  At most MAX_PENDING_CONTENTS contents are queued per request.
+
+  Returns:
+    Content in the same form as it is read back from revision_contents table,
+    so the result of Revision.content does not depend on a cache hit.
+  """
+  serialized = utils.as_json(content)
+  if getattr(flask.g, "pending_revision_contents", None) is None:
+    flask.g.pending_revision_contents = {}
+  pending = flask.g.pending_revision_contents
+  if revision_id in pending or len(pending) < MAX_PENDING_CONTENTS:
+    pending[revision_id] = (version, serialized)
+  return json.loads(serialized)
+
+
+def discard(revision_id):
+  """Remove queued populated content of the given revision."""
+  pending = getattr(flask.g, "pending_revision_contents", None)
+  if pending:
+    pending.pop(revision_id, None)
+
+
+def discard_pending():
+  """Remove all queued populated contents."""
+  flask.g.pending_revision_contents = {}
+
+
+def store_pending():
+  """Write all queued populated contents into revision_contents table.
+
+  Contents are written in a separate transaction, so changes left in the
+  session of a failed request are never committed with them. Stale rows are
+  replaced and rows of revisions that do not exist anymore (e.g. rolled back
+  ones) are skipped. Rows are written in chunks to keep statements small.
+  """
+  pending = getattr(flask.g, "pending_revision_contents", None)
+  if not pending:
+    return
+  flask.g.pending_revision_contents = {}
+  table = RevisionContent.__table__
+  with benchmark("Store populated revision contents"):
+    try:
+      with db.engine.begin() as connection:
+        for chunk in utils.list_chunks(pending.items()):
+          connection.execute(
+              table.delete().where(
+                  table.c.revision_id.in_([rev_id for rev_id, _ in chunk])
+              )
+          )
+          connection.execute(
+              table.insert().prefix_with("IGNORE"),
+              [{"revision_id": revision_id,
+                "version": version,
+                "content": content}
+               for revision_id, (version, content) in chunk],
+          )
+    except sa.exc.SQLAlchemyError:
+      logger.warning("Failed to store populated revision contents.",
+                     exc_info=True)
+
+
+def fill_revision_contents(chunk_size=FILL_CHUNK_SIZE):
+  """Build and store populated content for all revisions.
+
+  Revisions are handled in id ranges and only missing or stale contents are
+  written, so the job can be restarted at any moment.
+  """
+  from ggrc.models import all_models
+  revision = all_models.Revision
+  last_id = 0
+  while True:
+    with benchmark("Fill populated revision contents"):
+      revisions = revision.eager_query().filter(
+          revision.id > last_id,
+      ).order_by(
+          revision.id,
+      ).limit(chunk_size).all()
+      if not revisions:
+        break
+      for rev in revisions:
+        rev.content  # pylint: disable=pointless-statement
+      last_id = revisions[-1].id
+      logger.info("Revision contents are filled up to id %s", last_id)
+      store_pending()
+      db.session.expunge_all()
@@ -7,7 +7,6 @@ import collections
 from datetime import datetime
 
 from sqlalchemy import event
-from sqlalchemy import func
 from sqlalchemy import inspect
 from sqlalchemy import orm
 from sqlalchemy.ext.declarative import declared_attr
@@ -23,7 +22,7 @@ from ggrc.login import get_current_user_id
 from ggrc.models import mixins
 from ggrc.models import reflection
 from ggrc.models import relationship
-from ggrc.models import revision
+from ggrc.models import latest_revision
 from ggrc.models.deferred import deferred
 from ggrc.models.mixins import base
 from ggrc.models.mixins import rest_handable
@@ -122,6 +121,15 @@ class Snapshot(rest_handable.WithDeleteHandable,
       uselist=True,
   )
 
+  latest_revision_pointer = db.relationship(
+      "LatestRevision",
+      primaryjoin="and_("
+      "LatestRevision.resource_id == foreign(Snapshot.child_id),"
+      "LatestRevision.resource_type == foreign(Snapshot.child_type))",
+      uselist=False,
+      viewonly=True,
+  )
+
   @builder.simple_property
   def archived(self):
     return self.audit.archived if self.audit else False
@@ -129,19 +137,22 @@ class Snapshot(rest_handable.WithDeleteHandable,
   @builder.simple_property
   def is_latest_revision(self):
     """Flag if the snapshot has the latest revision."""
-    return self.revisions and self.revision == self.revisions[-1]
+    pointer = self.latest_revision_pointer
+    return pointer is not None and pointer.revision_id == self.revision_id
 
   @builder.simple_property
   def original_object_deleted(self):
-    """Flag if the snapshot has the latest revision."""
-    return self.revisions and self.revisions[-1].action == "deleted"
+    """Flag if the original object of the snapshot is deleted."""
+    pointer = self.latest_revision_pointer
+    return pointer is not None and pointer.action == "deleted"
 
   @classmethod
   def eager_query(cls):
     query = super(Snapshot, cls).eager_query()
     return cls.eager_inclusions(query, Snapshot._include_links).options(
-        orm.subqueryload('revision'),
+        orm.subqueryload('revision').joinedload('_populated_content'),
         orm.subqueryload('revisions'),
+        orm.subqueryload('latest_revision_pointer'),
         orm.joinedload('audit').load_only("id", "archived"),
     )
 
@@ -354,21 +365,8 @@ def _set_latest_revisions(objects):
   Args:
     objects: list of snapshot objects with child_id and child_type set.
   """
-  pairs = [(o.child_type, o.child_id) for o in objects]
-  query = db.session.query(
-      func.max(revision.Revision.id, name="id", identifier="id"),
-      revision.Revision.resource_type,
-      revision.Revision.resource_id,
-  ).filter(
-      tuple_(
-          revision.Revision.resource_type,
-          revision.Revision.resource_id,
-      ).in_(pairs)
-  ).group_by(
-      revision.Revision.resource_type,
-      revision.Revision.resource_id,
-  )
-  id_map = {(r_type, r_id): id_ for id_, r_type, r_id in query}
+  id_map = latest_revision.get_latest_ids(
+      {(o.child_type, o.child_id) for o in objects})
   for o in objects:
     o.revision_id = id_map.get((o.child_type, o.child_id))
     if o.revision_id is None:
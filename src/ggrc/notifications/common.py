@@ -26,9 +26,10 @@ from ggrc.gcalendar import calendar_event_builder
 from ggrc.gcalendar import calendar_event_sync
 from ggrc.models import Person
 from ggrc.models import Notification, NotificationHistory
+from ggrc.models.notification import DigestEmail
 from ggrc.notifications.unsubscribe import unsubscribe_url
 from ggrc.rbac import permissions
-from ggrc.utils import DATE_FORMAT_US, merge_dict, benchmark
+from ggrc.utils import DATE_FORMAT_US, merge_dict, benchmark, list_chunks
 from ggrc.notifications.notification_handlers import SEND_TIME
 
 from ggrc_workflows.models import CycleTaskGroupObjectTask
@@ -121,17 +122,39 @@ def get_filter_data(
     dict: dictionary containing notification data for all users who should
       receive it, according to their notification settings.
   """
-  result = {}
   data = Services.call_service(
       notification, tasks_cache=tasks_cache, del_rels_cache=del_rels_cache)
+  return filter_data(notification, data, people_cache)
 
-  for user, user_data in data.iteritems():
-    if should_receive(notification, user_data, people_cache):
-      result[user] = user_data
-  return result
 
+def filter_data(notification, data, people_cache):
+  """Filter notification data of users who should not receive it."""
+  return {
+      user: user_data for user, user_data in data.iteritems()
+      if should_receive(notification, user_data, people_cache)
+  }
 
-def get_notification_data(notifications):
+
+def prefetch_people(person_ids, people_cache):
+  """Load people with their roles and notification configs into the cache.
+
+  Args:
+    person_ids (iterable): ids of people that should be cached.
+    people_cache (dict): cache of people used by `should_receive`.
+  """
+  missing_ids = [person_id for person_id in set(person_ids)
+                 if person_id not in people_cache and person_id != -1]
+  for ids_chunk in list_chunks(missing_ids):
+    people_cache.update(dict.fromkeys(ids_chunk))
+    people = db.session.query(Person).options(
+        joinedload('user_roles').joinedload('role'),
+        joinedload('notification_configs')
+    ).filter(Person.id.in_(ids_chunk))
+    for person in people:
+      people_cache[person.id] = person
+
+
+def get_notification_data(notifications, people_cache=None):
   """Get notification data for all notifications.
 
   This function returns a filtered data for all notifications for the users
@@ -140,6 +163,7 @@ def get_notification_data(notifications):
   Args:
     notifications (list of Notification): List of notification for which we
       want to get notification data.
+    people_cache (dict): cache of recipients shared between calls.
 
   Returns:
     dict: Filtered dictionary containing all the data that should be sent for
@@ -148,15 +172,24 @@ def get_notification_data(notifications):
   if not notifications:
     return {}
   aggregate_data = {}
-  people_cache = {}
+  if people_cache is None:
+    people_cache = {}
 
   tasks_cache = cycle_tasks_cache(notifications)
   deleted_rels_cache = deleted_task_rels_cache(tasks_cache.keys())
 
-  for notification in notifications:
-    filtered_data = get_filter_data(
-        notification, people_cache, tasks_cache=tasks_cache,
-        del_rels_cache=deleted_rels_cache)
+  notifications_data = [
+      (notification, Services.call_service(
+          notification, tasks_cache=tasks_cache,
+          del_rels_cache=deleted_rels_cache))
+      for notification in notifications
+  ]
+  prefetch_people((user_data["user"]["id"]
+                   for _, data in notifications_data
+                   for user_data in data.itervalues()), people_cache)
+
+  for notification, data in notifications_data:
+    filtered_data = filter_data(notification, data, people_cache)
     aggregate_data = merge_dict(aggregate_data, filtered_data)
 
   # Remove notifications for objects without a contact (such as task groups)
@@ -214,6 +247,15 @@ def get_pending_notifications():
   return notifications, data
 
 
+def _daily_notifications_query():
+  """Get query for notifications that should be sent in the daily digest."""
+  return db.session.query(Notification).filter(
+      (Notification.runner == Notification.RUNNER_DAILY) &
+      (Notification.send_on <= datetime.today()) &
+      ((Notification.sent_at.is_(None)) | (Notification.repeating == true()))
+  )
+
+
 def get_daily_notifications():
   """Get notification data for all future notifications.
 
@@ -221,15 +263,52 @@ def get_daily_notifications():
     list of Notifications, data: a tuple of notifications that were handled
       and corresponding data for those notifications.
   """
-  notifications = db.session.query(Notification).filter(
-      (Notification.runner == Notification.RUNNER_DAILY) &
-      (Notification.send_on <= datetime.today()) &
-      ((Notification.sent_at.is_(None)) | (Notification.repeating == true()))
-  ).all()
+  notifications = _daily_notifications_query().all()
 
   return notifications, get_notification_data(notifications)
 
 
+def iter_daily_notifications(chunk_size):
+  """Load daily digest notifications in chunks ordered by ids.
+
+  Yields:
+    lists of at most chunk_size notifications.
+  """
+  last_id = 0
+  while True:
+    notifications = _daily_notifications_query().filter(
+        Notification.id > last_id
+    ).order_by(
+        Notification.id
+    ).limit(chunk_size).all()
+    if not notifications:
+      return
+    yield notifications
+    last_id = notifications[-1].id
+
+
+def get_streamed_daily_data(chunk_size=None):
+  """Get daily digest data from notifications loaded in chunks.
+
+  Only the aggregated data and ids of handled notifications are kept between
+  chunks, recipients are loaded once for all chunks.
+
+  Returns:
+    list of notification ids, data: a tuple of ids of handled notifications
+      and corresponding data for those notifications.
+  """
+  chunk_size = chunk_size or settings.DIGEST_NOTIFICATIONS_CHUNK_SIZE
+  notif_ids = []
+  aggregate_data = {}
+  people_cache = {}
+  for notifications in iter_daily_notifications(chunk_size):
+    with benchmark("aggregate daily notifications chunk"):
+      notif_ids.extend(notif.id for notif in notifications)
+      aggregate_data = merge_dict(
+          aggregate_data, get_notification_data(notifications, people_cache))
+  return notif_ids, aggregate_data
+
+
 def should_receive(notif, user_data, people_cache):
   """Check if a user should receive a notification or not.
 
@@ -245,14 +324,11 @@ def should_receive(notif, user_data, people_cache):
   # The person does not exist
   if person_id == -1:
     return False
-  if person_id in people_cache:
-    person = people_cache[person_id]
-  else:
-    person = db.session.query(Person).options(
-        joinedload('user_roles').joinedload('role'),
-        joinedload('notification_configs')
-    ).filter(Person.id == person_id).first()
-    people_cache[person_id] = person
+  if person_id not in people_cache:
+    prefetch_people([person_id], people_cache)
+  person = people_cache.get(person_id)
+  if person is None:
+    return False
 
   # If the user has no access we should not send any emails
   if person.system_wide_role == "No Access":
@@ -286,26 +362,119 @@ def should_receive(notif, user_data, people_cache):
 def send_daily_digest_notifications():
   """Send emails for today's or overdue notifications.
 
+  Rendered emails are stored together with processing of the handled
+  notifications, so the notifications are not handled again if the job is
+  restarted. The stored emails are split into DIGEST_WORKERS shards sent by
+  separate background tasks, or in this request if there is a single worker.
+  Shards left unsent by an interrupted job are sent again.
+
   Returns:
     str: String containing a simple list of who received the notification.
   """
   # pylint: disable=invalid-name
   with benchmark("contributed cron job send_daily_digest_notifications"):
-    notif_list, notif_data = get_daily_notifications()
-    sent_emails = []
-    subject = "GGRC daily digest for {}".format(date.today().strftime("%b %d"))
+    recipients = create_digest_emails(settings.DIGEST_WORKERS)
+    shards = get_unsent_digest_shards()
+    if settings.DIGEST_WORKERS > 1:
+      from ggrc import views
+      views.start_digest_workers(shards)
+    else:
+      with benchmark("sending daily emails"):
+        for started_at, shard in shards:
+          send_digest_shard(started_at, shard)
+
+    return "emails sent to: <br> {}".format("<br>".join(recipients))
 
-    with benchmark("sending daily emails"):
-      for user_email, data in notif_data.iteritems():
-        data = modify_data(data)
-        email_body = settings.EMAIL_DIGEST.render(digest=data)
-        send_email(user_email, subject, email_body)
-        sent_emails.append(user_email)
 
-    with benchmark("processing sent notifications"):
-      process_sent_notifications(notif_list)
+def _render_digest_email(user_email, data, subject):
+  """Render digest email of a single recipient."""
+  return {
+      "email": user_email,
+      "subject": subject,
+      "body": settings.EMAIL_DIGEST.render(digest=modify_data(data)),
+  }
 
-    return "emails sent to: <br> {}".format("<br>".join(sent_emails))
+
+def create_digest_emails(workers=1):
+  """Render and store digest emails of today's or overdue notifications.
+
+  Emails are inserted in chunks right after they are rendered, so neither
+  the rendered emails nor the data of their recipients pile up in memory.
+  They are committed together with processing of the notifications, so a
+  failed job leaves neither emails nor processed notifications behind.
+
+  Rendering is not split into shards. An email can be rendered only after
+  all notifications are aggregated, and a worker would have to get the
+  aggregated data of its recipients through the database, which costs about
+  as much as rendering the email from it.
+
+  Args:
+    workers (int): number of shards the emails are split into.
+
+  Returns:
+    list of recipient emails.
+  """
+  started_at = datetime.utcnow().replace(microsecond=0)
+  notif_ids, notif_data = get_streamed_daily_data()
+  subject = "GGRC daily digest for {}".format(date.today().strftime("%b %d"))
+  recipients = sorted(notif_data)
+
+  with benchmark("rendering daily emails"):
+    for chunk in list_chunks(list(enumerate(recipients))):
+      db.session.execute(DigestEmail.__table__.insert(), [
+          dict(_render_digest_email(user_email, notif_data.pop(user_email),
+                                    subject),
+               started_at=started_at,
+               shard=idx % workers)
+          for idx, user_email in chunk
+      ])
+
+  with benchmark("processing sent notifications"):
+    for ids_chunk in list_chunks(notif_ids):
+      _process_notifications(Notification.query.filter(
+          Notification.id.in_(ids_chunk)
+      ).all())
+      db.session.flush()
+    db.session.commit()
+  return recipients
+
+
+def get_unsent_digest_shards():
+  """Get (started_at, shard) pairs of digest emails waiting to be sent."""
+  return db.session.query(
+      DigestEmail.started_at,
+      DigestEmail.shard,
+  ).distinct().order_by(
+      DigestEmail.started_at,
+      DigestEmail.shard,
+  ).all()
+
+
+def send_digest_shard(started_at, shard):
+  """Send digest emails of a single shard.
+
+  Every email is removed and committed right after it is sent, so an
+  interrupted shard continues with the first unsent email. The email row is
+  locked while it is sent, so a worker started for the same shard before the
+  previous one finished waits for it and skips the sent email.
+  """
+  email_ids = [email_id for email_id, in db.session.query(
+      DigestEmail.id
+  ).filter(
+      DigestEmail.started_at == started_at,
+      DigestEmail.shard == shard,
+  ).order_by(
+      DigestEmail.id
+  )]
+  for email_id in email_ids:
+    digest_email = DigestEmail.query.filter_by(
+        id=email_id
+    ).with_for_update().populate_existing().first()
+    if digest_email is None:
+      continue
+    send_email(digest_email.email, digest_email.subject, digest_email.body)
+    db.session.delete(digest_email)
+    db.session.commit()
 
 
 def generate_cycle_tasks_notifs():
@@ -345,6 +514,12 @@ def process_sent_notifications(notif_list):
     notif_list (list of Notification): List of notification for which we want
       to modify sent_at field.
   """
+  _process_notifications(notif_list)
+  db.session.commit()
+
+
+def _process_notifications(notif_list):
+  """Mark notifications as sent without committing the changes."""
   from ggrc.models import all_models
   for notif in notif_list:
     if notif.object_type == "CycleTaskGroupObjectTask" and \
@@ -356,7 +531,6 @@ def process_sent_notifications(notif_list):
       notif_history = create_notification_history_obj(notif)
       db.session.add(notif_history)
       db.session.delete(notif)
-  db.session.commit()
 
 
 def create_notification_history_obj(notif):
@@ -450,6 +624,10 @@ def send_email(user_email, subject, body):
     body (basestring): Html body of the email. it can contain unicode
       characters and will be sent as a html mime type.
   """
+  if settings.LOCAL_MAIL:
+    logger.info("Local mail to %s: %s (%s characters)",
+                user_email, subject, len(body))
+    return
   sender = get_app_engine_email()
   if not mail.is_email_valid(user_email):
     logger.error("Invalid email recipient: %s", user_email)
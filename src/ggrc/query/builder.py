@@ -9,6 +9,7 @@ This class is used to build SqlAlchemy queries and fetch the result ids.
 # flake8: noqa
 import collections
 import datetime
+import json
 
 import sqlalchemy as sa
 
@@ -43,6 +44,10 @@ class QueryHelper(object):
         }
       ]
       limit: [from, to] - limit the result list to a slice result[from, to]
+      cursor: optional; request a page of page_size objects following the
+              cursor, an empty cursor requests the first page. The cursor of
+              the next page is returned in next_cursor.
+      page_size: the number of objects on a page requested with cursor
       filters: {
         relevant_filters:
           these filters will return all ids of the "search class name" object
@@ -80,8 +85,15 @@ class QueryHelper(object):
 
   """
 
+  # Object query fields that define the list of ids returned by _get_ids
+  FILTER_KEYS = ("object_name", "filters", "permissions", "order_by", "limit",
+                 "cursor", "page_size")
+
   def __init__(self, query):
     self.query = self._clean_query(query)
+    # Results of evaluated object queries by their filter keys, object
+    # queries with the same filters share the result
+    self._results = {}
 
   def _get_snapshot_child_type(self, object_query):
     """Return child_type for snapshot from a query"""
@@ -203,11 +215,56 @@ class QueryHelper(object):
     Returns:
       list of dicts: same query as the input with all ids that match the filter
     """
-    for object_query in self.query:
+    for object_query in self._get_evaluation_order():
       ids = self._get_ids(object_query)
       object_query["ids"] = ids
     return self.query
 
+  def _get_dependencies(self, expression):
+    """Get indexes of object queries referenced with __previous__."""
+    if not isinstance(expression, dict):
+      return set()
+    dependencies = set()
+    if expression.get("object_name") == "__previous__":
+      dependencies.update(expression.get("ids", []))
+    dependencies.update(self._get_dependencies(expression.get("left")))
+    dependencies.update(self._get_dependencies(expression.get("right")))
+    return dependencies
+
+  def _get_evaluation_order(self):
+    """Get object queries ordered so that referenced queries go first.
+
+    Filters referring to __previous__ object queries use their results, so
+    the referenced object queries are evaluated before the dependent ones.
+    """
+    order = []
+    visited = set()
+
+    def visit(index, path):
+      """Add object query with all its dependencies to the order."""
+      if index in path:
+        raise BadQueryException("Circular __previous__ reference in query")
+      if index in visited:
+        return
+      expression = self.query[index].get("filters", {}).get("expression")
+      for dependency in sorted(self._get_dependencies(expression)):
+        if 0 <= dependency < len(self.query):
+          visit(dependency, path | {index})
+      visited.add(index)
+      order.append(self.query[index])
+
+    for index in range(len(self.query)):
+      visit(index, frozenset())
+    return order
+
+  def _get_filter_key(self, object_query):
+    """Get a hashable key of the object query fields defining its ids."""
+    return json.dumps(
+        [object_query.get(key) for key in self.FILTER_KEYS],
+        sort_keys=True,
+        default=unicode,
+    )
+
   @staticmethod
   def _get_type_query(model, permission_type):
     """Filter by contexts and resources
@@ -239,7 +296,11 @@ class QueryHelper(object):
 
     object_name = object_query["object_name"]
     object_class = inflector.get_model(object_name)
-    query = object_class.eager_query()
+    fields = object_query.get("fields")
+    if fields:
+      query = object_class.projection_query(fields)
+    else:
+      query = object_class.eager_query()
     query = query.filter(object_class.id.in_(ids))
 
     with benchmark("Get objects by ids: _get_objects -> obj in query"):
@@ -251,7 +312,25 @@ class QueryHelper(object):
     return objects
 
   def _get_ids(self, object_query):
-    """Get a set of ids of objects described in the filters."""
+    """Get ids of objects described in the filters.
+
+    Object queries with the same filters are evaluated only once.
+    """
+    key = self._get_filter_key(object_query)
+    if key not in self._results:
+      with benchmark(u"Evaluate object query: {}".format(
+          object_query["object_name"])):
+        ids = self._query_ids(object_query)
+      self._results[key] = (ids, {
+          field: object_query[field] for field in ("total", "next_cursor")
+          if field in object_query
+      })
+    ids, extras = self._results[key]
+    object_query.update(extras)
+    return list(ids)
+
+  def _query_ids(self, object_query):
+    """Get a list of ids of objects described in the filters."""
 
     object_name = object_query["object_name"]
     expression = object_query.get("filters", {}).get("expression")
@@ -282,6 +361,10 @@ class QueryHelper(object):
       )
       if filter_expression is not None:
         query = query.filter(filter_expression)
+    if object_query.get("cursor") is not None:
+      with benchmark("Apply cursor: _get_ids > _get_page_ids"):
+        return self._get_page_ids(object_class, tgt_class, query,
+                                  object_query)
     if object_query.get("order_by"):
       with benchmark("Sorting: _get_ids > order_by"):
         query = pagination.apply_order_by(
@@ -303,6 +386,37 @@ class QueryHelper(object):
 
     return ids
 
+  @staticmethod
+  def _get_page_ids(object_class, tgt_class, query, object_query):
+    """Get ids of objects on the page following object_query["cursor"].
+
+    Objects are ordered by order_by keys and by id, the page is selected
+    with a keyset filter, so deep pages cost the same as the first one.
+    """
+    page_size = pagination.get_page_size(object_query.get("page_size"))
+    values, total = pagination.decode_cursor(object_query["cursor"])
+    query, order_keys = pagination.get_order_keys(
+        object_class, query, object_query.get("order_by", []), tgt_class)
+    order_keys.append((object_class.id, False))
+    page_query = pagination.apply_order_keys(query, order_keys).add_columns(
+        *[expression for expression, _ in order_keys]
+    )
+    rows = pagination.apply_cursor(
+        page_query, order_keys, values, page_size
+    ).all()
+    has_next = len(rows) > page_size
+    rows = rows[:page_size]
+    if total is None:
+      if values is None and not has_next:
+        total = len(rows)
+      else:
+        total = pagination.get_total_count(query)
+    object_query["total"] = total
+    object_query["next_cursor"] = (
+        pagination.encode_cursor(rows[-1][1:], total) if has_next else None
+    )
+    return [row[0] for row in rows]
+
   @staticmethod
   def _slugs_to_ids(object_name, slugs):
     """Convert SLUG to proper ids for the given objec."""
@@ -7,6 +7,7 @@
 import operator
 import functools
 
+import flask
 import sqlalchemy
 from sqlalchemy.orm import aliased
 from sqlalchemy.orm import load_only
@@ -21,6 +22,7 @@ from ggrc.query import autocast
 from ggrc.query import my_objects
 from ggrc.query.exceptions import BadQueryException
 from ggrc.snapshotter import rules
+from ggrc.utils import benchmark
 from ggrc.utils import revisions_diff
 
 
@@ -60,6 +62,42 @@ def validate(*required_fields):
   return decorator
 
 
+def _resolve_previous(exp, query):
+  """Replace reference to a previous object query with that object query."""
+  if exp["object_name"] == "__previous__":
+    return query[exp["ids"][0]]
+  return exp
+
+
+def memoize_subquery(name):
+  """Memoize subquery filters built by the operation.
+
+  Object queries of a request often share a filter, e.g. the same relevant
+  object in the count and in the values query. The filter clause depends
+  only on the filtered classes and on the referenced objects, so it is built
+  once under those keys and embedded into every object query using it. The
+  clause holds no results, so it stays valid for the whole request.
+  """
+  def decorator(operation):
+    """Decorator for operator."""
+    @functools.wraps(operation)
+    def memoized_operator(exp, object_class, target_class, query):
+      """Memoized operator"""
+      resolved = _resolve_previous(exp, query)
+      key = (name, object_class.__name__, target_class.__name__,
+             resolved["object_name"], tuple(resolved["ids"]))
+      if getattr(flask.g, "query_subqueries", None) is None:
+        flask.g.query_subqueries = {}
+      if key not in flask.g.query_subqueries:
+        with benchmark(u"Build {} subquery: {} for {}".format(
+            name, object_class.__name__, resolved["object_name"])):
+          flask.g.query_subqueries[key] = operation(
+              exp, object_class, target_class, query)
+      return flask.g.query_subqueries[key]
+    return memoized_operator
+  return decorator
+
+
 def build_op_shortcut(predicate):
   """A shortcut to call build_op with default lhs and rhs."""
   def decorated(exp, object_class, target_class, query):
@@ -252,11 +290,22 @@ def similar(exp, object_class, target_class, query):
   return sqlalchemy.sql.false()
 
 
+def _in_subquery(column, query, name):
+  """Filter column by values selected by the query in the database.
+
+  The query is wrapped into a derived table, so MySQL materializes it once
+  and runs a semi-join instead of evaluating a dependent subquery for every
+  row or receiving all values in a huge IN list.
+  """
+  values = query.subquery(name)
+  return column.in_(sqlalchemy.select([list(values.c)[0]]))
+
+
 @validate("object_name", "ids")
+@memoize_subquery("relevant")
 def relevant(exp, object_class, target_class, query):
   "Filter by relevant object"
-  if exp['object_name'] == "__previous__":
-    exp = query[exp['ids'][0]]
+  exp = _resolve_previous(exp, query)
   object_name = exp['object_name']
   ids = exp['ids']
   check_snapshots = (
@@ -266,10 +315,10 @@ def relevant(exp, object_class, target_class, query):
   check_direct = (not check_snapshots or
                   object_class.__name__ in rules.Types.trans_scope)
 
-  result = set()
+  queries = []
 
   if check_direct:
-    result.update(*relationship_helper.get_ids_related_to(
+    queries.append(relationship_helper.get_ids_related_to(
         object_class.__name__,
         object_name,
         ids,
@@ -299,16 +348,17 @@ def relevant(exp, object_class, target_class, query):
         all_models.Relationship.source_type == all_models.Snapshot.__name__,
         all_models.Relationship.destination_type == object_class.__name__,
     )
-    ids_qs = dest_qs.union(source_qs)
-    result.update(*ids_qs.all())
+    queries.extend([dest_qs, source_qs])
 
-  if not result:
+  if not queries:
     return sqlalchemy.sql.false()
 
-  return object_class.id.in_(result)
+  return _in_subquery(object_class.id, queries[0].union(*queries[1:]),
+                      "relevant")
 
 
 @validate("object_name", "ids")
+@memoize_subquery("related_evidence")
 def related_evidence(exp, object_class, target_class, query):
   """Special Filter by relevant object used to display audit scope evidence
 
@@ -342,8 +392,8 @@ def related_evidence(exp, object_class, target_class, query):
       all_models.Assessment.audit_id.in_(ids)
   )
 
-  result = evid_dest.union(evid_source)
-  return object_class.id.in_(result)
+  return _in_subquery(object_class.id, evid_dest.union(evid_source),
+                      "related_evidence")
 
 
 def build_expression(exp, object_class, target_class, query):
@@ -473,14 +523,15 @@ def cascade_unmappable(exp, object_class, target_class, query):
       ),
   ), "mapped_to_other_assessments")
 
-  result = set(db.session.query(mapped_to_issue))
-  result &= set(db.session.query(mapped_to_assessment))
-  result -= set(db.session.query(mapped_to_other_assessments))
-
-  if not result:
-    return sqlalchemy.sql.false()
-
-  return object_class.id.in_([row[0] for row in result])
+  return sqlalchemy.and_(
+      object_class.id.in_(sqlalchemy.select([mapped_to_issue.c.target_id])),
+      object_class.id.in_(
+          sqlalchemy.select([mapped_to_assessment.c.target_id])
+      ),
+      ~object_class.id.in_(
+          sqlalchemy.select([mapped_to_other_assessments.c.target_id])
+      ),
+  )
 
 
 @validate("resource_type", "resource_id")
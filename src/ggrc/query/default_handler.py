@@ -32,6 +32,7 @@ class DefaultHandler(QueryHelper):
       ids: [ ids of filtered objects ] (present if type is "ids")
       count: the number of objects filtered, after "limit" is applied
       total: the number of objects filtered, before "limit" is applied
+      next_cursor: cursor of the next page (present if cursor is requested)
   """
 
   def get_results(self):
@@ -44,7 +45,7 @@ class DefaultHandler(QueryHelper):
       list of dicts: same query as the input with requested results that match
                      the filter.
     """
-    for object_query in self.query:
+    for object_query in self._get_evaluation_order():
       query_type = object_query.get("type", "values")
       if query_type not in {"values", "ids", "count"}:
         raise NotImplementedError("Only 'values', 'ids' and 'count' queries "
@@ -73,8 +74,13 @@ class DefaultHandler(QueryHelper):
 
   @staticmethod
   def _transform_to_json(objects, fields=None):
-    """Make a JSON representation of objects from the list."""
-    objects_json = [json.publish(obj) for obj in objects]
+    """Make a JSON representation of objects from the list.
+
+    If fields are given, only these attributes are published, so the stubs
+    and related objects of the omitted attributes are never serialized.
+    """
+    objects_json = [json.publish(obj, attribute_whitelist=fields)
+                    for obj in objects]
     objects_json = json.publish_representation(objects_json)
     if fields:
       objects_json = [{f: o.get(f) for f in fields}
@@ -1,7 +1,19 @@
 # Copyright (C) 2019 Google Inc.
 # Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
 
-"""Pagination helpers module for query generation."""
+"""Pagination helpers module for query generation.
+
+Besides limit/offset pagination, pages can be requested with cursors. A
+cursor holds the order key values of the last row of the previous page, so
+the next page is selected with a keyset filter on indexed columns instead of
+skipping all previous rows. The total count is computed for the first page
+only and carried in the cursor, so it is an estimate on later pages.
+"""
+
+import base64
+import datetime
+import decimal
+import json
 
 import sqlalchemy as sa
 
@@ -29,6 +41,17 @@ def _get_limit(limit):
   return page_size, first
 
 
+def get_page_size(page_size):
+  """Validate page size of cursor pagination."""
+  try:
+    page_size = int(page_size)
+  except (ValueError, TypeError):
+    raise BadQueryException("Invalid page size. Integer expected.")
+  if page_size <= 0:
+    raise BadQueryException("Page size should be positive.")
+  return page_size
+
+
 def apply_limit(query, limit):
   """Apply limits for pagination.
 
@@ -50,6 +73,99 @@ def apply_limit(query, limit):
   return limit_query
 
 
+_DATETIME_FORMAT = "%Y-%m-%d %H:%M:%S.%f"
+_DATE_FORMAT = "%Y-%m-%d"
+
+
+def _dump_value(value):
+  """Convert an order key value to a JSON serializable value."""
+  if isinstance(value, datetime.datetime):
+    return {"datetime": value.strftime(_DATETIME_FORMAT)}
+  if isinstance(value, datetime.date):
+    return {"date": value.strftime(_DATE_FORMAT)}
+  if isinstance(value, decimal.Decimal):
+    return unicode(value)
+  return value
+
+
+def _load_value(value):
+  """Convert a value stored with _dump_value back to an order key value."""
+  if isinstance(value, dict):
+    if "datetime" in value:
+      return datetime.datetime.strptime(value["datetime"], _DATETIME_FORMAT)
+    return datetime.datetime.strptime(value["date"], _DATE_FORMAT).date()
+  return value
+
+
+def encode_cursor(values, total=None):
+  """Encode order key values of the last row of a page into a cursor."""
+  data = {"keys": [_dump_value(value) for value in values]}
+  if total is not None:
+    data["total"] = total
+  return base64.urlsafe_b64encode(json.dumps(data))
+
+
+def decode_cursor(cursor):
+  """Decode cursor created by encode_cursor.
+
+  Returns:
+    tuple of order key values or None for an empty cursor requesting the
+    first page and the total count carried in the cursor or None.
+  """
+  if not cursor:
+    return None, None
+  try:
+    data = json.loads(base64.urlsafe_b64decode(str(cursor)))
+    return [_load_value(value) for value in data["keys"]], data.get("total")
+  except (TypeError, ValueError, KeyError, AttributeError):
+    raise BadQueryException("Invalid cursor.")
+
+
+def _after(expression, desc, value):
+  """Filter rows ordered after the value of a single order key.
+
+  MySQL orders NULL values before all others in ascending order.
+  """
+  if value is None:
+    return sa.false() if desc else expression.isnot(None)
+  if desc:
+    return sa.or_(expression < value, expression.is_(None))
+  return expression > value
+
+
+def _equal(expression, value):
+  if value is None:
+    return expression.is_(None)
+  return expression == value
+
+
+def apply_cursor(query, order_keys, values, page_size):
+  """Apply keyset filter selecting a page after the given key values.
+
+  One extra row is selected to find out if there is a next page.
+
+  Args:
+    query: query ordered by order_keys;
+    order_keys: list of (expression, desc) pairs, the last expression must
+                be unique, e.g. the primary key;
+    values: order key values of the last row of the previous page or None
+            for the first page;
+    page_size: number of rows on the page.
+
+  Returns:
+    query for page_size + 1 rows.
+  """
+  if values is not None:
+    if len(values) != len(order_keys):
+      raise BadQueryException("Cursor does not match the sort order.")
+    keyset = sa.false()
+    for (expression, desc), value in reversed(zip(order_keys, values)):
+      keyset = sa.or_(_after(expression, desc, value),
+                      sa.and_(_equal(expression, value), keyset))
+    query = query.filter(keyset)
+  return query.limit(page_size + 1)
+
+
 def get_total_count(query):
   """Get count of all objects in the query."""
   with benchmark("Apply limit: apply_limit > query_count"):
@@ -70,9 +186,9 @@ def _joins_and_order(counter, clause, model, tgt_class):
 
   Returns:
     ([joins], order) - a tuple of joins required for this ordering to work
-                        and ordering clause itself; join is None if no join
-                        required or [(aliased entity, relationship field)]
-                        if joins required.
+                        and ordered expression itself; join is None if no
+                        join required or [(aliased entity, relationship
+                        field)] if joins required.
   """
 
   def by_fulltext():
@@ -116,12 +232,30 @@ def _joins_and_order(counter, clause, model, tgt_class):
     # Snapshot or non object attributes are treated as custom attributes
     joins, order = by_fulltext()
 
-  if clause.get("desc", False):
-    order = order.desc()
-
   return joins, order
 
 
+def get_order_keys(model, query, order_by, tgt_class):
+  """Join tables required for ordering and get the order keys.
+
+  Returns:
+    the query with joins and a list of (expression, desc) pairs.
+  """
+  order_keys = []
+  for counter, clause in enumerate(order_by):
+    join_list, order = _joins_and_order(counter, clause, model, tgt_class)
+    if join_list is not None:
+      query = query.outerjoin(*join_list)
+    order_keys.append((order, clause.get("desc", False)))
+  return query, order_keys
+
+
+def apply_order_keys(query, order_keys):
+  """Order query by a list of (expression, desc) pairs."""
+  return query.order_by(*[expression.desc() if desc else expression
+                          for expression, desc in order_keys])
+
+
 def apply_order_by(model, query, order_by, tgt_class):
   """Add ordering parameters to a query for objects.
 
@@ -146,13 +280,5 @@ def apply_order_by(model, query, order_by, tgt_class):
     the query with sorting parameters.
   """
 
-  join_pairs = [
-      _joins_and_order(counter, clause, model, tgt_class)
-      for counter, clause in enumerate(order_by)
-  ]
-  join_lists, orders = zip(*join_pairs)
-  join_lists = [join_list for join_list in join_lists if join_list is not None]
-  for join_list in join_lists:
-    query = query.outerjoin(*join_list)
-
-  return query.order_by(*orders)
+  query, order_keys = get_order_keys(model, query, order_by, tgt_class)
+  return apply_order_keys(query, order_keys)
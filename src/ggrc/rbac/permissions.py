@@ -103,6 +103,26 @@ def is_allowed_delete_for(instance):
   return permissions_for(get_user()).is_allowed_delete_for(instance)
 
 
+def is_allowed_bulk(action, stubs):
+  """Whether or not the user is allowed the action on resources given by
+  (type, id) stubs, regardless of their contexts.
+
+  Returns:
+    dict with (type, id) tuples as keys and boolean decisions as values.
+  """
+  return permissions_for(get_user()).is_allowed_bulk(action, stubs)
+
+
+def is_allowed_for_bulk(action, stubs):
+  """Whether or not the user is allowed the action on particular objects
+  given by (type, id) stubs.
+
+  Returns:
+    dict with (type, id) tuples as keys and boolean decisions as values.
+  """
+  return permissions_for(get_user()).is_allowed_for_bulk(action, stubs)
+
+
 def create_contexts_for(resource_type):
   """All contexts in which the user has create permission."""
   return permissions_for(get_user()).create_contexts_for(resource_type)
@@ -1,16 +1,19 @@
 # Copyright (C) 2019 Google Inc.
 # Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
 
+from collections import defaultdict
 from collections import namedtuple
 
 from flask import g
 from flask.ext.login import current_user
+import sqlalchemy as sa
 
 from ggrc.app import db
 from ggrc.rbac.permissions import permissions_for as find_permissions
 from ggrc.rbac.permissions import is_allowed_create
 from ggrc.models import get_model, all_models
 from ggrc.models import Person
+from ggrc.utils import list_chunks
 
 Permission = namedtuple(
     'Permission',
@@ -214,6 +217,44 @@ _CONDITIONS_MAP = {
 }
 
 
+class CompiledPermissions(object):
+  """Request permissions compiled into an index.
+
+  Contexts and resources of every (action, resource_type) pair are stored in
+  sets, and results of permission checks are memoized, so checks of large
+  collections do not walk the nested permissions dict for every object.
+  """
+  # pylint: disable=too-few-public-methods
+
+  def __init__(self, permissions):
+    self.source = permissions
+    self.contexts = {}
+    self.resources = {}
+    self.decisions = {}
+    self.instance_decisions = {}
+    for action, resource_types in (permissions or {}).iteritems():
+      if not isinstance(resource_types, dict):
+        continue
+      for resource_type, entry in resource_types.iteritems():
+        if not isinstance(entry, dict):
+          continue
+        key = (action, resource_type)
+        self.contexts[key] = frozenset(entry.get('contexts') or ())
+        self.resources[key] = frozenset(entry.get('resources') or ())
+
+
+def clear_instance_decisions(*_):
+  """Drop memoized instance checks as flushed changes may affect them."""
+  if hasattr(g, '_compiled_permissions'):
+    g._compiled_permissions.instance_decisions = {}
+
+
+sa.event.listen(sa.orm.session.Session, "after_flush",
+                clear_instance_decisions)
+sa.event.listen(sa.orm.session.Session, "after_rollback",
+                clear_instance_decisions)
+
+
 class DefaultUserPermissions(object):
   """Common logic for user permissions."""
   # super user, context_id 0 indicates all contexts
@@ -232,30 +273,30 @@ class DefaultUserPermissions(object):
         None,
         context_id)
 
+  @staticmethod
+  def _compiled(permissions):
+    """Get compiled index of the given permissions dict.
+
+    The index is kept in the global request scope and it is rebuilt only if
+    the permissions of the request have been replaced.
+    """
+    compiled = getattr(g, '_compiled_permissions', None)
+    if compiled is None or compiled.source is not permissions:
+      compiled = CompiledPermissions(permissions)
+      g._compiled_permissions = compiled  # pylint: disable=protected-access
+    return compiled
+
   def _permission_match(self, permission, permissions):
     """Check if the user has the given permission"""
-
-    if None in \
-        permissions\
-            .get(permission.action, {})\
-            .get(permission.resource_type, {})\
-            .get('contexts', []):
+    compiled = self._compiled(permissions)
+    key = (permission.action, permission.resource_type)
+    contexts = compiled.contexts.get(key, ())
+    if None in contexts or permission.context_id in contexts:
+      return True
+    if permission.resource_id in compiled.resources.get(key, ()):
       return True
-    return \
-        permission.resource_id in permissions\
-        .get(permission.action, {})\
-        .get(permission.resource_type, {})\
-        .get('resources', [])\
-        or permission.context_id in \
-        permissions\
-        .get(permission.action, {})\
-        .get(permission.resource_type, {})\
-        .get('contexts', [])\
-        or permission.context_id in \
-        permissions\
-        .get(permission.action, {})\
-        .get(self.ADMIN_PERMISSION.resource_type, {})\
-        .get('contexts', [])
+    admin_key = (permission.action, self.ADMIN_PERMISSION.resource_type)
+    return permission.context_id in compiled.contexts.get(admin_key, ())
 
   @staticmethod
   def _permissions():
@@ -263,7 +304,15 @@ class DefaultUserPermissions(object):
     return getattr(g, '_request_permissions', {})
 
   def _is_allowed(self, permission):
+    """Check the permission and memoize the result for the request."""
     permissions = self._permissions()
+    decisions = self._compiled(permissions).decisions
+    if permission not in decisions:
+      decisions[permission] = self._check_permission(permission, permissions)
+    return decisions[permission]
+
+  def _check_permission(self, permission, permissions):
+    """Check if the user has the given permission in any applicable way."""
     if permission.context_id \
        and self._is_allowed(permission._replace(context_id=None)):
       return True
@@ -286,52 +335,167 @@ class DefaultUserPermissions(object):
     return False
 
   def _is_allowed_for(self, instance, action):
+    """Check if the action is allowed for the instance.
+
+    Results for persistent unmodified instances are memoized until the
+    permissions are reloaded or the session is flushed, as conditions may
+    depend on the state of other objects.
+    """
     permissions = self._permissions()
+    state = sa.inspect(instance, raiseerr=False)
+    if state is None or not state.persistent or state.modified:
+      return self._check_instance(instance, action, permissions)
+    decisions = self._compiled(permissions).instance_decisions
+    key = (action, instance._inflector.model_singular, instance.id)
+    if key not in decisions:
+      decisions[key] = self._check_instance(instance, action, permissions)
+    return decisions[key]
+
+  def _admin_conditions(self, permissions):
+    """Get conditions of the admin permission."""
+    return permissions[self.ADMIN_PERMISSION.action]\
+        .get(self.ADMIN_PERMISSION.resource_type)\
+        .get("conditions", {})\
+        .get(None, [])
+
+  def _check_instance(self, instance, action, permissions):
+    """Check permission conditions of the action for the instance."""
     # Check for admin permission
     if self._permission_match(self.ADMIN_PERMISSION, permissions):
-      conditions = permissions[self.ADMIN_PERMISSION.action]\
-          .get(self.ADMIN_PERMISSION.resource_type)\
-          .get("conditions", {})\
-          .get(None, [])
+      conditions = self._admin_conditions(permissions)
       if not conditions:
         return True
       return self._check_conditions(instance, action, conditions)
-    if (not permissions.get(action) or
-       not permissions[action].get(instance._inflector.model_singular)):
+    resource_type = instance._inflector.model_singular
+    type_permissions = permissions.get(action, {}).get(resource_type)
+    if not type_permissions:
       return False
-    resources = self._permissions()\
-        .setdefault(action, {})\
-        .setdefault(instance._inflector.model_singular, {})\
-        .setdefault('resources', [])
-    contexts = self._permissions()\
-        .setdefault(action, {})\
-        .setdefault(instance._inflector.model_singular, {})\
-        .setdefault('contexts', [])
+    compiled = self._compiled(permissions)
+    contexts = compiled.contexts.get((action, resource_type), ())
     # We can't use instance.context_id, because it requires the
     # object <-> context mapping to be created,
     # which isn't the case when creating objects
     context_id = None
     if hasattr(instance, 'context') and hasattr(instance.context, 'id'):
       context_id = instance.context.id
-    if instance.id in resources:
+    if instance.id in compiled.resources.get((action, resource_type), ()):
       return True
-    no_context_conditions = self._permissions()\
-        .setdefault(action, {})\
-        .setdefault(instance._inflector.model_singular, {})\
-        .setdefault('conditions', {})\
-        .setdefault(None, [])
-
-    context_conditions = self._permissions()\
-        .setdefault(action, {})\
-        .setdefault(instance._inflector.model_singular, {})\
-        .setdefault('conditions', {})\
-        .setdefault(context_id, [])
+    conditions_by_context = type_permissions.get('conditions', {})
+    no_context_conditions = conditions_by_context.get(None, [])
+    context_conditions = conditions_by_context.get(context_id, [])
     conditions = no_context_conditions + context_conditions
     # Check any conditions applied per resource
     if (None in contexts or context_id in contexts) and not conditions:
       return True
     return self._check_conditions(instance, action, conditions)
 
+  @staticmethod
+  def _group_stubs(stubs):
+    """Group ids of (type, id) stubs by type."""
+    ids_by_type = defaultdict(set)
+    for stub_type, stub_id in stubs:
+      ids_by_type[stub_type].add(stub_id)
+    return ids_by_type
+
+  def is_allowed_bulk(self, action, stubs):
+    """Check the action for many (type, id) stubs regardless of context.
+
+    Gives the same results as `_is_allowed` with an empty context for each
+    stub, but checks every type only once.
+
+    Returns:
+      dict with (type, id) tuples as keys and boolean decisions as values.
+    """
+    compiled = self._compiled(self._permissions())
+    result = {}
+    for stub_type, ids in self._group_stubs(stubs).iteritems():
+      if self._is_allowed(Permission(action, stub_type, None, None)):
+        result.update(((stub_type, id_), True) for id_ in ids)
+        continue
+      resources = compiled.resources.get((action, stub_type), ())
+      result.update(((stub_type, id_), id_ in resources) for id_ in ids)
+    return result
+
+  @staticmethod
+  def _get_context_ids(model, ids):
+    """Get context ids of existing objects of model by object ids."""
+    if hasattr(model, "context_id"):
+      columns = (model.id, model.context_id)
+    else:
+      columns = (model.id, sa.null())
+    context_ids = {}
+    for chunk in list_chunks(list(ids)):
+      context_ids.update(
+          db.session.query(*columns).filter(model.id.in_(chunk))
+      )
+    return context_ids
+
+  @staticmethod
+  def _load_instances(model, ids):
+    """Load objects of model by ids with a query per chunk of ids."""
+    instances = {}
+    for chunk in list_chunks(list(ids)):
+      instances.update(
+          (obj.id, obj) for obj in model.query.filter(model.id.in_(chunk))
+      )
+    return instances
+
+  def is_allowed_for_bulk(self, action, stubs):
+    """Check the action for objects given by many (type, id) stubs.
+
+    Gives the same results as `_is_allowed_for` called for each object.
+    Objects granted by resources or contexts are decided with a single
+    query of context ids per type, only objects whose permissions have
+    conditions are loaded, with a single query per type, and checked one by
+    one. Missing objects are not allowed.
+
+    Returns:
+      dict with (type, id) tuples as keys and boolean decisions as values.
+    """
+    permissions = self._permissions()
+    compiled = self._compiled(permissions)
+    is_admin = self._permission_match(self.ADMIN_PERMISSION, permissions)
+    result = {}
+    for stub_type, ids in self._group_stubs(stubs).iteritems():
+      model = get_model(stub_type)
+      type_permissions = permissions.get(action, {}).get(stub_type)
+      if model is None or not (is_admin or type_permissions):
+        result.update(((stub_type, id_), False) for id_ in ids)
+        continue
+      if is_admin:
+        context_ids = self._get_context_ids(model, ids)
+        result.update(((stub_type, id_), id_ in context_ids) for id_ in ids)
+        if self._admin_conditions(permissions):
+          undecided = set(context_ids)
+        else:
+          continue
+      else:
+        undecided = set()
+        key = (action, stub_type)
+        resources = compiled.resources.get(key, ())
+        contexts = compiled.contexts.get(key, ())
+        conditions_by_context = type_permissions.get('conditions', {})
+        context_ids = self._get_context_ids(
+            model, [id_ for id_ in ids if id_ not in resources])
+        for id_ in ids:
+          if id_ in resources:
+            result[(stub_type, id_)] = True
+          elif id_ not in context_ids:
+            result[(stub_type, id_)] = False
+          elif (conditions_by_context.get(None) or
+                conditions_by_context.get(context_ids[id_])):
+            undecided.add(id_)
+          else:
+            result[(stub_type, id_)] = (None in contexts or
+                                        context_ids[id_] in contexts)
+      instances = self._load_instances(model, undecided)
+      for id_ in undecided:
+        instance = instances.get(id_)
+        result[(stub_type, id_)] = (
+            instance is not None and self._is_allowed_for(instance, action)
+        )
+    return result
+
   def is_allowed_create(self, resource_type, resource_id, context_id):
     """Whether or not the user is allowed to create a resource of the specified
     type in the context."""
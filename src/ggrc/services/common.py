@@ -44,8 +44,11 @@ from ggrc.rbac import permissions
 from ggrc.services.attribute_query import AttributeQueryBuilder
 from ggrc.services import signals
 from ggrc.models.background_task import BackgroundTask, create_task
+from ggrc.query import pagination
 from ggrc.query import utils as query_utils
+from ggrc.query.exceptions import BadQueryException
 from ggrc import settings
+from ggrc.cache import resource_cache
 from ggrc.cache import utils as cache_utils
 from ggrc.utils import errors as ggrc_errors
 
@@ -749,10 +752,54 @@ class Resource(ModelView):
     }
     return matches, collection_extras
 
+  def apply_cursor_paging(self, matches_query):
+    """Get the page of matches following the cursor from `__cursor` arg.
+
+    Matches are ordered by the modified attribute and id, so the page is
+    selected with a keyset filter on them instead of skipping all previous
+    matches. The total count is computed for the first page only and is
+    carried in the cursor.
+    """
+    if '__sort' in request.args or '__limit' in request.args:
+      raise BadRequest("__cursor can not be used with __sort or __limit.")
+    page_size = min(
+        int(request.args.get('__page_size', self.DEFAULT_PAGE_SIZE)),
+        self.MAX_PAGE_SIZE)
+    order_keys = [(self.modified_attr, True), (self.model.id, True)]
+    try:
+      values, total = pagination.decode_cursor(request.args['__cursor'])
+      matches = pagination.apply_cursor(
+          matches_query, order_keys, values, page_size).all()
+    except BadQueryException as error:
+      raise BadRequest(error.message)
+    has_next = len(matches) > page_size
+    matches = matches[:page_size]
+    if total is None:
+      if values is None and not has_next:
+        total = len(matches)
+      else:
+        total = matches_query.count()
+
+    paging = {'total': total}
+    args = dict((k, unicode(v)) for k, v in request.args.items())
+    args['__cursor'] = ''
+    paging['first'] = self.url_for() + '?' + urlencode(
+        utils.encoded_dict(args))
+    if has_next:
+      last = matches[-1]
+      args['__cursor'] = pagination.encode_cursor(
+          [getattr(last, self.modified_attr_name), last.id], total)
+      paging['next'] = self.url_for() + '?' + urlencode(
+          utils.encoded_dict(args))
+    return matches, {'paging': paging}
+
   def get_matched_resources(self, matches):
+    """Get resources of matches from cache and from the database."""
     cache_objs = {}
     if self.has_cache():
       self.request.cache_manager = cache_utils.get_cache_manager()
+      self.request.resource_cache = resource_cache.ResourceCache(
+          self.request.cache_manager.cache_object.memcache_client)
       with benchmark("Query cache for resources"):
         cache_objs = self.get_resources_from_cache(matches)
       database_matches = [m for m in matches if m not in cache_objs]
@@ -761,10 +808,12 @@ class Resource(ModelView):
 
     database_objs = {}
     if database_matches:
-      database_objs = self.get_resources_from_database(matches)
+      database_objs = self.get_resources_from_database(database_matches)
       if self.has_cache():
         with benchmark("Add resources to cache"):
           self.add_resources_to_cache(database_objs)
+    if self.has_cache():
+      self.request.resource_cache.log_metrics(self.model.__name__)
     return cache_objs, database_objs
 
   def collection_get(self):
@@ -789,7 +838,10 @@ class Resource(ModelView):
       matches_query = self.get_collection_matches(
           self.model, filter_by_contexts)
     with benchmark("dispatch_request > collection_get > Query Data"):
-      if '__page' in request.args or '__page_only' in request.args:
+      if '__cursor' in request.args:
+        with benchmark("Query matches with cursor"):
+          matches, extras = self.apply_cursor_paging(matches_query)
+      elif '__page' in request.args or '__page_only' in request.args:
         with benchmark("Query matches with paging"):
           matches, extras = self.apply_paging(matches_query)
       else:
@@ -840,39 +892,40 @@ class Resource(ModelView):
   def get_resources_from_cache(self, matches):
     """Get resources from cache for specified matches"""
     resources = {}
+    self.request.blocked_cache_keys = set()
     # Disable caching for background tasks
     # Setting background task status circumvents our memcache
     # invalidation logic so we have to disabling memcache.
     if self.model.__name__ == 'BackgroundTask':
       return resources
-    # Skip right to memcache
-    memcache_client = self.request.cache_manager.cache_object.memcache_client
-    for match in matches:
-      key = cache_utils.get_cache_key(None, id_=match[0], type_=match[1])
-      val = memcache_client.get(key)
-      if val:
-        val = json.loads(val)
-      else:
-        val = {}
+    keys = {
+        cache_utils.get_cache_key(None, id_=match[0], type_=match[1]): match
+        for match in matches
+    }
+    values, self.request.blocked_cache_keys = (
+        self.request.resource_cache.get_multi(keys.keys()))
+    for key, val in values.iteritems():
+      val = json.loads(val)
       if "selfLink" in val:
-        resources[match] = val
+        resources[keys[key]] = val
     return resources
 
   def add_resources_to_cache(self, match_obj_pairs):
     """Add resources to cache if they are not blocked by DeleteOp entries"""
-    # Skip right to memcache
-    cache_manager = self.request.cache_manager
-    memcache_client = cache_manager.cache_object.memcache_client
+    supported_classes = self.request.cache_manager.supported_classes
+    blocked_keys = self.request.blocked_cache_keys
+    mapping = {}
     for match, obj in match_obj_pairs.items():
-      if obj.__class__.__name__ in cache_manager.supported_classes:
-        memcache_client.add(
-            cache_utils.get_cache_key(None, id_=match[0], type_=match[1]),
-            as_json(obj))
+      if obj.__class__.__name__ in supported_classes:
+        key = cache_utils.get_cache_key(None, id_=match[0], type_=match[1])
+        if key not in blocked_keys:
+          mapping[key] = as_json(obj)
+    self.request.resource_cache.add_multi(mapping)
 
   def invalidate_cache_to(self, obj):
     """Invalidate api cache for sent object."""
     memcache_client = self.request.cache_manager.cache_object.memcache_client
-    memcache_client.delete(
+    resource_cache.ResourceCache(memcache_client).delete(
         cache_utils.get_cache_key(None, id_=obj.id, type_=obj.type),
     )
 
@@ -1553,8 +1606,46 @@ class ExtendedResource(Resource):
     return self.json_success_response(result)
 
 
-def filter_resource(resource, depth=0, user_permissions=None):  # noqa
+def _collect_filtered_stubs(resource, stubs, revision_stubs):
+  """Collect (type, id) stubs of all resources checked by filter_resource."""
+  if isinstance(resource, (list, tuple)):
+    for sub_resource in resource:
+      _collect_filtered_stubs(sub_resource, stubs, revision_stubs)
+  elif isinstance(resource, dict) and 'type' in resource:
+    if resource.get('id') is not None:
+      stubs.add((resource['type'], resource['id']))
+    if resource['type'] == "Revision" and 'resource_type' in resource:
+      revision_stubs.add((resource['resource_type'], resource['resource_id']))
+    for key, value in resource.iteritems():
+      if key != 'context' and isinstance(value, dict) and 'type' in value:
+        _collect_filtered_stubs(value, stubs, revision_stubs)
+
+
+def _prefetch_read_permissions(resource, user_permissions):
+  """Check read permissions of all resources in bulk.
+
+  Returns:
+    tuple of dicts with decisions by (type, id) stubs of resources and of
+    objects of revisions checked for Creators.
+  """
+  stubs, revision_stubs = set(), set()
+  _collect_filtered_stubs(resource, stubs, revision_stubs)
+  read_decisions = user_permissions.is_allowed_bulk("read", stubs)
+  read_for_decisions = {}
+  if revision_stubs and _is_creator():
+    read_for_decisions = user_permissions.is_allowed_for_bulk("read", [
+        stub for stub in revision_stubs
+        if hasattr(ggrc.models.all_models, stub[0])
+    ])
+  return read_decisions, read_for_decisions
+
+
+def filter_resource(resource, depth=0, user_permissions=None,  # noqa
+                    prefetched=None):
   """
+  Read permissions of all nested resources are checked in bulk before the
+  resource is filtered.
+
   Returns:
      The subset of resources which are readable based on user_permissions
   """
@@ -1563,12 +1654,19 @@ def filter_resource(resource, depth=0, user_permissions=None):  # noqa
     user_permissions = permissions.permissions_for(
         get_current_user(use_external_user=False)
     )
+  if prefetched is None:
+    if depth == 0:
+      prefetched = _prefetch_read_permissions(resource, user_permissions)
+    else:
+      prefetched = ({}, {})
+  read_decisions, read_for_decisions = prefetched
 
   if isinstance(resource, (list, tuple)):
     filtered = []
     for sub_resource in resource:
       filtered_sub_resource = filter_resource(
-          sub_resource, depth=depth + 1, user_permissions=user_permissions)
+          sub_resource, depth=depth + 1, user_permissions=user_permissions,
+          prefetched=prefetched)
       if filtered_sub_resource is not None:
         filtered.append(filtered_sub_resource)
     return filtered
@@ -1612,15 +1710,21 @@ def filter_resource(resource, depth=0, user_permissions=None):  # noqa
       if not hasattr(ggrc.models.all_models, resource['resource_type']):
         # there are no permissions for old objects
         return None
-      instance = utils.referenced_objects.get(
-          resource['resource_type'], resource['resource_id']
-      )
-      if instance is None or\
-         not user_permissions.is_allowed_read_for(instance):
-        return None
+      stub = (resource['resource_type'], resource['resource_id'])
+      if stub in read_for_decisions:
+        if not read_for_decisions[stub]:
+          return None
+      else:
+        instance = utils.referenced_objects.get(*stub)
+        if instance is None or\
+           not user_permissions.is_allowed_read_for(instance):
+          return None
     else:
-      if not user_permissions.is_allowed_read(resource['type'],
-                                              resource['id'], None):
+      is_allowed = read_decisions.get((resource['type'], resource['id']))
+      if is_allowed is None:
+        is_allowed = user_permissions.is_allowed_read(resource['type'],
+                                                      resource['id'], None)
+      if not is_allowed:
         return None
     # Then, filter any typed keys
     for key, value in resource.items():
@@ -1631,7 +1735,8 @@ def filter_resource(resource, depth=0, user_permissions=None):  # noqa
         # Apply filtering to sub-resources
         if isinstance(value, dict) and 'type' in value:
           resource[key] = filter_resource(
-              value, depth=depth + 1, user_permissions=user_permissions)
+              value, depth=depth + 1, user_permissions=user_permissions,
+              prefetched=prefetched)
 
     return resource
   else:
@@ -247,3 +247,57 @@ DEFAULT_QUEUE = "ggrc"
 
 APPENGINE_INSTANCE = os.environ.get('APPENGINE_INSTANCE')
 APPENGINE_LOCATION = os.environ.get('APPENGINE_LOCATION', 'us-central1')
+
+# Size in bytes of the csv data chunks written to the storage while exporting
+EXPORT_CHUNK_SIZE = int(os.environ.get("GGRC_EXPORT_CHUNK_SIZE", 1024 * 1024))
+
+# Build blocks of multi-object exports in separate background tasks
+PARALLEL_EXPORT = bool(os.environ.get("GGRC_PARALLEL_EXPORT"))
+
+# Number of id ranges per model handled by separate background tasks during
+# full text reindex, 1 means that all models are reindexed in a single task
+REINDEX_WORKERS = int(os.environ.get("GGRC_REINDEX_WORKERS", 1))
+
+# Number of seconds the maintenance mode flag is cached in process memory and
+# in memcache, they bound the time other instances need to notice a change of
+# the flag. 0 disables the corresponding cache.
+MAINTENANCE_CACHE_TTL = int(os.environ.get("GGRC_MAINTENANCE_CACHE_TTL", 5))
+MAINTENANCE_MEMCACHE_TTL = int(
+    os.environ.get("GGRC_MAINTENANCE_MEMCACHE_TTL", 30))
+
+# Number of imported rows committed in a single transaction with a single
+# event, 1 commits every row separately
+IMPORT_COMMIT_BATCH_SIZE = int(
+    os.environ.get("GGRC_IMPORT_COMMIT_BATCH_SIZE", 1))
+
+# Number of REST resources kept in process memory in front of memcache and
+# the number of seconds they are kept, it bounds the time other instances
+# need to notice a change of a resource. 0 disables the cache.
+RESOURCE_CACHE_L1_SIZE = int(
+    os.environ.get("GGRC_RESOURCE_CACHE_L1_SIZE", 1000))
+RESOURCE_CACHE_L1_TTL = int(os.environ.get("GGRC_RESOURCE_CACHE_L1_TTL", 2))
+
+# Snapshot scopes of parent objects created or updated through the API with
+# more missing snapshots than this number are created by a background task,
+# in chunks of SNAPSHOT_SCOPE_CHUNK_SIZE snapshots committed separately.
+# 0 creates all snapshots in the request.
+SNAPSHOT_SCOPE_BACKGROUND_THRESHOLD = int(
+    os.environ.get("GGRC_SNAPSHOT_SCOPE_BACKGROUND_THRESHOLD", 1000))
+SNAPSHOT_SCOPE_CHUNK_SIZE = int(
+    os.environ.get("GGRC_SNAPSHOT_SCOPE_CHUNK_SIZE", 500))
+
+# Number of recurring workflows whose cycles are built and committed together
+# by the cron job. Setup of all workflows in a chunk is kept in memory until
+# the commit.
+CYCLE_BUILD_CHUNK_SIZE = int(os.environ.get("GGRC_CYCLE_BUILD_CHUNK_SIZE", 10))
+
+# Number of notifications loaded and aggregated together by the daily digest
+# cron job, and the number of separate background tasks sending the digest
+# emails. 1 worker sends all emails in the cron job request.
+DIGEST_NOTIFICATIONS_CHUNK_SIZE = int(
+    os.environ.get("GGRC_DIGEST_NOTIFICATIONS_CHUNK_SIZE", 1000))
+DIGEST_WORKERS = int(os.environ.get("GGRC_DIGEST_WORKERS", 1))
+
+# Flag defining whether emails are only logged instead of being sent, used to
+# run and benchmark notification jobs without a mail service
+LOCAL_MAIL = bool(os.environ.get("GGRC_LOCAL_MAIL"))
@@ -18,3 +18,4 @@ LOGIN_MANAGER = 'ggrc.login.noop'
 MEMCACHE_MECHANISM = False
 EXTERNAL_APP_USER = 'External App <external_app@example.com>'
 ENABLE_RELEASE_NOTES = False
+RESOURCE_CACHE_L1_TTL = 0
@@ -16,9 +16,11 @@ from sqlalchemy.sql.expression import bindparam
 
 from ggrc import db
 from ggrc import models
+from ggrc import settings
 from ggrc.models.hooks import acl
 from ggrc.login import get_current_user_id
 from ggrc.models import all_models
+from ggrc.models import latest_revision
 from ggrc.utils import benchmark
 
 from ggrc.snapshotter.datastructures import Attr
@@ -27,6 +29,7 @@ from ggrc.snapshotter.datastructures import Stub
 from ggrc.snapshotter.datastructures import OperationResponse
 from ggrc.snapshotter.helpers import create_snapshot_dict
 from ggrc.snapshotter.helpers import create_snapshot_revision_dict
+from ggrc.snapshotter.helpers import get_outdated_pairs
 from ggrc.snapshotter.helpers import get_revisions
 from ggrc.snapshotter.helpers import get_snapshots
 from ggrc.snapshotter import indexer
@@ -39,7 +42,7 @@ logger = getLogger(__name__)
 class SnapshotGenerator(object):
   """Geneate snapshots per rules of all connected objects"""
 
-  def __init__(self, dry_run):
+  def __init__(self, dry_run, background=False):
     self.rules = get_rules()
 
     self.parents = set()
@@ -47,6 +50,7 @@ class SnapshotGenerator(object):
     self.snapshots = dict()
     self.context_cache = dict()
     self.dry_run = dry_run
+    self.background = background
     self.manual_snapshots = set()
 
   def add_parent(self, obj):
@@ -181,6 +185,7 @@ class SnapshotGenerator(object):
         event_id = event.id
 
       with benchmark("Snapshot._update.filter"):
+        for_update = self._filter_outdated(for_update, revisions)
         if _filter:
           for_update = {elem for elem in for_update if _filter(elem)}
 
@@ -255,8 +260,21 @@ class SnapshotGenerator(object):
           revision_payload += [data]
 
       with benchmark("Insert Snapshot entries into Revision"):
-        self._execute(models.Revision.__table__.insert(), revision_payload)
-      return OperationResponse("update", True, for_update, response_data)
+        self._insert_revisions(revision_payload)
+      return OperationResponse("update", True, modified_snapshot_keys,
+                               response_data)
+
+  @staticmethod
+  def _filter_outdated(for_update, revisions):
+    """Skip pairs whose snapshots already point to the latest revisions.
+
+    Pairs with explicitly requested revisions are always kept.
+    """
+    outdated = get_outdated_pairs({pair.parent for pair in for_update})
+    return {
+        pair for pair in for_update
+        if pair in outdated or pair in revisions
+    }
 
   def analyze(self):
     """Analyze which snapshots need to be updated and which created"""
@@ -299,6 +317,8 @@ class SnapshotGenerator(object):
     for_create, for_update = self.analyze()
     create, update = None, None
     created, updated = set(), set()
+    if self._create_in_background(for_create, event, revisions, _filter):
+      for_create = set()
 
     if for_update:
       update = self._update(
@@ -334,10 +354,79 @@ class SnapshotGenerator(object):
     if data and not self.dry_run:
       db.session.execute(operation, data)
 
+  def _create_in_background(self, for_create, event, revisions, _filter):
+    """Schedule creation of large snapshot scopes in background tasks.
+
+    Returns:
+      True if snapshots are going to be created in background.
+    """
+    threshold = settings.SNAPSHOT_SCOPE_BACKGROUND_THRESHOLD
+    if (not self.background or self.dry_run or revisions or _filter or
+            not threshold or len(for_create) <= threshold):
+      return False
+    from ggrc import views
+    for parent in {pair.parent for pair in for_create}:
+      views.start_create_snapshots_scope(parent, event)
+    return True
+
+  def create_pairs(self, pairs, event):
+    """Create snapshots for pairs that do not have snapshots yet.
+
+    Returns:
+      set of pairs for which snapshots have been created.
+    """
+    existing = {
+        Pair.from_4tuple(row) for row in db.session.query(
+            models.Snapshot.parent_type,
+            models.Snapshot.parent_id,
+            models.Snapshot.child_type,
+            models.Snapshot.child_id,
+        ).filter(tuple_(
+            models.Snapshot.parent_type, models.Snapshot.parent_id,
+            models.Snapshot.child_type, models.Snapshot.child_id
+        ).in_({pair.to_4tuple() for pair in pairs}))
+    }
+    for_create = set(pairs) - existing
+    if not for_create:
+      return set()
+    result = self._create(for_create=for_create, event=event, revisions={},
+                          _filter=None)
+    return set(result.data["revisions"])
+
+  def create_relationships(self, with_parents=True):
+    """Create relationships between snapshots and with their parents.
+
+    Args:
+      with_parents: create relationships of snapshots with their parents,
+        they can be skipped if they have been created per chunk of pairs.
+    """
+    self._copy_snapshot_relationships()
+    if with_parents:
+      self._create_audit_relationships()
+
+  def create_parent_relationships(self, pairs):
+    """Create relationships between parents and snapshots of the pairs."""
+    snapshot_ids = {snapshot_id for snapshot_id, in db.session.query(
+        models.Snapshot.id
+    ).filter(tuple_(
+        models.Snapshot.parent_type, models.Snapshot.parent_id,
+        models.Snapshot.child_type, models.Snapshot.child_id
+    ).in_({pair.to_4tuple() for pair in pairs}))}
+    if snapshot_ids:
+      self._create_audit_relationships(snapshot_ids)
+
+  def _insert_revisions(self, revision_payload):
+    """Insert snapshot revisions and point snapshots to them as latest."""
+    self._execute(models.Revision.__table__.insert(), revision_payload)
+    if revision_payload and not self.dry_run:
+      latest_revision.update_for_payload(revision_payload)
+
   def create(self, event, revisions, _filter=None):
     """Create snapshots of parent object's neighborhood per provided rules
     and split in chuncks if there are too many snapshottable objects."""
     for_create, _ = self.analyze()
+    if self._create_in_background(for_create, event, revisions, _filter):
+      return OperationResponse("create", True, set(), {"background": True})
     result = self._create(
         for_create=for_create, event=event,
         revisions=revisions, _filter=_filter)
@@ -417,7 +506,7 @@ class SnapshotGenerator(object):
             revision_payload += [data]
 
       with benchmark("Snapshot._create.write revisions to database"):
-        self._execute(models.Revision.__table__.insert(), revision_payload)
+        self._insert_revisions(revision_payload)
       return OperationResponse("create", True, for_create, response_data)
 
   def _copy_snapshot_relationships(self):
@@ -495,11 +584,45 @@ class SnapshotGenerator(object):
 
     return {row.id for row in id_rows}
 
-  def _create_audit_relationships(self):
+  @classmethod
+  def _get_snapshot_audit_relationships(cls, snapshot_ids):
+    """Get ids of relationships between audits and the given snapshots."""
+    relationships_table = all_models.Relationship.__table__
+    select_statement = sa.select([
+        relationships_table.c.id
+    ]).where(
+        sa.and_(
+            relationships_table.c.source_type == all_models.Audit.__name__,
+            relationships_table.c.destination_type ==
+            all_models.Snapshot.__name__,
+            relationships_table.c.destination_id.in_(snapshot_ids),
+        )
+    ).union(
+        sa.select([
+            relationships_table.c.id
+        ]).where(
+            sa.and_(
+                relationships_table.c.destination_type ==
+                all_models.Audit.__name__,
+                relationships_table.c.source_type ==
+                all_models.Snapshot.__name__,
+                relationships_table.c.source_id.in_(snapshot_ids),
+            )
+        )
+    )
+    id_rows = db.session.execute(select_statement).fetchall()
+
+    return {row.id for row in id_rows}
+
+  def _create_audit_relationships(self, snapshot_ids=None):
     """Create relationships between snapshot objects and audits.
 
     Generally snapshots are related to audits by default, but we also duplicate
     this data in relationships table for ACL propagation.
+
+    Args:
+      snapshot_ids: create only relationships of these snapshots instead of
+        all snapshots of the audits.
     """
 
     relationships_table = all_models.Relationship.__table__
@@ -510,7 +633,10 @@ class SnapshotGenerator(object):
     if not audit_ids:
       return
 
-    old_ids = self._get_audit_relationships(audit_ids)
+    if snapshot_ids is None:
+      old_ids = self._get_audit_relationships(audit_ids)
+    else:
+      old_ids = self._get_snapshot_audit_relationships(snapshot_ids)
 
     select_statement = sa.select([
         sa.literal(get_current_user_id()),
@@ -525,6 +651,9 @@ class SnapshotGenerator(object):
     ).where(
         snapshot_table.c.parent_id.in_(audit_ids)
     )
+    if snapshot_ids is not None:
+      select_statement = select_statement.where(
+          snapshot_table.c.id.in_(snapshot_ids))
 
     db.session.execute(
         inserter.from_select(
@@ -541,7 +670,10 @@ class SnapshotGenerator(object):
         )
     )
 
-    new_ids = self._get_audit_relationships(audit_ids)
+    if snapshot_ids is None:
+      new_ids = self._get_audit_relationships(audit_ids)
+    else:
+      new_ids = self._get_snapshot_audit_relationships(snapshot_ids)
     created_ids = new_ids.difference(old_ids)
     acl.add_relationships(created_ids)
 
@@ -595,15 +727,19 @@ class SnapshotGenerator(object):
       db.session.delete(rel)
 
 
-def create_snapshots(objs, event, revisions=None, _filter=None, dry_run=False):
-  """Create snapshots of parent objects."""
+def create_snapshots(objs, event, revisions=None, _filter=None, dry_run=False,
+                     background=False):
+  """Create snapshots of parent objects.
+
+  Large scopes are created by background tasks if background is set.
+  """
   # pylint: disable=unused-argument
   if not revisions:
     revisions = set()
 
   with benchmark("Snapshot.create_snapshots"):
     with benchmark("Snapshot.create_snapshots.init"):
-      generator = SnapshotGenerator(dry_run)
+      generator = SnapshotGenerator(dry_run, background)
       if not isinstance(objs, set):
         objs = {objs}
       for obj in objs:
@@ -616,14 +752,27 @@ def create_snapshots(objs, event, revisions=None, _filter=None, dry_run=False):
                               _filter=_filter)
 
 
-def upsert_snapshots(objs, event, revisions=None, _filter=None, dry_run=False):
-  """Update (and create if needed) snapshots of parent objects."""
+def update_outdated_snapshots(obj, event):
+  """Point outdated snapshots of the parent object to the latest revisions."""
+  with benchmark("Snapshot.update_outdated_snapshots"):
+    generator = SnapshotGenerator(dry_run=False)
+    generator.add_family(Stub.from_object(obj), set())
+    return generator.update(event=event, revisions={})
+
+
+def upsert_snapshots(objs, event, revisions=None, _filter=None, dry_run=False,
+                     background=False):
+  """Update (and create if needed) snapshots of parent objects.
+
+  Large sets of missing snapshots are created by background tasks if
+  background is set.
+  """
   # pylint: disable=unused-argument
   if not revisions:
     revisions = set()
 
   with benchmark("Snapshot.update_snapshots"):
-    generator = SnapshotGenerator(dry_run)
+    generator = SnapshotGenerator(dry_run, background)
     if not isinstance(objs, set):
       objs = {objs}
     for obj in objs:
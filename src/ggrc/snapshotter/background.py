@@ -0,0 +1,94 @@
+# Copyright (C) 2019 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""Background creation of large snapshot scopes.
+
+Snapshots of a parent object with a large scope are created by a background
+task, so the parent object is available right after the request while its
+snapshots are filled in. Children are handled in chunks of a single child
+type ordered by ids. Snapshots of every chunk are related to the parent,
+reindexed and committed together with the checkpoint of the task
+BackgroundOperation, which holds the last handled child and the progress of
+the operation, so they are available from the parent right away. A failed
+task is retried by the task queue and continues after the last committed
+chunk. Children that already have snapshots are skipped, so running the task
+again for the same parent is safe.
+"""
+
+import itertools
+import logging
+
+from ggrc import db
+from ggrc import settings
+from ggrc.models import all_models
+from ggrc.snapshotter import SnapshotGenerator
+from ggrc.snapshotter import indexer
+from ggrc.snapshotter.datastructures import Pair
+from ggrc.snapshotter.datastructures import Stub
+from ggrc.utils import benchmark
+from ggrc.utils import list_chunks
+
+
+logger = logging.getLogger(__name__)
+
+
+def _get_pending_chunks(children, checkpoint, chunk_size):
+  """Split children that are not handled yet into chunks.
+
+  Yields:
+    lists of children of a single type ordered by ids.
+  """
+  pending = sorted(children)
+  if checkpoint:
+    last = Stub(checkpoint["child_type"], checkpoint["last_id"])
+    pending = [child for child in pending if child > last]
+  for _, group in itertools.groupby(pending, key=lambda child: child.type):
+    for chunk in list_chunks(list(group), chunk_size):
+      yield chunk
+
+
+def _save_checkpoint(bg_operation, last_child, done, total):
+  """Store position and progress of the operation."""
+  if bg_operation is None:
+    return
+  bg_operation.checkpoint = {
+      "child_type": last_child.type,
+      "last_id": last_child.id,
+      "done": done,
+      "total": total,
+  }
+
+
+def create_scope(parent, event, bg_operation=None, chunk_size=None):
+  """Create missing snapshots of the parent scope chunk by chunk.
+
+  Args:
+    parent: Stub of the parent object.
+    event: Event the snapshot revisions are logged with.
+    bg_operation: BackgroundOperation holding the checkpoint.
+    chunk_size: number of children handled in a single transaction.
+  """
+  chunk_size = chunk_size or settings.SNAPSHOT_SCOPE_CHUNK_SIZE
+  model = getattr(all_models, parent.type)
+  parent_obj = model.query.get(parent.id)
+  if parent_obj is None:
+    return
+  generator = SnapshotGenerator(dry_run=False)
+  generator.add_parent(parent_obj)
+  children = generator.snapshots[parent]
+  checkpoint = bg_operation.checkpoint if bg_operation else None
+  done = checkpoint["done"] if checkpoint else 0
+  for chunk in _get_pending_chunks(children, checkpoint, chunk_size):
+    with benchmark("Create snapshots of scope chunk"):
+      pairs = {Pair(parent, child) for child in chunk}
+      created = generator.create_pairs(pairs, event)
+      generator.create_parent_relationships(pairs)
+      indexer.reindex_pairs(created)
+      done += len(chunk)
+      _save_checkpoint(bg_operation, chunk[-1], done, len(children))
+      db.session.commit()
+    logger.info("Snapshots of %s %s: %s / %s", parent.type, parent.id,
+                done, len(children))
+  with benchmark("Create snapshot scope relationships"):
+    generator.create_relationships(with_parents=False)
+    db.session.commit()
@@ -6,10 +6,11 @@
 import collections
 from logging import getLogger
 
-from sqlalchemy.sql.expression import tuple_, func
+from sqlalchemy.sql.expression import and_, tuple_, func
 
 from ggrc import db
 from ggrc import models
+from ggrc.models import latest_revision
 from ggrc.snapshotter.datastructures import Stub
 from ggrc.snapshotter.datastructures import Pair
 from ggrc.utils import benchmark
@@ -32,7 +33,10 @@ def get_revision_query_for(statement, filters):
 
 
 def get_revisions_query(child_stubs, revisions, filters=None):
-  """Return revisions query for sent params."""
+  """Return revisions query for sent params.
+
+  Latest revisions of child objects are read from latest_revisions table.
+  """
   queries = []
   if revisions:
     queries.append(get_revision_query_for(
@@ -40,17 +44,9 @@ def get_revisions_query(child_stubs, revisions, filters=None):
         filters,
     ))
   if child_stubs:
-    queries.append(get_revision_query_for(
-        tuple_(
-            models.Revision.resource_type,
-            models.Revision.resource_id,
-        ).in_(
-            child_stubs
-        ),
-        filters,
-    ))
+    queries.append(latest_revision.get_latest_query(child_stubs, filters))
   if not queries:
-    queries.append(get_revision_query_for(True, filters))
+    queries.append(latest_revision.get_latest_query(filters=filters))
   if len(queries) == 1:
     return queries[0]
   return queries[0].union_all(*queries[1:])
@@ -62,6 +58,9 @@ def get_revisions(pairs, revisions, filters=None):
   If revisions dictionary is provided it will validate that the selected
   revision exists in the objects revision history.
 
+  If the latest revision of an object does not match the filters, the latest
+  matching revision is searched in the whole object history.
+
   Args:
     pairs: set([(parent_1, child_1), (parent_2, child_2), ...])
     revisions: dict({(parent, child): revision_id, ...})
@@ -79,11 +78,22 @@ def get_revisions(pairs, revisions, filters=None):
         child_stubs.add(child)
 
     with benchmark("get_revisions.retrieve revisions"):
-      query = get_revisions_query(child_stubs, revisions, filters)
+      rows = get_revisions_query(child_stubs, revisions, filters).all()
+      if filters:
+        missing = child_stubs.difference(
+            Stub(restype, resid) for _, restype, resid in rows)
+        if missing:
+          rows.extend(get_revision_query_for(
+              tuple_(
+                  models.Revision.resource_type,
+                  models.Revision.resource_id,
+              ).in_(missing),
+              filters,
+          ))
 
     revision_id_cache = {}
     with benchmark("get_revisions.create revision_id cache"):
-      for revid, restype, resid in query:
+      for revid, restype, resid in rows:
         child = Stub(restype, resid)
         for parent in parents_cache[child]:
           key = Pair(parent, child)
@@ -97,6 +107,69 @@ def get_revisions(pairs, revisions, filters=None):
     return revision_id_cache
 
 
+def get_outdated_query(parents):
+  """Return query of snapshots that do not point to the latest revisions.
+
+  Snapshots of the parents are joined with latest revision pointers of their
+  children, so the query uses only the snapshots parent index and the primary
+  key of latest_revisions table.
+
+  Args:
+    parents: collection of parent Stubs.
+
+  Returns:
+    query of (snapshot_id, parent_type, parent_id, child_type, child_id,
+    latest revision action) tuples.
+  """
+  pointer = latest_revision.LatestRevision
+  return db.session.query(
+      models.Snapshot.id,
+      models.Snapshot.parent_type,
+      models.Snapshot.parent_id,
+      models.Snapshot.child_type,
+      models.Snapshot.child_id,
+      pointer.action,
+  ).join(
+      pointer,
+      and_(
+          pointer.resource_type == models.Snapshot.child_type,
+          pointer.resource_id == models.Snapshot.child_id,
+      )
+  ).filter(
+      tuple_(
+          models.Snapshot.parent_type,
+          models.Snapshot.parent_id,
+      ).in_({tuple(parent) for parent in parents}),
+      pointer.revision_id != models.Snapshot.revision_id,
+  )
+
+
+def get_outdated_pairs(parents):
+  """Get pairs of snapshots of the parents with newer child revisions."""
+  if not parents:
+    return set()
+  with benchmark("snapshotter.helpers.get_outdated_pairs"):
+    return {
+        Pair.from_4tuple(row[1:5]) for row in get_outdated_query(parents)
+    }
+
+
+def get_outdated_snapshot_ids(parent):
+  """Get ids of outdated snapshots of the parent.
+
+  Returns:
+    tuple of lists with ids of snapshots whose original objects were modified
+    and ids of snapshots whose original objects were deleted.
+  """
+  modified, deleted = [], []
+  for row in get_outdated_query({parent}).order_by(models.Snapshot.id):
+    if row.action == "deleted":
+      deleted.append(row.id)
+    else:
+      modified.append(row.id)
+  return modified, deleted
+
+
 def get_snapshots(objects=None, ids=None):
   with benchmark("snapshotter.helpers.get_snapshots"):
     if objects and ids:
@@ -375,6 +375,8 @@ def reindex_pairs(pairs):
           "resource_type",
           "resource_id",
           "_content",
+      ).joinedload(
+          "_populated_content"
       ),
       orm.load_only(
           "id",
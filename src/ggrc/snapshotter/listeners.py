@@ -18,7 +18,7 @@ def create_all(sender, obj=None, src=None, service=None, event=None):  # noqa
   del sender, service  # Unused
   # We use "operation" for non-standard operations (e.g. cloning)
   if not src.get("operation"):
-    create_snapshots(obj, event)
+    create_snapshots(obj, event, background=True)
 
 
 def upsert_all(
@@ -33,7 +33,7 @@ def upsert_all(
           (Stub.from_dict(revision["parent"]),
            Stub.from_dict(revision["child"])): revision["revision_id"]
           for revision in snapshot_settings.get("revisions", {})}
-      upsert_snapshots(obj, event, revisions=revisions)
+      upsert_snapshots(obj, event, revisions=revisions, background=True)
 
 
 def _copy_snapshot_relationships(*_, **kwargs):
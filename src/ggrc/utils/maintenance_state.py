@@ -0,0 +1,75 @@
+# Copyright (C) 2019 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""Cached maintenance mode state.
+
+The maintenance flag is checked before every request, so it is cached in
+process memory for MAINTENANCE_CACHE_TTL seconds and in memcache for
+MAINTENANCE_MEMCACHE_TTL seconds. Views that toggle the flag drop both
+caches with `invalidate`, so other instances see the change after at most
+MAINTENANCE_CACHE_TTL seconds. A change of the flag made in any other way is
+visible after at most the sum of both TTLs.
+"""
+
+import re
+import time
+
+import sqlalchemy
+from google.appengine.api import memcache
+
+from ggrc import db
+from ggrc import settings
+from ggrc.cache.memcache import has_memcache
+
+
+MEMCACHE_KEY = "maintenance:under_maintenance"
+
+_LOCAL_STATE = {
+    "value": False,
+    "expires_at": 0,
+}
+
+
+def _get_memcache_client():
+  """Get memcache client if the state can be cached in memcache."""
+  if not has_memcache() or settings.MAINTENANCE_MEMCACHE_TTL <= 0:
+    return None
+  return memcache.Client()
+
+
+def _load_state():
+  """Load maintenance flag from the database."""
+  from ggrc.models.maintenance import Maintenance
+  try:
+    db_row = db.session.query(Maintenance).get(1)
+  except sqlalchemy.exc.ProgrammingError as error:
+    if re.search(r"\(1146, \"Table '.+' doesn't exist\"\)$", error.message):
+      return False
+    raise
+  return bool(db_row and db_row.under_maintenance)
+
+
+def is_under_maintenance():
+  """Check if the site is in maintenance mode using cached state."""
+  now = time.time()
+  if _LOCAL_STATE["expires_at"] > now:
+    return _LOCAL_STATE["value"]
+  client = _get_memcache_client()
+  value = client.get(MEMCACHE_KEY) if client else None
+  if value is None:
+    value = _load_state()
+    if client:
+      client.set(MEMCACHE_KEY, int(value),
+                 time=settings.MAINTENANCE_MEMCACHE_TTL)
+  value = bool(value)
+  _LOCAL_STATE["value"] = value
+  _LOCAL_STATE["expires_at"] = now + settings.MAINTENANCE_CACHE_TTL
+  return value
+
+
+def invalidate():
+  """Drop cached maintenance state after the flag has been changed."""
+  _LOCAL_STATE["expires_at"] = 0
+  client = _get_memcache_client()
+  if client:
+    client.delete(MEMCACHE_KEY)
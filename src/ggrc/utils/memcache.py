@@ -100,6 +100,35 @@ def blob_get(cache, key, key_prefix="", namespace=None):
     return None
 
 
+def blob_get_multi(cache, keys, namespace=None):
+  """Load several objects stored with blob_set from memcache.
+
+  Chunks of all objects are fetched with a single request.
+
+  Returns:
+      dict with loaded objects for keys that are fully present in memcache.
+  """
+  chunk_keys_map = cache.get_multi(keys=list(keys), namespace=namespace)
+  chunk_map = cache.get_multi(
+      keys=[chunk_key
+            for chunk_keys in chunk_keys_map.itervalues()
+            for chunk_key in chunk_keys],
+      namespace=namespace,
+  )
+  result = {}
+  for key, chunk_keys in chunk_keys_map.iteritems():
+    if not chunk_keys or any(chunk_key not in chunk_map
+                             for chunk_key in chunk_keys):
+      continue
+    compressed_value = ''.join(chunk_map[chunk_key]
+                               for chunk_key in chunk_keys)
+    try:
+      result[key] = _decode_data(compressed_value)
+    except Exception:  # pylint: disable=broad-except
+      logger.error("Failed to uncompress object from memcache")
+  return result
+
+
 def create_chunk_map(value, chunk_size, key_prefix):
   """Split value to several chunks of data and associate them with keys."""
   chunk_map = collections.OrderedDict()
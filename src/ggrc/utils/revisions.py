@@ -7,6 +7,7 @@ from logging import getLogger
 
 from ggrc import db
 from ggrc.models import all_models
+from ggrc.models import latest_revision
 
 
 logger = getLogger(__name__)
@@ -102,6 +103,7 @@ def do_missing_revisions():
             obj_id, obj_type, obj_content, event.id, action, modified_by_id
         ))
     db.session.execute(revisions_table.insert(), revisions)
+    latest_revision.update_for_payload(revisions)
     db.session.commit()
   db.session.execute("truncate objects_without_revisions")
 
@@ -112,9 +114,13 @@ def get_last_revision_content(obj_type, obj_id):
    we need to get content of latest known revision
    """
   content = None
-  last_revision = all_models.Revision.query.filter_by(
-      resource_type=obj_type, resource_id=obj_id
-  ).order_by(all_models.Revision.created_at.desc()).first()
+  last_revision = all_models.Revision.query.join(
+      all_models.LatestRevision,
+      all_models.LatestRevision.revision_id == all_models.Revision.id,
+  ).filter(
+      all_models.LatestRevision.resource_type == obj_type,
+      all_models.LatestRevision.resource_id == obj_id,
+  ).first()
   if last_revision and last_revision.action == u"deleted":
     logger.info("Deleted revision already logged for Object '%s' "
                 "with id '%s', 'deleted' revision generation skipped",
@@ -122,3 +128,17 @@ def get_last_revision_content(obj_type, obj_id):
   else:
     content = last_revision.content if last_revision else None
   return content
+
+
+def get_revisions_by_type(resource_type):
+  """Get latest revision ids of all objects of the given type.
+
+  Returns:
+    dict with revision ids by object ids.
+  """
+  return dict(db.session.query(
+      all_models.LatestRevision.resource_id,
+      all_models.LatestRevision.revision_id,
+  ).filter(
+      all_models.LatestRevision.resource_type == resource_type,
+  ))
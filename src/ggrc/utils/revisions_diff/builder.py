@@ -7,7 +7,9 @@ instance state and proposed content."""
 import collections
 
 from flask import g
+from sqlalchemy.sql.expression import tuple_
 
+from ggrc.utils import list_chunks
 from ggrc.utils.revisions_diff import meta_info
 
 
@@ -19,12 +21,12 @@ def get_latest_revision_content(instance):
   key = (instance.type, instance.id)
   content = g.latest_revision_content.get(key)
   if not content:
-    content = all_models.Revision.query.filter(
-        all_models.Revision.resource_id == instance.id,
-        all_models.Revision.resource_type == instance.type
-    ).order_by(
-        all_models.Revision.created_at.desc(),
-        all_models.Revision.id.desc(),
+    content = all_models.Revision.query.join(
+        all_models.LatestRevision,
+        all_models.LatestRevision.revision_id == all_models.Revision.id,
+    ).filter(
+        all_models.LatestRevision.resource_id == instance.id,
+        all_models.LatestRevision.resource_type == instance.type
     ).first().content
     g.latest_revision_content[key] = content
   return content
@@ -48,28 +50,20 @@ def rewarm_latest_content():
   del g.latest_revision_content_markers
   if not cache:
     return
-  query = all_models.Revision.query.filter(
-      all_models.Revision.resource_type == cache.keys()[0],
-      all_models.Revision.resource_id.in_(cache[cache.keys()[0]])
-  )
-  for type_, ids in cache.items()[1:]:
-    query = query.union_all(
-        all_models.Revision.query.filter(
-            all_models.Revision.resource_type == type_,
-            all_models.Revision.resource_id.in_(ids)
-        ))
-  query = query.order_by(
-      all_models.Revision.resource_id,
-      all_models.Revision.resource_type,
-      all_models.Revision.created_at.desc(),
-      all_models.Revision.id.desc(),
-  )
-  key = None
-  for revision in query:
-    if key == (revision.resource_type, revision.resource_id):
-      continue
-    key = (revision.resource_type, revision.resource_id)
-    g.latest_revision_content[key] = revision.content
+  stubs = [(type_, id_) for type_, ids in cache.iteritems() for id_ in ids]
+  for chunk in list_chunks(stubs):
+    query = all_models.Revision.query.join(
+        all_models.LatestRevision,
+        all_models.LatestRevision.revision_id == all_models.Revision.id,
+    ).filter(
+        tuple_(
+            all_models.LatestRevision.resource_type,
+            all_models.LatestRevision.resource_id,
+        ).in_(chunk)
+    )
+    for revision in query:
+      key = (revision.resource_type, revision.resource_id)
+      g.latest_revision_content[key] = revision.content
 
 
 def get_person_email(person_id):
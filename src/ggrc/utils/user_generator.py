@@ -83,9 +83,10 @@ def is_authorized_domain(email):
   return user_domain.lower() == settings.AUTHORIZED_DOMAIN.lower()
 
 
-def find_or_create_user_by_email(email, name, modifier=None):
+def find_or_create_user_by_email(email, name, modifier=None,
+                                 user_lookup=find_user_by_email):
   """Generates or find user for selected email."""
-  user = find_user_by_email(email)
+  user = user_lookup(email)
   if not user:
     if not modifier:
       modifier = get_current_user_id()
@@ -168,24 +169,30 @@ def parse_user_email(request, header, mandatory):
   return email
 
 
-def find_user(email, modifier=None):
+def find_user(email, modifier=None, user_lookup=find_user_by_email):
   """Find or generate user.
 
   If Integration Server is specified not found in DB user is generated
   with Creator role.
+
+  Args:
+    email: user email.
+    modifier: id of the person who creates the user.
+    user_lookup: function returning an existing user by email, it allows to
+      look the user up among prefetched people.
   """
   if is_external_app_user_email(email):
     return find_or_create_ext_app_user()
 
   if settings.INTEGRATION_SERVICE_URL == 'mock':
-    return find_or_create_user_by_email(email, email, modifier)
+    return find_or_create_user_by_email(email, email, modifier, user_lookup)
 
   if settings.INTEGRATION_SERVICE_URL:
     name = search_user(email)
     if not name:
       return None
-    return find_or_create_user_by_email(email, name, modifier)
-  return find_user_by_email(email)
+    return find_or_create_user_by_email(email, name, modifier, user_lookup)
+  return user_lookup(email)
 
 
 def find_users(emails):
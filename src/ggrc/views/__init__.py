@@ -15,27 +15,32 @@ import sqlalchemy
 import flask
 from werkzeug import exceptions
 
-from ggrc import fulltext, login, models, settings, utils as ggrc_utils, \
-    extensions as ggrc_extensions, converters as ggrc_converters
+from ggrc import fulltext, login, models, settings, snapshotter, \
+    utils as ggrc_utils, extensions as ggrc_extensions, \
+    converters as ggrc_converters
 from ggrc.app import app, db
 from ggrc.builder import json as builder_json
-from ggrc.cache import utils as cache_utils
-from ggrc.fulltext import mixin
+from ggrc.fulltext import reindex as reindex_engine
 from ggrc.integrations import integrations_errors, issues
-from ggrc.models import background_task, reflection, revision
+from ggrc.models import background_task, maintenance, reflection, \
+    revision, revision_content
 from ggrc.models.hooks.issue_tracker import integration_utils
 from ggrc.notifications import common
 from ggrc.query import views as query_views
 from ggrc.rbac import permissions
 from ggrc.services import common as services_common
-from ggrc.snapshotter import rules, indexer as snapshot_indexer
+from ggrc.snapshotter import rules, indexer as snapshot_indexer, \
+    helpers as snapshot_helpers
+from ggrc.snapshotter.datastructures import Stub
 from ggrc.utils import benchmark, helpers, log_event, revisions
 from ggrc.views import converters, cron, filters, notifications, registry, \
     utils
 
 
 logger = logging.getLogger(__name__)
-REINDEX_CHUNK_SIZE = 100
+
+# Format of digest run start times passed to background tasks
+DIGEST_STARTED_AT_FORMAT = "%Y-%m-%d %H:%M:%S"
 
 
 # Needs to be secured as we are removing @login_required
@@ -67,9 +72,33 @@ def reindex_snapshots(_):
 
 @app.route("/_background_tasks/reindex", methods=["POST"])
 @background_task.queued_task
-def reindex(_):
+def reindex(task):
   """Web hook to update the full text search index."""
-  do_reindex()
+  do_reindex(incremental=bool(task.parameters.get("incremental")))
+  return app.make_response(("success", 200, [("Content-Type", "text/html")]))
+
+
+@app.route("/_background_tasks/reindex_range", methods=["POST"])
+@background_task.queued_task
+def reindex_range(task):
+  """Web hook to update the full text search index for a range of ids."""
+  checkpoint = maintenance.ReindexCheckpoint.query.get(
+      task.parameters["checkpoint_id"])
+  if checkpoint and not checkpoint.is_complete:
+    reindex_engine.warm_indexer_cache()
+    reindex_engine.reindex_checkpoint(
+        checkpoint, bool(task.parameters.get("incremental")))
+    fulltext.get_indexer().invalidate_cache()
+  return app.make_response(("success", 200, [("Content-Type", "text/html")]))
+
+
+@app.route("/_background_tasks/send_digest_shard", methods=["POST"])
+@background_task.queued_task
+def send_digest_shard(task):
+  """Web hook to send daily digest emails of a single shard."""
+  started_at = datetime.datetime.strptime(task.parameters["started_at"],
+                                          DIGEST_STARTED_AT_FORMAT)
+  common.send_digest_shard(started_at, task.parameters["shard"])
   return app.make_response(("success", 200, [("Content-Type", "text/html")]))
 
 
@@ -81,6 +110,14 @@ def full_reindex(_):
   return app.make_response(("success", 200, [("Content-Type", "text/html")]))
 
 
+@app.route("/_background_tasks/fill_revision_contents", methods=["POST"])
+@background_task.queued_task
+def fill_revision_contents(_):
+  """Web hook to store populated content of all revisions."""
+  revision_content.fill_revision_contents()
+  return app.make_response(("success", 200, [("Content-Type", "text/html")]))
+
+
 @app.route("/_background_tasks/compute_attributes", methods=["POST"])
 @background_task.queued_task
 def compute_attributes(task):
@@ -104,6 +141,26 @@ def compute_attributes(task):
     return app.make_response(("success", 200, [("Content-Type", "text/html")]))
 
 
+@app.route("/_background_tasks/create_snapshots", methods=["POST"])
+@background_task.queued_task
+def create_snapshots_scope(task):
+  """Web hook to create snapshots of a large parent object scope."""
+  from ggrc.snapshotter import background as snapshot_background
+  parent = Stub.from_dict(task.parameters["parent"])
+  event = models.Event.query.get(task.parameters["event_id"])
+  if event is None:
+    event = models.Event(action="BULK")
+    db.session.add(event)
+    db.session.commit()
+  try:
+    snapshot_background.create_scope(parent, event, task.bg_operation)
+  except Exception as error:  # pylint: disable=broad-except
+    logger.exception("Creation of snapshots of %s %s failed.",
+                     parent.type, parent.id)
+    raise background_task.RetryTask(error.message)
+  return app.make_response(("success", 200, [("Content-Type", "text/html")]))
+
+
 @app.route("/_background_tasks/indexing", methods=["POST"])
 @background_task.queued_task
 def bg_update_ft_records(task):
@@ -329,6 +386,26 @@ def start_compute_attributes(revision_ids=None, event_id=None):
   db.session.commit()
 
 
+def start_create_snapshots_scope(parent, event):
+  """Start a background task to create snapshots of the parent scope."""
+  if background_task.bg_operation_running("create_snapshots", parent.type,
+                                          parent.id):
+    logger.info("Snapshots of %s %s are already being created.",
+                parent.type, parent.id)
+    return
+  background_task.create_task(
+      name="create_snapshots",
+      url=flask.url_for(create_snapshots_scope.__name__),
+      parameters={
+          "parent": {"type": parent.type, "id": parent.id},
+          "event_id": event.id,
+      },
+      queued_callback=create_snapshots_scope,
+      operation_type="create_snapshots",
+  )
+  db.session.commit()
+
+
 def start_update_audit_issues(audit_id, message):
   """Start a background task to update IssueTracker issues related to Audit."""
   bg_task = background_task.create_task(
@@ -355,44 +432,68 @@ def generate_wf_tasks_notifications(_):
 
 
 @helpers.without_sqlalchemy_cache
-def do_reindex(with_reindex_snapshots=False):
-  """Update the full text search index."""
+def do_reindex(with_reindex_snapshots=False, incremental=False):
+  """Update the full text search index.
 
-  indexer = fulltext.get_indexer()
-  indexed_models = {
-      m.__name__: m for m in models.all_models.all_models
-      if issubclass(m, mixin.Indexed) and m.REQUIRED_GLOBAL_REINDEX
-  }
-  people_query = db.session.query(
-      models.all_models.Person.id,
-      models.all_models.Person.name,
-      models.all_models.Person.email
-  )
-  indexer.cache["people_map"] = {p.id: (p.name, p.email) for p in people_query}
-  indexer.cache["ac_role_map"] = dict(db.session.query(
-      models.all_models.AccessControlRole.id,
-      models.all_models.AccessControlRole.name,
-  ))
-  for model_name in sorted(indexed_models.keys()):
-    logger.info("Updating index for: %s", model_name)
-    with benchmark("Create records for %s" % model_name):
-      model = indexed_models[model_name]
-      ids = [id_[0] for id_ in db.session.query(model.id)]
-      ids_count = len(ids)
-      handled_ids = 0
-      ids_chunks = ggrc_utils.list_chunks(ids, chunk_size=REINDEX_CHUNK_SIZE)
-      for ids_chunk in ids_chunks:
-        handled_ids += len(ids_chunk)
-        logger.info("%s: %s / %s", model.__name__, handled_ids, ids_count)
-        model.bulk_record_update_for(ids_chunk)
-        db.session.plain_commit()
+  An interrupted reindex is continued from its checkpoints instead of
+  starting a new one. If REINDEX_WORKERS setting is greater than 1, id ranges
+  of every model are reindexed in separate background tasks.
+
+  Args:
+    with_reindex_snapshots: reindex snapshots after all other models.
+    incremental: skip objects that have not been changed since the last
+      completed reindex.
+  """
+  checkpoints = (reindex_engine.get_unfinished_checkpoints() or
+                 reindex_engine.create_checkpoints(settings.REINDEX_WORKERS))
+  if settings.REINDEX_WORKERS > 1:
+    start_reindex_workers(checkpoints, incremental)
+  else:
+    reindex_engine.warm_indexer_cache()
+    for checkpoint in checkpoints:
+      logger.info("Updating index for: %s", checkpoint.model_name)
+      reindex_engine.reindex_checkpoint(checkpoint, incremental)
+    fulltext.get_indexer().invalidate_cache()
 
   if with_reindex_snapshots:
     logger.info("Updating index for: %s", "Snapshot")
     with benchmark("Create records for %s" % "Snapshot"):
       snapshot_indexer.reindex()
 
-  indexer.invalidate_cache()
+
+def start_reindex_workers(checkpoints, incremental=False):
+  """Start reindex of every checkpoint range in a separate background task."""
+  checkpoint_ids = [checkpoint.id for checkpoint in checkpoints]
+  for checkpoint_id in checkpoint_ids:
+    background_task.create_task(
+        name="reindex_range",
+        url=flask.url_for(reindex_range.__name__),
+        parameters={
+            "checkpoint_id": checkpoint_id,
+            "incremental": incremental,
+        },
+        queued_callback=reindex_range,
+    )
+    db.session.commit()
+
+
+def start_digest_workers(shards):
+  """Start sending of every daily digest shard in a separate background task.
+
+  Args:
+    shards: list of (started_at, shard) pairs of unsent digest emails.
+  """
+  for started_at, shard in shards:
+    background_task.create_task(
+        name="send_digest_shard",
+        url=flask.url_for(send_digest_shard.__name__),
+        parameters={
+            "started_at": started_at.strftime(DIGEST_STARTED_AT_FORMAT),
+            "shard": shard,
+        },
+        queued_callback=send_digest_shard,
+    )
+    db.session.commit()
 
 
 @helpers.without_sqlalchemy_cache
@@ -685,10 +786,15 @@ def admin_reindex_snapshots():
 @login.admin_required
 def admin_reindex():
   """Calls a webhook that reindexes indexable objects
+
+  Objects that have not been changed since the last reindex are skipped if
+  "incremental" flag is sent in the request json.
   """
+  request_json = flask.request.get_json(silent=True) or {}
   bg_task = background_task.create_task(
       name="reindex",
       url=flask.url_for(reindex.__name__),
+      parameters={"incremental": bool(request_json.get("incremental"))},
       queued_callback=reindex,
   )
   db.session.commit()
@@ -714,6 +820,23 @@ def admin_full_reindex():
                          [('Content-Type', 'text/html')])))
 
 
+@app.route("/admin/fill_revision_contents", methods=["POST"])
+@login.login_required
+@login.admin_required
+def admin_fill_revision_contents():
+  """Calls a webhook that stores populated content of all revisions
+  """
+  bg_task = background_task.create_task(
+      name="fill_revision_contents",
+      url=flask.url_for(fill_revision_contents.__name__),
+      queued_callback=fill_revision_contents,
+  )
+  db.session.commit()
+  return bg_task.make_response(
+      app.make_response(("scheduled %s" % bg_task.name, 200,
+                         [('Content-Type', 'text/html')])))
+
+
 @app.route("/admin/compute_attributes", methods=["POST"])
 @login.login_required
 @login.admin_required
@@ -808,6 +931,7 @@ def get_background_task_status(object_type, object_id):
         "status": task.status,
         "operation": task.bg_operation.bg_operation_type.name,
         "errors": task.get_content().get("errors", []),
+        "progress": task.bg_operation.checkpoint,
     }
     response = app.make_response(
         (json.dumps(body), 200, [("Content-Type", "application/json")])
@@ -939,7 +1063,6 @@ def make_document_admin():
   for doc in docs:
     doc.add_admin_role()
   db.session.commit()
-  cache_utils.clear_permission_cache()
   response = utils.DocumentEndpoint.build_make_admin_response(
       flask.request.json,
       docs
@@ -947,6 +1070,50 @@ def make_document_admin():
   return flask.Response(json.dumps(response), mimetype='application/json')
 
 
+def _get_snapshot_parent(audit_id, permission_check):
+  """Get audit checking that the current user has access to it."""
+  audit = models.all_models.Audit.query.get(audit_id)
+  if audit is None:
+    raise exceptions.NotFound()
+  if not permission_check("Audit", audit.id, audit.context_id):
+    raise exceptions.Forbidden()
+  return audit
+
+
+@app.route("/api/audits/<int:audit_id>/outdated_snapshots", methods=["GET"])
+@login.login_required
+def get_outdated_snapshots(audit_id):
+  """Get snapshots of an audit that do not point to the latest revisions."""
+  audit = _get_snapshot_parent(audit_id, permissions.is_allowed_read)
+  modified_ids, deleted_ids = snapshot_helpers.get_outdated_snapshot_ids(
+      Stub.from_object(audit))
+  response = {
+      "count": len(modified_ids),
+      "ids": modified_ids,
+      "deleted_ids": deleted_ids,
+  }
+  return flask.Response(json.dumps(response), mimetype='application/json')
+
+
+@app.route("/api/audits/<int:audit_id>/outdated_snapshots", methods=["PUT"])
+@login.login_required
+def update_outdated_snapshots(audit_id):
+  """Update all outdated snapshots of an audit to the latest revisions."""
+  audit = _get_snapshot_parent(audit_id, permissions.is_allowed_update)
+  event = models.Event(
+      modified_by_id=login.get_current_user_id(),
+      action="PUT",
+      resource_id=audit.id,
+      resource_type=audit.type,
+  )
+  db.session.add(event)
+  db.session.flush()
+  result = snapshotter.update_outdated_snapshots(audit, event)
+  db.session.commit()
+  response = {"count": len(result.response)}
+  return flask.Response(json.dumps(response), mimetype='application/json')
+
+
 @app.route("/generate_children_issues", methods=["POST"])
 @login.login_required
 def generate_children_issues():
@@ -32,7 +32,8 @@ from ggrc.cloud_api import task_queue
 from ggrc.converters import get_exportables
 from ggrc.converters.base import ImportConverter, ExportConverter
 from ggrc.converters.import_helper import count_objects, \
-    read_csv_file, get_export_filename, get_object_column_definitions
+    read_csv_file, get_export_filename, get_object_column_definitions, \
+    pad_csv_chunks
 from ggrc.gdrive import file_actions as fa
 from ggrc.models import import_export, background_task, all_models
 from ggrc.notifications import job_emails
@@ -176,6 +177,22 @@ def make_export(objects, exportable_objects=None):
   return csv_data, object_names
 
 
+def get_export_block_queries(objects, exportable_objects=None):
+  """Get object queries with resolved ids for every exported block."""
+  ids_by_type = QueryHelper(objects).get_ids()
+  if not exportable_objects:
+    return ids_by_type
+  return [object_query for index, object_query in enumerate(ids_by_type)
+          if index in exportable_objects]
+
+
+def stream_export(block_queries, sink):
+  """Make export of resolved block queries passing csv data to sink."""
+  converter = ExportConverter(ids_by_type=block_queries)
+  converter.stream_csv_data(sink)
+  return "_".join(converter.get_object_names())
+
+
 def check_import_file():
   """Check if imported file format and type is valid"""
   if "file" not in request.files or not request.files["file"]:
@@ -237,6 +254,27 @@ def check_for_previous_run():
     raise InternalServerError(app_errors.PREVIOUS_RUN_FAILED)
 
 
+def handle_export_failure(ie_id, user, error):
+  """Mark export job as failed and notify the user."""
+  logger.exception("Export failed: %s", error.message)
+  db.session.rollback()  # drop partially written content
+  ie = import_export.get(ie_id)
+  try:
+    import_export.delete_export_blocks(ie_id)
+    if ie.status == "Stopped":
+      # Block tasks fail when the export is stopped while they are running
+      db.session.commit()
+      return utils.make_simple_response()
+    ie.status = "Failed"
+    ie.end_at = datetime.utcnow()
+    db.session.commit()
+    job_emails.send_email(job_emails.EXPORT_FAILED, user.email)
+    return utils.make_simple_response(error.message)
+  except Exception as e:  # pylint: disable=broad-except
+    logger.exception("%s: %s", app_errors.STATUS_SET_FAILED, e.message)
+    return utils.make_simple_response(e.message)
+
+
 @app.route("/_background_tasks/run_export", methods=["POST"])
 @background_task.queued_task
 def run_export(task):
@@ -250,34 +288,129 @@ def run_export(task):
     ie = import_export.get(ie_id)
     check_for_previous_run()
 
-    content, _ = make_export(objects, exportable_objects)
+    block_queries = get_export_block_queries(objects, exportable_objects)
+    if settings.PARALLEL_EXPORT and len(block_queries) > 1:
+      start_parallel_export(ie_id, block_queries)
+      return utils.make_simple_response()
+
+    stream_export(block_queries, import_export.content_writer(ie_id))
     db.session.refresh(ie)
     if ie.status == "Stopped":
       return utils.make_simple_response()
     ie.status = "Finished"
     ie.end_at = datetime.utcnow()
-    ie.content = content
     db.session.commit()
 
     job_emails.send_email(job_emails.EXPORT_COMPLETED, user.email,
                           ie.title, ie_id)
 
   except Exception as e:  # pylint: disable=broad-except
-    logger.exception("Export failed: %s", e.message)
+    return handle_export_failure(ie_id, user, e)
+
+  return utils.make_simple_response()
+
+
+def start_parallel_export(ie_id, block_queries):
+  """Start building every export block in a separate background task.
+
+  Content of each block is written to chunks of its own ExportBlock entry.
+  The task that finishes the last block joins all blocks into the export
+  content.
+  """
+  blocks = [all_models.ExportBlock(import_export_id=ie_id, block_index=index)
+            for index in range(len(block_queries))]
+  db.session.add_all(blocks)
+  db.session.commit()
+  block_ids = [block.id for block in blocks]
+
+  for block_id, block_query in zip(block_ids, block_queries):
+    background_task.create_task(
+        name="export_block",
+        url=flask.url_for(run_export_block.__name__),
+        parameters={
+            "ie_id": ie_id,
+            "block_id": block_id,
+            "block_query": block_query,
+        },
+        queue="ggrcImport",
+        queued_callback=run_export_block,
+        retry_options={"task_retry_limit": 0},
+    )
+    db.session.commit()
+
+
+@app.route("/_background_tasks/run_export_block", methods=["POST"])
+@background_task.queued_task
+def run_export_block(task):
+  """Build a single block of the parallel export."""
+  user = get_current_user()
+  ie_id = task.parameters.get("ie_id")
+  block_id = task.parameters.get("block_id")
+  block_query = task.parameters.get("block_query")
+
+  try:
     ie = import_export.get(ie_id)
-    try:
-      ie.status = "Failed"
-      ie.end_at = datetime.utcnow()
-      db.session.commit()
-      job_emails.send_email(job_emails.EXPORT_FAILED, user.email)
-      return utils.make_simple_response(e.message)
-    except Exception as e:  # pylint: disable=broad-except
-      logger.exception("%s: %s", app_errors.STATUS_SET_FAILED, e.message)
-      return utils.make_simple_response(e.message)
+    if ie.status != "In Progress":
+      return utils.make_simple_response()
+
+    converter = ExportConverter(ids_by_type=[block_query])
+    converter.stream_csv_data(import_export.content_writer(ie_id, block_id))
+    block = all_models.ExportBlock.query.get(block_id)
+    block.table_width = converter.table_width
+    db.session.commit()
+
+    if finish_parallel_export(ie_id):
+      job_emails.send_email(job_emails.EXPORT_COMPLETED, user.email,
+                            ie.title, ie_id)
+
+  except Exception as e:  # pylint: disable=broad-except
+    return handle_export_failure(ie_id, user, e)
 
   return utils.make_simple_response()
 
 
+def finish_parallel_export(ie_id):
+  """Join export blocks into the export content if all blocks are built.
+
+  The export job row is locked, so only one of the block tasks can see all
+  blocks finished and join them. Blocks narrower than the widest one are
+  padded the same way as in the serial export.
+
+  Returns:
+    True if the export has been finished by this call.
+  """
+  export_block = all_models.ExportBlock
+  ie = all_models.ImportExport.query.filter_by(
+      id=ie_id
+  ).with_for_update().populate_existing().one()
+  blocks = export_block.query.filter_by(
+      import_export_id=ie_id
+  ).order_by(
+      export_block.block_index
+  ).with_for_update().populate_existing().all()
+  if ie.status != "In Progress" or any(block.table_width is None
+                                       for block in blocks):
+    db.session.commit()  # release the lock
+    return False
+
+  table_width = max(block.table_width for block in blocks)
+  write = import_export.content_writer(ie_id)
+  for block in blocks:
+    chunks = (chunk.encode("utf-8") for chunk
+              in import_export.iter_content(ie_id, block.id))
+    if block.table_width == table_width:
+      for chunk in chunks:
+        write(chunk)
+    else:
+      pad_csv_chunks(chunks, table_width, write)
+  import_export.delete_export_blocks(ie_id)
+
+  ie.status = "Finished"
+  ie.end_at = datetime.utcnow()
+  db.session.commit()
+  return True
+
+
 @app.route("/_background_tasks/run_import_phases", methods=["POST"])  # noqa: ignore=C901
 @background_task.queued_task
 def run_import_phases(task):
@@ -534,7 +667,8 @@ def handle_file_download(id2):
   try:
     export_to = request.args.get("export_to")
     ie = import_export.get(id2)
-    return export_file(export_to, ie.title, ie.content.encode("utf-8"))
+    content = import_export.get_content(ie)
+    return export_file(export_to, ie.title, content.encode("utf-8"))
   except (Forbidden, NotFound, Unauthorized):
     raise
   except Exception as e:
@@ -653,6 +787,7 @@ def handle_export_stop(**kwargs):
       # Stop tasks only on non local instance
       if getattr(settings, "APPENGINE_INSTANCE", "local") != "local":
         stop_ie_bg_tasks(ie_job)
+      import_export.delete_export_blocks(ie_job.id)
       db.session.commit()
       return make_import_export_response(ie_job.log_json())
   except Forbidden:
@@ -3,9 +3,12 @@
 
 """RBAC module"""
 
+import collections
 import datetime
 import itertools
+import json
 import logging
+import time
 
 import flask
 import sqlalchemy as sa
@@ -14,8 +17,10 @@ from sqlalchemy import orm
 
 from ggrc import db
 from ggrc import settings
+from ggrc.login import admin_required
 from ggrc.login import is_external_app_user
 from ggrc.login import get_current_user
+from ggrc.login import login_required
 from ggrc.models import all_models
 
 from ggrc.access_control.roleable import Roleable
@@ -44,7 +49,14 @@ blueprint = flask.Blueprint(
     static_url_path='/static/ggrc_basic_permissions',
 )
 
-PERMISSION_CACHE_TIMEOUT = 3600  # 60 minutes
+PERMISSION_CACHE_TIMEOUT = cache_utils.PERMISSION_CACHE_TIMEOUT
+
+PERMISSION_METRICS_KEYS = {
+    "hits": "permissions:metrics:hits",
+    "misses": "permissions:metrics:misses",
+    "rebuilds": "permissions:metrics:rebuilds",
+    "rebuild_ms": "permissions:metrics:rebuild_ms",
+}
 
 
 def get_public_config(_):
@@ -150,14 +162,17 @@ def _get_memcache_client():
 
 
 def query_memcache(cache, key):
-  """Get cached permissions from memcache is available
+  """Get cached permission segments from memcache is available
+
+  The segments index is read for compare-and-set, so the same client must be
+  used for storing rebuilt segments.
 
   Args:
       cache (memcache client): mecahce client
-      key (string): key of the stored permissions
+      key (string): key of the stored permission segments index
   Returns:
-      permissions_cache (dict): dict with all permissions or None if there
-                                was a cache miss
+      tuple of segments index and dict with cached segments by segment name.
+      Index is None if there was a cache miss for the whole permissions.
   """
 
   cached_keys_set = cache.get('permissions:list') or set()
@@ -166,9 +181,17 @@ def query_memcache(cache, key):
     # remove all permissions related keys from memcache
     cached_keys_set.add(key)
     cache.set('permissions:list', cached_keys_set, PERMISSION_CACHE_TIMEOUT)
-    return None
-
-  return memcache.blob_get(cache, key)
+    return None, {}
+
+  index = cache.gets(key)
+  if not isinstance(index, dict):
+    return None, {}
+  cached = memcache.blob_get_multi(cache, index.values())
+  return index, {
+      segment: cached[segment_key]
+      for segment, segment_key in index.iteritems()
+      if segment_key in cached
+  }
 
 
 def load_default_permissions(permissions):
@@ -353,14 +376,25 @@ def _get_acl_filter(acl_model):
   ]
 
 
-def load_access_control_list(user, permissions):
-  """Load permissions from access_control_list"""
+def load_access_control_list(user, permissions, object_types=None):
+  """Load permissions from access_control_list
+
+  Args:
+      user (Person): Person object
+      permissions (dict): dict where the permissions will be stored
+      object_types (iterable): object types for which permissions are loaded,
+                               all types are loaded if not set
+  Returns:
+      None
+  """
   acl_base = db.aliased(all_models.AccessControlList, name="acl_base")
   acl_propagated = db.aliased(all_models.AccessControlList,
                               name="acl_propagated")
   acr = all_models.AccessControlRole
   acp = all_models.AccessControlPerson
   additional_filters = _get_acl_filter(acl_propagated)
+  if object_types is not None:
+    additional_filters.append(acl_propagated.object_type.in_(object_types))
   access_control_list = db.session.query(
       acl_propagated.object_type,
       acl_propagated.object_id,
@@ -388,55 +422,151 @@ def load_access_control_list(user, permissions):
           .add(object_id)
 
 
-def store_results_into_memcache(permissions, cache, key):
-  """Load personal context for user
+# Loaders of permission segments that do not depend on ACL entries. Each of
+# them is cached separately from the others and from ACL segments.
+SEGMENT_LOADERS = (
+    ("default", lambda _, permissions: load_default_permissions(permissions)),
+    ("bootstrap_admin", load_bootstrap_admin),
+    ("external_app",
+     lambda _, permissions: load_external_app_permissions(permissions)),
+    ("user_roles", load_user_roles),
+    ("personal_context", load_personal_context),
+)
+
+
+def store_results_into_memcache(segments, cache, user_id, index=None):
+  """Store permission segments into memcache
 
   This function must only be called if memcahe is enabled
 
   Args:
-      permissions (dict): dict where the permissions will be stored
+      segments (dict): permissions dicts by segment name
       cache (cache_manager): Cache manager that should be used for storing
                              permissions
-      key (string): key of under which permissions should be stored
+      user_id (int): id of the user the permissions belong to
+      index (dict): segments index read from memcache if only the segments
+                    missing in it have been loaded
   Returns:
       None
   """
+  key = cache_utils.get_permissions_key(user_id)
+  if index is None:
+    cached_keys_set = cache.get('permissions:list') or set()
+    if key not in cached_keys_set:
+      return
+    index = {}
+    store_index = cache.add
+  else:
+    index = dict(index)
+    store_index = cache.cas
+
+  stored_keys = []
+  for segment, permissions in segments.iteritems():
+    segment_key = cache_utils.get_permission_segment_key(user_id, segment)
+    # Segments that failed to be stored are still listed in the index to get
+    # them loaded from the database next time
+    index[segment] = segment_key
+    if memcache.blob_set(
+        cache,
+        segment_key,
+        permissions,
+        exp_time=PERMISSION_CACHE_TIMEOUT,
+    ):
+      stored_keys.append(segment_key)
+    else:
+      logger.error("Failed to set permissions data into memcache")
 
-  cached_keys_set = cache.get('permissions:list') or set()
-  if key in cached_keys_set and \
-     not memcache.blob_set(
-         cache,
-         key,
-         permissions,
-         exp_time=PERMISSION_CACHE_TIMEOUT,
-     ):
-    logger.error("Failed to set permissions data into memcache")
-
+  if not store_index(key, index, time=PERMISSION_CACHE_TIMEOUT):
+    # The index has been changed by invalidation of outdated segments while
+    # these segments were loaded from the database
+    cache.delete_multi(stored_keys)
 
-def _load_permissions_from_database(user):
-  """Calculate permissions based on DB queries"""
 
-  permissions = {}
+def _split_acl_permissions(permissions):
+  """Split ACL permissions into segments by object type."""
+  segments = collections.defaultdict(dict)
+  for action, type_permissions in permissions.iteritems():
+    for object_type, resources in type_permissions.iteritems():
+      segment = cache_utils.get_acl_segment(object_type)
+      segments[segment].setdefault(action, {})[object_type] = resources
+  return segments
 
-  with benchmark("load_permissions > load default permissions"):
-    load_default_permissions(permissions)
 
-  with benchmark("load_permissions > load bootstrap admins"):
-    load_bootstrap_admin(user, permissions)
+def _load_segments_from_database(user, segments=None):
+  """Calculate permission segments based on DB queries
 
-  with benchmark("load_permissions > load external app permissions"):
-    load_external_app_permissions(permissions)
+  Args:
+      user (Person): Person object
+      segments (iterable): names of segments to load, all segments are
+                           loaded if not set
+  Returns:
+      dict with permissions dicts by segment name
+  """
+  result = {}
+  for segment, loader in SEGMENT_LOADERS:
+    if segments is None or segment in segments:
+      with benchmark("load_permissions > load {}".format(segment)):
+        result[segment] = {}
+        loader(user, result[segment])
+
+  object_types = None
+  if segments is not None:
+    acl_prefix = cache_utils.get_acl_segment("")
+    object_types = [segment[len(acl_prefix):] for segment in segments
+                    if segment.startswith(acl_prefix)]
+    if not object_types:
+      return result
+  with benchmark("load_permissions > load access control list"):
+    acl_permissions = {}
+    load_access_control_list(user, acl_permissions, object_types)
+    for object_type in object_types or []:
+      # keep empty segments to avoid reloading them
+      result[cache_utils.get_acl_segment(object_type)] = {}
+    result.update(_split_acl_permissions(acl_permissions))
+  return result
 
-  with benchmark("load_permissions > load user roles"):
-    load_user_roles(user, permissions)
 
-  with benchmark("load_permissions > load personal context"):
-    load_personal_context(user, permissions)
+def _merge_segments(segments):
+  """Merge permission segments into a single permissions dict."""
+  permissions = {}
+  for segment in segments:
+    for action, type_permissions in segment.iteritems():
+      action_permissions = permissions.setdefault(action, {})
+      for resource_type, entry in type_permissions.iteritems():
+        target = action_permissions.setdefault(resource_type, {})
+        if "contexts" in entry:
+          target.setdefault("contexts", []).extend(entry["contexts"])
+        if "resources" in entry:
+          target.setdefault("resources", set()).update(entry["resources"])
+        for context_id, conditions in entry.get("conditions", {}).iteritems():
+          target.setdefault("conditions", {})\
+              .setdefault(context_id, []).extend(conditions)
+  return permissions
 
-  with benchmark("load_permissions > load access control list"):
-    load_access_control_list(user, permissions)
 
-  return permissions
+def _load_permissions_from_database(user):
+  """Calculate permissions based on DB queries"""
+  return _merge_segments(_load_segments_from_database(user).values())
+
+
+def _record_metrics(cache, **metrics):
+  """Add values to permission cache metrics counters in memcache."""
+  offsets = {PERMISSION_METRICS_KEYS[name]: value
+             for name, value in metrics.iteritems() if value}
+  if offsets:
+    cache.offset_multi(offsets, initial_value=0)
+
+
+def get_cache_metrics():
+  """Get permission cache hit, miss and rebuild time counters."""
+  cache = _get_memcache_client()
+  if not cache:
+    return {}
+  values = cache.get_multi(PERMISSION_METRICS_KEYS.values())
+  return {
+      name: values.get(key, 0)
+      for name, key in PERMISSION_METRICS_KEYS.iteritems()
+  }
 
 
 def load_permissions_for(user):
@@ -456,30 +586,50 @@ def load_permissions_for(user):
     keys.
   'condition' is the string name of a conditional operator, such as 'contains'.
   'terms' are the arguments to the 'condition'.
+
+  Permissions are cached in memcache in segments, one for each of the
+  SEGMENT_LOADERS and one for ACL entries of every object type, so that
+  changes of user roles or ACL entries rebuild only the affected segments.
   """
-  key = 'permissions:{}'.format(user.id)
+  cache = _get_memcache_client()
+  if not cache:
+    return _load_permissions_from_database(user)
+
+  key = cache_utils.get_permissions_key(user.id)
 
   # try to get cached permissions from memcahe
   with benchmark("load_permissions > query memcache"):
-    cache = _get_memcache_client()
-    if cache:
-      result = query_memcache(cache, key)
-      if result:
-        return result
-
-  # no permissions were stored in memcache for this user. Use DB to get perms
-  permissions = _load_permissions_from_database(user)
-
-  # store calculated permissions into memcahe
-  if not hasattr(flask.g, "referenced_object_stubs"):
-    # In some cases for optimization we only load a small chunk of permissions
-    # and in that case we can not cache the value because it might not contain
-    # the permissions information for any subsequent request.
-    with benchmark("load_permissions > store results into memcache"):
-      if cache:
-        store_results_into_memcache(permissions, cache, key)
-
-  return permissions
+    index, segments = query_memcache(cache, key)
+
+  missing = None
+  if index is not None:
+    missing = [segment for segment in index if segment not in segments]
+  if missing is None or missing:
+    # segments missing in memcache are loaded from the DB
+    start = time.time()
+    loaded = _load_segments_from_database(user, missing)
+    rebuild_ms = int((time.time() - start) * 1000)
+    segments.update(loaded)
+
+    # store calculated permissions into memcahe
+    if not hasattr(flask.g, "referenced_object_stubs"):
+      # In some cases for optimization we only load a small chunk of
+      # permissions and in that case we can not cache the value because it
+      # might not contain the permissions information for any subsequent
+      # request.
+      with benchmark("load_permissions > store results into memcache"):
+        store_results_into_memcache(loaded, cache, user.id, index)
+  else:
+    loaded, rebuild_ms = {}, 0
+
+  _record_metrics(
+      cache,
+      hits=len(segments) - len(loaded),
+      misses=len(loaded),
+      rebuilds=int(bool(loaded)),
+      rebuild_ms=rebuild_ms,
+  )
+  return _merge_segments(segments.values())
 
 
 def _get_or_create_personal_context(user):
@@ -553,6 +703,37 @@ def handle_resource_deleted(sender, obj=None, service=None):
         .delete()
 
 
+def handle_user_role_change(mapper, connection, target):
+  # pylint: disable=unused-argument
+  """Drop cached user roles permissions of the user."""
+  cache_utils.track_permission_segment(target.person_id, "user_roles")
+
+
+def handle_role_change(mapper, connection, target):
+  # pylint: disable=unused-argument
+  """Drop cached permissions of all users if a role has been changed."""
+  cache_utils.track_all_permissions()
+
+
+for _event in ("after_insert", "after_update", "after_delete"):
+  sa.event.listen(UserRole, _event, handle_user_role_change)
+for _event in ("after_update", "after_delete"):
+  sa.event.listen(Role, _event, handle_role_change)
+
+
+def permissions_cache_metrics():
+  """Permission cache hit, miss and rebuild time counters."""
+  return flask.Response(json.dumps(get_cache_metrics()),
+                        mimetype='application/json')
+
+
+def init_extra_views(app_):
+  """Init views of basic permissions module."""
+  app_.add_url_rule(
+      "/admin/permissions_cache_metrics",
+      view_func=login_required(admin_required(permissions_cache_metrics)))
+
+
 def contributed_services():
   """The list of all collections provided by this extension."""
   return [
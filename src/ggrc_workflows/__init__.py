@@ -13,6 +13,7 @@ from flask import Blueprint
 from sqlalchemy import inspect, orm
 
 from ggrc import db
+from ggrc import settings
 from ggrc.login import get_current_user
 from ggrc.models import all_models
 from ggrc.models.relationship import Relationship
@@ -20,6 +21,7 @@ from ggrc.rbac.permissions import is_allowed_update
 from ggrc.access_control import role
 from ggrc.services import signals
 from ggrc.utils import benchmark
+from ggrc.utils import list_chunks
 from ggrc.utils.log_event import log_event
 from ggrc_workflows import models, notification
 from ggrc_workflows import services
@@ -176,6 +178,20 @@ def handle_cycle_post(sender, obj=None, src=None, service=None):  # noqa pylint:
   build_cycles(workflow, obj)
 
 
+def get_cycle_task_people(task_group_task):
+  """Get (role id, person id) pairs of people of a cycle task to create.
+
+  People with roles of the task group task get the same roles on the cycle
+  task.
+  """
+  people = []
+  for role_id, role_name in role.get_custom_roles_for(
+          models.CycleTaskGroupObjectTask.__name__).iteritems():
+    for person_id in task_group_task.get_person_ids_for_rolename(role_name):
+      people.append((role_id, person_id))
+  return people
+
+
 def _create_cycle_task(task_group_task, cycle, cycle_task_group, current_user):
   """Create a cycle task along with relations to other objects"""
   description = models.CycleTaskGroupObjectTask.default_description if \
@@ -184,13 +200,10 @@ def _create_cycle_task(task_group_task, cycle, cycle_task_group, current_user):
   workflow = cycle.workflow
   start_date = workflow.calc_next_adjusted_date(task_group_task.start_date)
   end_date = workflow.calc_next_adjusted_date(task_group_task.end_date)
-  access_control_list = []
-  for role_id, role_name in role.get_custom_roles_for(
-          models.CycleTaskGroupObjectTask.__name__).iteritems():
-    for person_id in task_group_task.get_person_ids_for_rolename(role_name):
-      access_control_list.append(
-          {"ac_role_id": role_id, "person": {"id": person_id}}
-      )
+  access_control_list = [
+      {"ac_role_id": role_id, "person": {"id": person_id}}
+      for role_id, person_id in get_cycle_task_people(task_group_task)
+  ]
   cycle_task_group_object_task = models.CycleTaskGroupObjectTask(
       context=cycle.context,
       cycle=cycle,
@@ -229,8 +242,18 @@ def create_old_style_cycle(cycle, task_group, cycle_task_group, current_user):
       Relationship(source=cycle_task_group_object_task, destination=object_)
 
 
-def build_cycle(workflow, cycle=None, current_user=None):
-  """Build a cycle with it's child objects"""
+def get_cycle_creator(workflow, current_user=None):
+  """Get the person starting a cycle of the workflow.
+
+  Args:
+    workflow: Workflow instance of the cycle.
+    current_user: Person who starts the cycle, first workflow Admin is used
+      if not given.
+
+  Returns:
+    Person instance or None if a cycle of the workflow can't be started, a
+    "cycle_start_failed" notification is created in that case.
+  """
   build_failed = False
 
   if not workflow.tasks:
@@ -253,6 +276,14 @@ def build_cycle(workflow, cycle=None, current_user=None):
   if build_failed:
     pusher.update_or_create_notifications(workflow, date.today(),
                                           "cycle_start_failed")
+    return None
+  return current_user
+
+
+def build_cycle(workflow, cycle=None, current_user=None):
+  """Build a cycle with it's child objects"""
+  current_user = get_cycle_creator(workflow, current_user)
+  if not current_user:
     return
 
   # Determine the relevant Workflow
@@ -744,27 +775,32 @@ def init_extra_views(app):
 
 def start_recurring_cycles():
   """Start recurring cycles by cron job."""
+  from ggrc_workflows import cycle_builder
   with benchmark("contributed cron job start_recurring_cycles"):
     today = date.today()
-    workflows = models.Workflow.query.filter(
+    workflow_ids = [workflow_id for workflow_id, in db.session.query(
+        models.Workflow.id
+    ).filter(
         models.Workflow.next_cycle_start_date <= today,
         models.Workflow.recurrences == True  # noqa
-    )
+    ).order_by(
+        models.Workflow.id
+    )]
     event = None
-    for workflow in workflows:
+    # Cycles are committed in chunks of workflows. Single commit for all
+    # 'Workflows' exceeded maximum memory limit on AppEngine instance.
+    for ids in list_chunks(workflow_ids, settings.CYCLE_BUILD_CHUNK_SIZE):
+      builder = cycle_builder.BulkCycleBuilder()
+      for workflow in builder.load_workflows(ids):
+        builder.prepare(workflow)
+      builder.insert()
       # Follow same steps as in model_posted.connect_via(models.Cycle)
-      while workflow.next_cycle_start_date <= date.today():
-        cycle = build_cycle(workflow)
-        if not cycle:
-          break
-        db.session.add(cycle)
+      for cycle in builder.load_cycles():
         notification.handle_cycle_created(cycle, False)
+      for workflow in builder.workflows:
         notification.handle_workflow_modify(None, workflow)
-      # db.session.commit was moved into cycle intentionally.
-      # 'Cycles' for each 'Workflow' should be committed separately
-      # to free memory on each iteration. Single commit exeeded
-      # maximum memory limit on AppEngine instance.
       event = log_event(db.session, event=event)
+      event = builder.insert_revisions(event)
       db.session.commit()
 
 
@@ -0,0 +1,567 @@
+# Copyright (C) 2019 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""Bulk building of workflow cycles.
+
+`build_cycle` creates a cycle tree out of ORM objects, so every cycle, cycle
+task group and cycle task, their ACL entries and relationships are inserted
+with separate statements, which is fine for a single cycle started through
+the API. The cron job starts cycles of all recurring workflows, so
+BulkCycleBuilder computes the same cycle trees as plain rows and inserts each
+level of them, their ACL entries, relationships and revisions with multi row
+statements for a chunk of workflows.
+
+Cycles of every workflow are inserted in a savepoint, so a workflow failing
+to start its cycles does not discard cycles of other workflows in the chunk.
+"""
+
+import collections
+import logging
+import uuid
+from datetime import date
+
+import sqlalchemy as sa
+from sqlalchemy import orm
+from sqlalchemy.sql import expression as expr
+
+import ggrc_workflows
+from ggrc import db
+from ggrc.access_control import role
+from ggrc.cache import utils as cache_utils
+from ggrc.fulltext.listeners import ReindexSet
+from ggrc.login import get_current_user_id
+from ggrc.models import all_models
+from ggrc.models import latest_revision
+from ggrc.models.cache import Cache
+from ggrc.models.hooks import acl
+from ggrc.utils import benchmark
+from ggrc.utils import list_chunks
+from ggrc.utils.revisions import build_revision_body
+from ggrc_workflows import models
+
+
+logger = logging.getLogger(__name__)
+
+# Same increment as in Slugged.generate_slug_for.
+SLUG_INCREMENT = 1000
+
+_COLUMNS = {
+    models.Cycle: (
+        "workflow_id", "context_id", "title", "description", "is_current",
+        "is_verification_needed", "status", "start_date", "end_date",
+        "next_due_date", "slug",
+    ),
+    models.CycleTaskGroup: (
+        "cycle_id", "task_group_id", "context_id", "title", "description",
+        "modified_by_id", "contact_id", "status", "sort_index", "start_date",
+        "end_date", "next_due_date", "slug",
+    ),
+    models.CycleTaskGroupObjectTask: (
+        "cycle_id", "cycle_task_group_id", "task_group_task_id", "context_id",
+        "title", "description", "sort_index", "start_date", "end_date",
+        "status", "modified_by_id", "task_type", "response_options", "slug",
+    ),
+}
+
+_Plan = collections.namedtuple(
+    "_Plan", "workflow, cycles, repeat_multiplier, next_cycle_start_date")
+
+
+class _Row(object):
+  """Values of a cycle tree object inserted with a multi row statement.
+
+  Rows have the attributes used by `update_cycle_dates`, so their dates are
+  computed by the same code as dates of the ORM objects.
+  """
+  # pylint: disable=too-few-public-methods,invalid-name
+
+  is_done = False
+
+  def __init__(self, model, **values):
+    self.model = model
+    self.id = None
+    self.slug = None
+    self.start_date = None
+    self.end_date = None
+    self.next_due_date = None
+    self.__dict__.update(values)
+
+  def values(self):
+    return {column: getattr(self, column) for column in _COLUMNS[self.model]}
+
+
+def _with_acl(loader):
+  """Load ACL entries with people of objects loaded by the loader."""
+  return loader.subqueryload(
+      "_access_control_list"
+  ).subqueryload(
+      "access_control_people"
+  ).joinedload(
+      "person"
+  )
+
+
+def _build_task(workflow, task_group_task, current_user, objects):
+  """Build a cycle task row the same way as `_create_cycle_task` does."""
+  if task_group_task.object_approval:
+    description = models.CycleTaskGroupObjectTask.default_description
+  else:
+    description = task_group_task.description
+  return _Row(
+      models.CycleTaskGroupObjectTask,
+      task_group_task_id=task_group_task.id,
+      context_id=workflow.context_id,
+      title=task_group_task.title,
+      description=description,
+      sort_index=task_group_task.sort_index,
+      start_date=workflow.calc_next_adjusted_date(task_group_task.start_date),
+      end_date=workflow.calc_next_adjusted_date(task_group_task.end_date),
+      status=models.CycleTaskGroupObjectTask.ASSIGNED,
+      modified_by_id=current_user.id,
+      task_type=task_group_task.task_type,
+      response_options=task_group_task.response_options,
+      people=ggrc_workflows.get_cycle_task_people(task_group_task),
+      objects=objects,
+  )
+
+
+def _build_cycle(workflow):
+  """Build rows of the next cycle the same way as `build_cycle` does."""
+  current_user = ggrc_workflows.get_cycle_creator(workflow)
+  if not current_user:
+    return None
+  cycle = _Row(
+      models.Cycle,
+      workflow_id=workflow.id,
+      context_id=workflow.context_id,
+      title=workflow.title,
+      description=workflow.description,
+      is_current=True,
+      is_verification_needed=workflow.is_verification_needed,
+      status=models.Cycle.ASSIGNED,
+      cycle_task_groups=[],
+      cycle_task_group_object_tasks=[],
+  )
+  for task_group in workflow.task_groups:
+    cycle_task_group = _Row(
+        models.CycleTaskGroup,
+        task_group_id=task_group.id,
+        context_id=workflow.context_id,
+        title=task_group.title,
+        description=task_group.description,
+        modified_by_id=current_user.id,
+        contact_id=task_group.contact_id,
+        status=models.CycleTaskGroup.ASSIGNED,
+        sort_index=task_group.sort_index,
+        cycle_task_group_tasks=[],
+    )
+    cycle.cycle_task_groups.append(cycle_task_group)
+    objects = [(task_group_object.object_type, task_group_object.object_id)
+               for task_group_object in task_group.task_group_objects]
+    if not workflow.is_old_workflow:
+      task_objects = [(task_group_task, objects)
+                      for task_group_task in task_group.task_group_tasks]
+    elif objects:
+      # old workflows get a separate cycle task for each object
+      task_objects = [(task_group_task, [object_])
+                      for object_ in objects
+                      for task_group_task in task_group.task_group_tasks]
+    else:
+      task_objects = [(task_group_task, [])
+                      for task_group_task in task_group.task_group_tasks]
+    for task_group_task, task_group_objects in task_objects:
+      task = _build_task(workflow, task_group_task, current_user,
+                         task_group_objects)
+      cycle_task_group.cycle_task_group_tasks.append(task)
+      cycle.cycle_task_group_object_tasks.append(task)
+
+  ggrc_workflows.update_cycle_dates(cycle)
+  workflow.repeat_multiplier += 1
+  workflow.next_cycle_start_date = workflow.calc_next_adjusted_date(
+      workflow.min_task_start_date)
+  return cycle
+
+
+def _generate_slugs(model, rows):
+  """Replace placeholder slugs of inserted rows with generated ones.
+
+  Slugs are generated the same way as by Slugged.generate_slug_for, but
+  conflicts with existing slugs are checked for all rows together.
+  """
+  table = model.__table__
+  prefix = model.generate_slug_prefix()
+  offsets = collections.defaultdict(int)
+  used = set()
+  pending = rows
+  while pending:
+    slugs = {
+        row: "{0}-{1}".format(prefix, row.id + offsets[row])
+        for row in pending
+    }
+    taken = set()
+    for chunk in list_chunks(slugs.values()):
+      taken.update(slug for slug, in db.session.query(
+          table.c.slug
+      ).filter(
+          table.c.slug.in_(chunk)
+      ))
+    conflicts = []
+    for row in pending:
+      if slugs[row] in taken or slugs[row] in used:
+        offsets[row] += SLUG_INCREMENT
+        conflicts.append(row)
+      else:
+        row.slug = slugs[row]
+        used.add(row.slug)
+    pending = conflicts
+  db.session.execute(
+      table.update().where(
+          table.c.id == expr.bindparam("id_")
+      ).values(
+          slug=expr.bindparam("slug_")
+      ),
+      [{"id_": row.id, "slug_": row.slug} for row in rows],
+  )
+
+
+def _insert_rows(model, rows):
+  """Insert rows of the model and set ids and slugs of the rows.
+
+  Rows are inserted with unique placeholder slugs, which are used to get ids
+  of the inserted rows.
+  """
+  if not rows:
+    return
+  table = model.__table__
+  rows_by_slug = {}
+  for row in rows:
+    row.slug = str(uuid.uuid1())
+    rows_by_slug[row.slug] = row
+  db.session.execute(table.insert(), [row.values() for row in rows])
+  for chunk in list_chunks(rows_by_slug.keys()):
+    query = db.session.query(
+        table.c.id,
+        table.c.slug,
+    ).filter(
+        table.c.slug.in_(chunk)
+    )
+    for id_, slug in query:
+      rows_by_slug[slug].id = id_
+  _generate_slugs(model, rows)
+
+
+def _insert_relationships(stubs):
+  """Insert relationships and return their ids.
+
+  Args:
+    stubs: list of (source_type, source_id, destination_type, destination_id)
+      tuples.
+  """
+  if not stubs:
+    return []
+  table = all_models.Relationship.__table__
+  db.session.execute(table.insert(), [
+      {
+          "source_type": source_type,
+          "source_id": source_id,
+          "destination_type": destination_type,
+          "destination_id": destination_id,
+      }
+      for source_type, source_id, destination_type, destination_id in stubs
+  ])
+  ids = []
+  for chunk in list_chunks(stubs):
+    ids.extend(id_ for id_, in db.session.query(
+        table.c.id
+    ).filter(
+        sa.tuple_(
+            table.c.source_type,
+            table.c.source_id,
+            table.c.destination_type,
+            table.c.destination_id,
+        ).in_(chunk)
+    ))
+  return ids
+
+
+def _insert_acl(rows):
+  """Insert ACL entries of inserted objects and people of cycle tasks.
+
+  Every object gets an ACL entry for each role of its type, the same as
+  Roleable objects get them on creation.
+
+  Returns:
+    tuple of ids of inserted ACL entries and ids of inserted ACL people.
+  """
+  table = all_models.AccessControlList.__table__
+  keys = [
+      (row.model.__name__, row.id, ac_role.id)
+      for row in rows
+      for ac_role in role.get_ac_roles_for(row.model.__name__).values()
+  ]
+  if not keys:
+    return [], []
+  db.session.execute(table.insert(), [
+      {"object_type": object_type, "object_id": object_id,
+       "ac_role_id": ac_role_id}
+      for object_type, object_id, ac_role_id in keys
+  ])
+  acl_ids = {}
+  for chunk in list_chunks(keys):
+    query = db.session.query(
+        table.c.id,
+        table.c.object_type,
+        table.c.object_id,
+        table.c.ac_role_id,
+    ).filter(
+        table.c.parent_id_nn == 0,
+        sa.tuple_(
+            table.c.object_type,
+            table.c.object_id,
+            table.c.ac_role_id,
+        ).in_(chunk)
+    )
+    for id_, object_type, object_id, ac_role_id in query:
+      acl_ids[(object_type, object_id, ac_role_id)] = id_
+
+  acl_people = {
+      (person_id, acl_ids[(row.model.__name__, row.id, ac_role_id)])
+      for row in rows
+      for ac_role_id, person_id in getattr(row, "people", ())
+  }
+  if not acl_people:
+    return acl_ids.values(), []
+  people_table = all_models.AccessControlPerson.__table__
+  db.session.execute(people_table.insert(), [
+      {"person_id": person_id, "ac_list_id": ac_list_id}
+      for person_id, ac_list_id in acl_people
+  ])
+  cache_utils.track_acl_people(acl_people)
+  acp_ids = []
+  for chunk in list_chunks(list({ac_list_id for _, ac_list_id in acl_people})):
+    acp_ids.extend(id_ for id_, in db.session.query(
+        people_table.c.id
+    ).filter(
+        people_table.c.ac_list_id.in_(chunk)
+    ))
+  return acl_ids.values(), acp_ids
+
+
+class BulkCycleBuilder(object):
+  """Build cycles of several workflows with bulk operations."""
+
+  def __init__(self):
+    self._plans = []
+    self._inserted = collections.defaultdict(list)
+
+  @property
+  def workflows(self):
+    """Workflows with inserted cycles."""
+    return [plan.workflow for plan in self._plans]
+
+  @staticmethod
+  def load_workflows(workflow_ids):
+    """Load workflows together with everything needed to build cycles."""
+    with benchmark("BulkCycleBuilder.load_workflows"):
+      return models.Workflow.query.filter(
+          models.Workflow.id.in_(workflow_ids)
+      ).options(
+          orm.undefer_group("Workflow_complete"),
+          _with_acl(orm.Load(models.Workflow)),
+          orm.subqueryload(
+              "task_groups"
+          ).undefer_group(
+              "TaskGroup_complete"
+          ),
+          _with_acl(orm.subqueryload(
+              "task_groups"
+          ).subqueryload(
+              "task_group_tasks"
+          ).undefer_group(
+              "TaskGroupTask_complete"
+          )),
+          orm.subqueryload(
+              "task_groups"
+          ).subqueryload(
+              "task_group_objects"
+          ),
+      ).order_by(
+          models.Workflow.id
+      ).all()
+
+  def prepare(self, workflow):
+    """Build rows of all cycles the workflow has to start till today.
+
+    The workflow is left unchanged until its cycles are inserted. A workflow
+    failing to build its cycles is logged and skipped.
+    """
+    repeat_multiplier = workflow.repeat_multiplier
+    next_cycle_start_date = workflow.next_cycle_start_date
+    cycles = []
+    try:
+      with benchmark("BulkCycleBuilder.prepare"):
+        while workflow.next_cycle_start_date <= date.today():
+          cycle = _build_cycle(workflow)
+          if not cycle:
+            break
+          cycles.append(cycle)
+    except Exception:  # pylint: disable=broad-except
+      logger.exception("Building cycles has failed on Workflow with "
+                       "id == '%s'", workflow.id)
+      cycles = []
+    if cycles:
+      self._plans.append(_Plan(workflow, cycles, workflow.repeat_multiplier,
+                               workflow.next_cycle_start_date))
+    workflow.repeat_multiplier = repeat_multiplier
+    workflow.next_cycle_start_date = next_cycle_start_date
+
+  def insert(self):
+    """Insert cycles of all prepared workflows.
+
+    Cycles of all workflows are inserted together first. If that fails,
+    cycles of every workflow are inserted in a separate savepoint.
+    """
+    if not self._plans:
+      return
+    with benchmark("BulkCycleBuilder.insert"):
+      try:
+        self._insert_in_savepoint(self._plans)
+      except Exception:  # pylint: disable=broad-except
+        logger.exception("Bulk insert of cycles has failed, cycles are "
+                         "inserted for each workflow separately")
+        plans, self._plans = self._plans, []
+        for plan in plans:
+          try:
+            self._insert_in_savepoint([plan])
+          except Exception:  # pylint: disable=broad-except
+            logger.exception("Starting a cycle has failed on Workflow with "
+                             "id == '%s'", plan.workflow.id)
+            self._discard(plan)
+          else:
+            self._plans.append(plan)
+
+  @staticmethod
+  def _discard(plan):
+    """Drop changes of a workflow whose cycles were rolled back."""
+    db.session.expire(plan.workflow,
+                      ["repeat_multiplier", "next_cycle_start_date"])
+    cache = Cache.get_cache()
+    if cache:
+      cache.dirty.pop(plan.workflow, None)
+
+  def _insert_in_savepoint(self, plans):
+    """Insert cycles of the workflows, roll back all of them on a failure."""
+    savepoint = db.session.begin_nested()
+    try:
+      for plan in plans:
+        plan.workflow.repeat_multiplier = plan.repeat_multiplier
+        plan.workflow.next_cycle_start_date = plan.next_cycle_start_date
+      db.session.flush()
+      inserted, relationship_ids, acl_ids = self._insert_plans(plans)
+    except Exception:
+      savepoint.rollback()
+      raise
+    savepoint.commit()
+    for model, ids in inserted.iteritems():
+      self._inserted[model].extend(ids)
+    acl.add_relationships(set(relationship_ids))
+    acl.add_acls(set(acl_ids))
+    db.session.reindex_set = getattr(db.session, "reindex_set", ReindexSet())
+    for model in _COLUMNS:
+      db.session.reindex_set.model_ids_to_reindex[model.__name__].update(
+          inserted[model])
+
+  @staticmethod
+  def _insert_plans(plans):
+    """Insert cycle tree rows with their relationships and ACL entries.
+
+    Returns:
+      tuple of ids of inserted objects by model, ids of inserted relationships
+      and ids of inserted ACL entries.
+    """
+    cycles = [cycle for plan in plans for cycle in plan.cycles]
+    _insert_rows(models.Cycle, cycles)
+    cycle_task_groups = []
+    for cycle in cycles:
+      for cycle_task_group in cycle.cycle_task_groups:
+        cycle_task_group.cycle_id = cycle.id
+        cycle_task_groups.append(cycle_task_group)
+    _insert_rows(models.CycleTaskGroup, cycle_task_groups)
+    tasks = []
+    for cycle_task_group in cycle_task_groups:
+      for task in cycle_task_group.cycle_task_group_tasks:
+        task.cycle_id = cycle_task_group.cycle_id
+        task.cycle_task_group_id = cycle_task_group.id
+        tasks.append(task)
+    _insert_rows(models.CycleTaskGroupObjectTask, tasks)
+
+    stubs = [(models.Workflow.__name__, cycle.workflow_id,
+              models.Cycle.__name__, cycle.id) for cycle in cycles]
+    stubs.extend((models.Cycle.__name__, cycle_task_group.cycle_id,
+                  models.CycleTaskGroup.__name__, cycle_task_group.id)
+                 for cycle_task_group in cycle_task_groups)
+    stubs.extend((models.CycleTaskGroup.__name__, task.cycle_task_group_id,
+                  models.CycleTaskGroupObjectTask.__name__, task.id)
+                 for task in tasks)
+    stubs.extend((models.CycleTaskGroupObjectTask.__name__, task.id,
+                  object_type, object_id)
+                 for task in tasks
+                 for object_type, object_id in task.objects)
+    relationship_ids = _insert_relationships(stubs)
+    acl_ids, acp_ids = _insert_acl(cycles + cycle_task_groups + tasks)
+
+    inserted = {
+        models.Cycle: [cycle.id for cycle in cycles],
+        models.CycleTaskGroup: [group.id for group in cycle_task_groups],
+        models.CycleTaskGroupObjectTask: [task.id for task in tasks],
+        all_models.Relationship: relationship_ids,
+        all_models.AccessControlList: acl_ids,
+        all_models.AccessControlPerson: acp_ids,
+    }
+    return inserted, relationship_ids, acl_ids
+
+  def load_cycles(self):
+    """Load inserted cycles together with their cycle tasks."""
+    cycles = []
+    for chunk in list_chunks(self._inserted.get(models.Cycle, [])):
+      cycles.extend(models.Cycle.query.filter(
+          models.Cycle.id.in_(chunk)
+      ).options(
+          orm.subqueryload("cycle_task_group_object_tasks")
+      ))
+    return cycles
+
+  def insert_revisions(self, event):
+    """Insert revisions of all inserted objects.
+
+    Args:
+      event: Event of the cron job, a new one is created if None.
+
+    Returns:
+      Event of the inserted revisions.
+    """
+    if not any(self._inserted.itervalues()):
+      return event
+    with benchmark("BulkCycleBuilder.insert_revisions"):
+      user_id = get_current_user_id()
+      if event is None:
+        event = all_models.Event(
+            modified_by_id=user_id,
+            action="BULK",
+            resource_id=0,
+            resource_type=None,
+        )
+        db.session.add(event)
+      db.session.flush()
+      revisions_table = all_models.Revision.__table__
+      for model, ids in self._inserted.iteritems():
+        for chunk in list_chunks(ids):
+          revisions = [
+              build_revision_body(obj.id, obj.type, obj.log_json(), event.id,
+                                  "created", user_id)
+              for obj in model.eager_query().filter(model.id.in_(chunk))
+          ]
+          db.session.execute(revisions_table.insert(), revisions)
+          latest_revision.update_for_payload(revisions)
+      self._inserted = collections.defaultdict(list)
+    return event
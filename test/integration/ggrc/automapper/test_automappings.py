@@ -12,6 +12,7 @@ from ggrc import automapper
 from ggrc import models
 from ggrc.models import all_models
 from ggrc.models import Automapping
+from ggrc.utils import QueryCounter
 from integration.ggrc import TestCase
 from integration.ggrc import generator
 from integration.ggrc.models import factories
@@ -147,6 +148,51 @@ class TestAutomappings(TestCase):
         implied=[],
     )
 
+  def _create_program_scope(self, separate_flushes):
+    """Map a Regulation with Requirements to a Program.
+
+    Checks that all Requirements get automapped to the Program.
+
+    Returns:
+      list of executed statements.
+    """
+    with QueryCounter() as counter:
+      with factories.single_commit():
+        program = factories.ProgramFactory()
+        regulation = factories.RegulationFactory()
+        requirements = [factories.RequirementFactory() for _ in range(3)]
+        ggrc.db.session.flush()
+        factories.RelationshipFactory(source=program, destination=regulation)
+        for requirement in requirements:
+          if separate_flushes:
+            ggrc.db.session.flush()
+          factories.RelationshipFactory(source=regulation,
+                                        destination=requirement)
+    program = models.Program.query.get(program.id)
+    automapped = [
+        rel for rel in program.related_sources + program.related_destinations
+        if rel.automapping_id is not None
+    ]
+    mapped_ids = {
+        rel.destination_id if rel.source_type == "Program" else rel.source_id
+        for rel in automapped
+    }
+    self.assertEqual(mapped_ids,
+                     {requirement.id for requirement in requirements})
+    return counter.queries
+
+  def test_batch_automapping(self):
+    """Automappings of a flush are generated and inserted together."""
+    self.client.get("/login")
+    separate_queries = self._create_program_scope(separate_flushes=True)
+    batch_queries = self._create_program_scope(separate_flushes=False)
+
+    def count_automapping_inserts(queries):
+      return len([query for query in queries
+                  if query.startswith("INSERT INTO automappings")])
+    self.assertEqual(count_automapping_inserts(batch_queries), 1)
+    self.assertLess(len(batch_queries), len(separate_queries))
+
   def test_mapping_to_requirements(self):
     """Test mapping to requirement"""
     regulation = self.create_object(models.Regulation, {
@@ -0,0 +1,114 @@
+# Copyright (C) 2019 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""Tests for import with several rows committed in a single transaction."""
+
+from collections import OrderedDict
+
+import mock
+import sqlalchemy as sa
+
+from ggrc import settings
+from ggrc.converters import errors
+from ggrc.converters.base_block import ImportBlockConverter
+from ggrc.models import all_models
+
+from integration.ggrc import TestCase
+
+
+@mock.patch.object(settings, "IMPORT_COMMIT_BATCH_SIZE", 2)
+class TestImportBatches(TestCase):
+  """Tests for batched commit of imported rows."""
+
+  def setUp(self):
+    super(TestImportBatches, self).setUp()
+    self.client.get("/login")
+
+  @staticmethod
+  def _market_rows(titles):
+    """Build import data for markets with given titles."""
+    return [OrderedDict([
+        ("object_type", "Market"),
+        ("code", "market-{}".format(idx)),
+        ("title", title),
+        ("Admin", "user@example.com"),
+        ("Assignee", "user@example.com"),
+        ("Verifier", "user@example.com"),
+    ]) for idx, title in enumerate(titles, 1)]
+
+  @staticmethod
+  def _bulk_events_count():
+    return all_models.Event.query.filter_by(action="BULK").count()
+
+  def test_rows_committed_in_batches(self):
+    """All rows of a batch are logged with a single event."""
+    events_count = self._bulk_events_count()
+    response = self.import_data(*self._market_rows(
+        ["Market {}".format(idx) for idx in range(5)]
+    ))
+    self._check_csv_response(response, {})
+    self.assertEqual(response[0]["created"], 5)
+    self.assertEqual(all_models.Market.query.count(), 5)
+    self.assertEqual(self._bulk_events_count() - events_count, 3)
+    self.assertEqual(all_models.Revision.query.filter_by(
+        resource_type="Market",
+    ).count(), 5)
+
+  def test_invalid_row_isolated(self):
+    """Invalid row is not imported while other rows of its batch are."""
+    response = self.import_data(*self._market_rows(
+        ["Market 1", "Market 2", "Market 1", "Market 4"]
+    ))
+    expected_errors = {
+        "Market": {
+            "row_errors": {
+                errors.DUPLICATE_VALUE_IN_CSV.format(
+                    line=5,
+                    processed_line=3,
+                    column_name="Title",
+                    value="Market 1",
+                ),
+            },
+        },
+    }
+    self._check_csv_response(response, expected_errors)
+    self.assertEqual(response[0]["created"], 3)
+    self.assertEqual(response[0]["ignored"], 1)
+    self.assertEqual(
+        {market.slug for market in all_models.Market.query},
+        {"market-1", "market-2", "market-4"},
+    )
+
+  def test_failed_batch_retried(self):
+    """Rows of a batch that failed to commit are imported one by one."""
+    commit_rows = ImportBlockConverter.commit_rows
+    calls = []
+
+    def fail_first_commit(block, rows):
+      calls.append(len(rows))
+      if len(calls) == 1:
+        raise sa.exc.OperationalError("COMMIT", {}, Exception())
+      return commit_rows(block, rows)
+
+    with mock.patch.object(ImportBlockConverter, "commit_rows",
+                           autospec=True, side_effect=fail_first_commit):
+      response = self.import_data(*self._market_rows(
+          ["Market {}".format(idx) for idx in range(3)]
+      ))
+    self._check_csv_response(response, {})
+    self.assertEqual(response[0]["created"], 3)
+    self.assertEqual(response[0]["rows"], 3)
+    self.assertEqual(calls, [2, 1, 1, 1])
+    self.assertEqual(all_models.Market.query.count(), 3)
+
+  def test_post_commit_failure_not_retried(self):
+    """Rows of a committed batch are not imported again on later errors."""
+    with mock.patch.object(ImportBlockConverter, "store_revision_ids",
+                           side_effect=sa.exc.OperationalError(
+                               "SELECT", {}, Exception())):
+      response = self.import_data(*self._market_rows(
+          ["Market {}".format(idx) for idx in range(3)]
+      ))
+    self._check_csv_response(response, {})
+    self.assertEqual(response[0]["created"], 3)
+    self.assertEqual(all_models.Market.query.count(), 3)
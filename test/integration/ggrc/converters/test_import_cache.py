@@ -0,0 +1,90 @@
+# Copyright (C) 2019 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""Tests for memcache invalidation after import."""
+
+from collections import OrderedDict
+
+from appengine import base
+
+from ggrc.cache import utils as cache_utils
+from ggrc.models import all_models
+
+from integration.ggrc import TestCase
+from integration.ggrc import generator
+from integration.ggrc.api_helper import Api
+from integration.ggrc.models import factories
+
+
+@base.with_memcache
+class TestImportCache(TestCase):
+  """Tests for memcache invalidation after import."""
+
+  def setUp(self):
+    super(TestImportCache, self).setUp()
+    self.client.get("/login")
+
+  def test_import_drops_touched_keys(self):
+    """Import drops cached imported objects and keeps unrelated keys."""
+    market = factories.MarketFactory(slug="market-1")
+    other_market = factories.MarketFactory(slug="market-2")
+    market_key = cache_utils.get_cache_key(market)
+    other_key = cache_utils.get_cache_key(other_market)
+    self.memcache_client.set_multi({
+        market_key: "cached market",
+        other_key: "cached market",
+        "unrelated": "cached value",
+    })
+
+    response = self.import_data(OrderedDict([
+        ("object_type", "Market"),
+        ("code", "market-1"),
+        ("title", "New title"),
+    ]))
+    self._check_csv_response(response, {})
+
+    self.assertIsNone(self.memcache_client.get(market_key))
+    self.assertEqual(self.memcache_client.get(other_key), "cached market")
+    self.assertEqual(self.memcache_client.get("unrelated"), "cached value")
+
+  def test_dry_run_keeps_cache(self):
+    """Dry run import does not drop any cached data."""
+    market = factories.MarketFactory(slug="market-1")
+    market_key = cache_utils.get_cache_key(market)
+    self.memcache_client.set(market_key, "cached market")
+
+    response = self.import_data(OrderedDict([
+        ("object_type", "Market"),
+        ("code", "market-1"),
+        ("title", "New title"),
+    ]), dry_run=True)
+    self._check_csv_response(response, {})
+
+    self.assertEqual(self.memcache_client.get(market_key), "cached market")
+
+  def test_unmap_drops_permissions(self):
+    """Access propagated through a mapping removed by import is dropped."""
+    _, reader = generator.ObjectGenerator().generate_person(
+        user_role="Creator")
+    role = all_models.AccessControlRole.query.filter_by(
+        object_type="Program",
+        name="Program Readers",
+    ).one()
+    with factories.single_commit():
+      program = factories.ProgramFactory()
+      market = factories.MarketFactory()
+      factories.RelationshipFactory(source=program, destination=market)
+      program.add_person_with_role(reader, role)
+    program_slug, market_slug, market_id = program.slug, market.slug, market.id
+    api = Api()
+    api.set_user(reader)
+    self.assert200(api.get(all_models.Market, market_id))
+
+    response = self.import_data(OrderedDict([
+        ("object_type", "Market"),
+        ("code", market_slug),
+        ("unmap:program", program_slug),
+    ]))
+    self._check_csv_response(response, {})
+
+    self.assert403(api.get(all_models.Market, market_id))
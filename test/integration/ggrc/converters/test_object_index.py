@@ -0,0 +1,77 @@
+# Copyright (C) 2019 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""Tests for prefetching of objects referenced by imported csv files."""
+
+from collections import OrderedDict
+
+import mock
+
+from ggrc import db
+from ggrc.converters.object_index import ObjectIndex
+from ggrc.models import all_models
+
+from integration.ggrc import TestCase
+from integration.ggrc.models import factories
+
+
+class TestObjectIndex(TestCase):
+  """Tests for index of objects referenced by import."""
+
+  def setUp(self):
+    super(TestObjectIndex, self).setUp()
+    self.client.get("/login")
+
+  def test_find_loaded(self):
+    """Loaded and missing values are found without additional queries."""
+    market = factories.MarketFactory(slug="market-1")
+    index = ObjectIndex()
+    index.load(all_models.Market, "slug", ["MARKET-1", "market-2"])
+    with mock.patch.object(ObjectIndex, "_get_query") as get_query:
+      self.assertEqual(index.find(all_models.Market, "slug", "market-1"),
+                       market)
+      self.assertIsNone(index.find(all_models.Market, "slug", "market-2"))
+      get_query.assert_not_called()
+
+  def test_find_deleted(self):
+    """Objects deleted after they have been loaded are not found."""
+    market = factories.MarketFactory(slug="market-1")
+    index = ObjectIndex()
+    index.load(all_models.Market, "slug", ["market-1"])
+    db.session.delete(market)
+    db.session.commit()
+    self.assertIsNone(index.find(all_models.Market, "slug", "market-1"))
+
+  def test_import_prefetch(self):
+    """Mapped objects and people are loaded once for the whole block."""
+    with factories.single_commit():
+      objectives = [factories.ObjectiveFactory(slug="objective-{}".format(idx))
+                    for idx in range(3)]
+    load = ObjectIndex.load
+    loaded = []
+
+    def track_load(index, model, key, values):
+      loaded.append((model.__name__, key))
+      return load(index, model, key, values)
+
+    with mock.patch.object(ObjectIndex, "load", autospec=True,
+                           side_effect=track_load):
+      response = self.import_data(*[OrderedDict([
+          ("object_type", "Market"),
+          ("code", "market-{}".format(idx)),
+          ("title", "Market {}".format(idx)),
+          ("Admin", "user@example.com"),
+          ("Assignee", "user@example.com"),
+          ("Verifier", "user@example.com"),
+          ("map:objective", objective.slug),
+      ]) for idx, objective in enumerate(objectives)])
+    self._check_csv_response(response, {})
+    self.assertEqual(sorted(loaded), [
+        ("Market", "slug"),
+        ("Objective", "slug"),
+        ("Person", "email"),
+    ])
+    for objective in objectives:
+      markets = all_models.Objective.query.get(objective.id).related_objects(
+          _types="Market")
+      self.assertEqual(len(markets), 1)
@@ -7,6 +7,7 @@ import ddt
 import sqlalchemy.exc
 
 from ggrc import db
+from ggrc import fulltext
 from ggrc.models import all_models
 from ggrc.fulltext import mysql
 from integration.ggrc import TestCase
@@ -174,3 +175,37 @@ class TestMysql(TestCase):
             (searchable_person.email, "__sort__"),
         ]),
         sorted(searchable_contents))
+
+  def test_bulk_properties(self):
+    """Bulk record builder returns the same properties as per object one."""
+    with factories.single_commit():
+      person = factories.PersonFactory()
+      text_cad = CAD(title="text", definition_type="control")
+      person_cad = CAD(title="person", definition_type="control",
+                       attribute_type="Map:Person")
+      CAD(title="checkbox", definition_type="control",
+          attribute_type="Checkbox")
+      acr = factories.AccessControlRoleFactory(name="bulk role",
+                                               object_type="Control")
+      controls = [factories.ControlFactory() for _ in range(3)]
+      for control in controls:
+        control.add_person_with_role(person, acr)
+      CAV(custom_attribute=text_cad, attributable=controls[0],
+          attribute_value="value")
+      CAV(custom_attribute=person_cad, attributable=controls[1],
+          attribute_value="Person", attribute_object_id=person.id)
+
+    indexer = fulltext.get_indexer()
+    builder = indexer.get_builder(all_models.Control)
+    instances = all_models.Control.indexed_query().filter(
+        all_models.Control.id.in_([c.id for c in controls]),
+    ).all()
+    bulk_properties = dict(
+        (obj.id, properties)
+        for obj, properties in builder.get_bulk_properties(all_models.Control,
+                                                           instances)
+    )
+    self.assertEqual(
+        bulk_properties,
+        {obj.id: builder.get_properties(obj) for obj in instances},
+    )
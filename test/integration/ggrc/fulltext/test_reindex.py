@@ -5,9 +5,11 @@
 
 import ddt
 
+from ggrc import db
 from ggrc import fulltext
 from ggrc.fulltext import mysql
 from ggrc.fulltext import listeners
+from ggrc.models import all_models
 from integration.ggrc import TestCase, Api
 from integration.ggrc.models import factories
 
@@ -41,3 +43,29 @@ class TestReindex(TestCase):
 
     # Check that all Assessment.archived were properly reindexed
     self.assertEqual(archived_index.count(), obj_count)
+
+  def test_diff_update(self):
+    """Only changed records are written on reindex."""
+    control = factories.ControlFactory(title="old title")
+    control_id = control.id
+    updated_at = control.updated_at
+    record = mysql.MysqlRecordProperty
+    records_count = record.query.filter_by(type="Control",
+                                           key=control_id).count()
+    db.session.add(record(key=control_id, type="Control",
+                          property="obsolete", subproperty="", content="x"))
+    all_models.Control.query.filter_by(id=control_id).update(
+        {"title": "new title", "updated_at": updated_at})
+    db.session.commit()
+
+    stats = all_models.Control.bulk_record_update_for([control_id])
+
+    self.assertEqual(stats, {
+        "inserted": 0,
+        "updated": 1,
+        "deleted": 1,
+        "skipped": records_count - 1,
+    })
+    titles = record.query.filter_by(type="Control", key=control_id,
+                                    property="title")
+    self.assertEqual([r.content for r in titles], [u"new title"])
@@ -4,11 +4,18 @@
 """Test for total reindex procedure"""
 
 import ddt
+import mock
+from freezegun import freeze_time
 from sqlalchemy import orm
 
 from ggrc import db
 from ggrc import fulltext
+from ggrc import settings
+from ggrc import views
+from ggrc.fulltext import reindex
 from ggrc.fulltext.mysql import MysqlRecordProperty
+from ggrc.models import all_models
+from ggrc.models.maintenance import ReindexCheckpoint
 from ggrc.utils import QueryCounter
 from ggrc.fulltext import mysql
 
@@ -157,3 +164,127 @@ class TestTotalReindex(TestCase):
               obj_count=obj_count,
           )
       )
+
+  def _get_indexed_control_titles(self):
+    """Get dict of indexed Control titles by Control id."""
+    return dict(db.session.query(
+        MysqlRecordProperty.key,
+        MysqlRecordProperty.content,
+    ).filter(
+        MysqlRecordProperty.type == "Control",
+        MysqlRecordProperty.property == "title",
+    ))
+
+  def test_resume_reindex(self):
+    """Interrupted reindex continues from the last checkpoint."""
+    with ggrc_factories.single_commit():
+      control_ids = sorted(ggrc_factories.ControlFactory().id
+                           for _ in range(3))
+    for checkpoint in reindex.create_checkpoints():
+      if checkpoint.model_name == "Control":
+        checkpoint.last_id = control_ids[0]
+      else:
+        checkpoint.is_complete = True
+    db.session.commit()
+    MysqlRecordProperty.query.delete()
+    db.session.commit()
+
+    views.do_reindex()
+
+    self.assertItemsEqual(self._get_indexed_control_titles().keys(),
+                          control_ids[1:])
+    self.assertEqual(reindex.get_unfinished_checkpoints(), [])
+
+  def test_claimed_range_skipped(self):
+    """Range claimed by an active worker is not reindexed by another one."""
+    with ggrc_factories.single_commit():
+      ggrc_factories.ControlFactory()
+    MysqlRecordProperty.query.delete()
+    db.session.commit()
+    with freeze_time("2019-01-01 10:00:00"):
+      checkpoints = [checkpoint for checkpoint in reindex.create_checkpoints()
+                     if checkpoint.model_name == "Control"]
+      self.assertTrue(reindex.claim_checkpoint(checkpoints[0]))
+
+    with freeze_time("2019-01-01 10:05:00"):
+      reindex.reindex_checkpoint(checkpoints[0])
+    self.assertFalse(self._get_indexed_control_titles())
+    self.assertFalse(checkpoints[0].is_complete)
+
+    with freeze_time("2019-01-01 10:15:00"):
+      reindex.reindex_checkpoint(checkpoints[0])
+    self.assertTrue(self._get_indexed_control_titles())
+    self.assertTrue(checkpoints[0].is_complete)
+
+  def test_prune_finished_runs(self):
+    """Only the last completed reindex run is kept."""
+    with ggrc_factories.single_commit():
+      ggrc_factories.ControlFactory()
+    with freeze_time("2019-01-01 10:00:00"):
+      views.do_reindex()
+    with freeze_time("2019-01-02 10:00:00"):
+      views.do_reindex()
+    with freeze_time("2019-01-03 10:00:00"):
+      views.do_reindex()
+
+    started_at = {started_at for started_at, in db.session.query(
+        ReindexCheckpoint.started_at
+    ).filter_by(model_name="Control")}
+    self.assertEqual(len(started_at), 2)
+    self.assertEqual(reindex.get_indexed_at("Control").day, 3)
+
+  def test_incremental_reindex(self):
+    """Incremental reindex skips objects that have not been changed."""
+    with freeze_time("2019-01-01 10:00:00"):
+      with ggrc_factories.single_commit():
+        controls = [ggrc_factories.ControlFactory() for _ in range(3)]
+      unchanged_id, changed_id, missing_id = [c.id for c in controls]
+    with freeze_time("2019-01-02 10:00:00"):
+      views.do_reindex()
+
+    MysqlRecordProperty.query.filter(
+        MysqlRecordProperty.type == "Control",
+        MysqlRecordProperty.property == "title",
+    ).update({"content": "stale"})
+    MysqlRecordProperty.query.filter(
+        MysqlRecordProperty.type == "Control",
+        MysqlRecordProperty.key == missing_id,
+    ).delete()
+    all_models.Control.query.filter(
+        all_models.Control.id == changed_id,
+    ).update({"updated_at": "2019-01-03 10:00:00"})
+    db.session.commit()
+
+    with freeze_time("2019-01-04 10:00:00"):
+      views.do_reindex(incremental=True)
+
+    titles = self._get_indexed_control_titles()
+    self.assertEqual(titles[unchanged_id], "stale")
+    self.assertEqual(titles[changed_id],
+                     all_models.Control.query.get(changed_id).title)
+    self.assertEqual(titles[missing_id],
+                     all_models.Control.query.get(missing_id).title)
+
+  def test_parallel_reindex(self):
+    """Reindex of id ranges in separate tasks indexes all objects."""
+    with ggrc_factories.single_commit():
+      control_ids = [ggrc_factories.ControlFactory().id for _ in range(5)]
+    MysqlRecordProperty.query.delete()
+    db.session.commit()
+
+    checkpoints = reindex.create_checkpoints(workers=3, chunk_size=2)
+    views.start_reindex_workers(checkpoints)
+
+    self.assertItemsEqual(self._get_indexed_control_titles().keys(),
+                          control_ids)
+    control_checkpoints = ReindexCheckpoint.query.filter_by(
+        model_name="Control").all()
+    self.assertEqual(len(control_checkpoints), 3)
+    self.assertEqual(reindex.get_unfinished_checkpoints(), [])
+
+  def test_parallel_reindex_setting(self):
+    """Reindex is split into background tasks by REINDEX_WORKERS."""
+    with mock.patch.object(settings, "REINDEX_WORKERS", 2):
+      with mock.patch("ggrc.views.start_reindex_workers") as start_workers:
+        views.do_reindex()
+    start_workers.assert_called_once()
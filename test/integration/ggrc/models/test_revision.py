@@ -5,11 +5,13 @@
 from datetime import datetime
 
 from freezegun import freeze_time
+import flask
 import ddt
 import mock
 
 import ggrc.models
 from ggrc.models import all_models
+from ggrc.models import revision_content
 import integration.ggrc.generator
 from integration.ggrc import TestCase
 
@@ -466,3 +468,114 @@ class TestRevisions(query_helper.WithQueryApi, TestCase):
         "ids"
     )
     self.assertItemsEqual(resp, expected_ids)
+
+  def test_populated_content_stored(self):
+    """Populated content is stored and reused for next reads."""
+    control = factories.ControlFactory(title="stored content")
+    revision = _get_revisions(control)[0]
+
+    response = self.api_helper.get(all_models.Revision, revision.id)
+    self.assert200(response)
+    stored = revision_content.RevisionContent.query.get(revision.id)
+    self.assertIsNotNone(stored)
+    self.assertEqual(stored.content["title"], "stored content")
+
+    with mock.patch.object(all_models.Revision,
+                           "_populate_content") as populate:
+      response = self.api_helper.get(all_models.Revision, revision.id)
+      self.assert200(response)
+    populate.assert_not_called()
+    self.assertEqual(response.json["revision"]["content"]["title"],
+                     "stored content")
+
+  def test_populated_content_outdated(self):
+    """Stored populated content is rebuilt after CAD changes."""
+    control = factories.ControlFactory()
+    revision_id = _get_revisions(control)[0].id
+    self.assert200(self.api_helper.get(all_models.Revision, revision_id))
+    old_version = revision_content.RevisionContent.query.get(
+        revision_id).version
+
+    cad = factories.CustomAttributeDefinitionFactory(
+        definition_type="control",
+        attribute_type="Text",
+        title="new cad",
+    )
+    response = self.api_helper.get(all_models.Revision, revision_id)
+    self.assert200(response)
+
+    content = response.json["revision"]["content"]
+    self.assertIn(cad.id, [cad_["id"] for cad_ in
+                           content["custom_attribute_definitions"]])
+    stored = revision_content.RevisionContent.query.get(revision_id)
+    self.assertNotEqual(stored.version, old_version)
+
+  @mock.patch("ggrc.models.revision_content.MAX_PENDING_CONTENTS", 1)
+  def test_populated_content_queue_capped(self):
+    """Populated contents above the queue limit are not queued."""
+    revision_content.discard_pending()
+    self.assertEqual(revision_content.queue(1, "v", {"id": 1}), {"id": 1})
+    self.assertEqual(revision_content.queue(2, "v", {"id": 2}), {"id": 2})
+    self.assertEqual(flask.g.pending_revision_contents.keys(), [1])
+    revision_content.discard_pending()
+
+  def _assert_latest_revision(self, obj_type, obj_id):
+    """Check that the latest revision pointer matches revision history."""
+    revisions = all_models.Revision.query.filter_by(
+        resource_type=obj_type,
+        resource_id=obj_id,
+    ).order_by(all_models.Revision.id).all()
+    latest = all_models.LatestRevision.query.get((obj_type, obj_id))
+    self.assertEqual((latest.revision_id, latest.action),
+                     (revisions[-1].id, revisions[-1].action))
+
+  def test_latest_revision(self):
+    """Latest revision pointer follows revisions of an object."""
+    cls = ggrc.models.DataAsset
+    name = cls._inflector.table_singular  # pylint: disable=protected-access
+    _, obj = self.gen.generate(cls, name, {name: {
+        "title": "revisioned v1",
+        "context": None,
+    }})
+    obj_id = obj.id
+    self._assert_latest_revision("DataAsset", obj_id)
+
+    _, obj = self.gen.modify(obj, name, {name: {
+        "slug": obj.slug,
+        "title": "revisioned v2",
+        "context": None,
+    }})
+    self._assert_latest_revision("DataAsset", obj_id)
+
+    self.api_helper.delete(obj)
+    self._assert_latest_revision("DataAsset", obj_id)
+    latest = all_models.LatestRevision.query.get(("DataAsset", obj_id))
+    self.assertEqual(latest.action, "deleted")
+
+  def test_latest_snapshot_revision(self):
+    """Latest revision pointers are set for bulk inserted revisions."""
+    with factories.single_commit():
+      program = factories.ProgramFactory()
+      control = factories.ControlFactory()
+      factories.RelationshipFactory(source=program, destination=control)
+    audit = factories.AuditFactory(program=program)
+    response = self.api_helper.put(audit, {
+        "snapshots": {"operation": "upsert"},
+    })
+    self.assert200(response)
+
+    snapshot = all_models.Snapshot.query.filter_by(
+        parent_type="Audit",
+        parent_id=audit.id,
+    ).one()
+    self._assert_latest_revision("Snapshot", snapshot.id)
+
+  def test_populated_content_copy(self):
+    """Changes of returned content do not change the stored content."""
+    control = factories.ControlFactory()
+    revision_id = _get_revisions(control)[0].id
+    self.assert200(self.api_helper.get(all_models.Revision, revision_id))
+
+    revision = all_models.Revision.query.get(revision_id)
+    revision.content["access_control_list"].append("changed")
+    self.assertNotIn("changed", revision.content["access_control_list"])
@@ -0,0 +1,59 @@
+# Copyright (C) 2019 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""Tests for the sharded daily digest pipeline."""
+
+from mock import patch
+
+from ggrc.models import Notification
+from ggrc.models.notification import DigestEmail
+from ggrc.notifications import common
+from integration.ggrc import TestCase
+from integration.ggrc.models import factories
+
+
+class TestDailyDigest(TestCase):
+  """Test streamed loading and sharded sending of daily digest emails."""
+
+  def setUp(self):
+    super(TestDailyDigest, self).setUp()
+    self.client.get("/login")
+    factories.AuditFactory(slug="Audit")
+    self.import_file("assessment_template_no_warnings.csv", safe=False)
+    self.import_file("assessment_with_templates.csv")
+
+  def test_streamed_data(self):
+    """Data aggregated from notification chunks matches the full load."""
+    notifications, expected = common.get_daily_notifications()
+    notif_ids, data = common.get_streamed_daily_data(chunk_size=1)
+    self.assertEqual(sorted(notif_ids), sorted(n.id for n in notifications))
+    self.assertEqual(data, expected)
+
+  @patch("ggrc.settings.DIGEST_WORKERS", new=2)
+  @patch("ggrc.notifications.common.send_email")
+  def test_sharded_sending(self, send_email):
+    """Every recipient receives a single email sent by shard workers."""
+    _, expected = common.get_daily_notifications()
+    self.assertTrue(expected)
+
+    self.client.get("/_notifications/send_daily_digest")
+
+    recipients = [call[0][0] for call in send_email.call_args_list]
+    self.assertEqual(sorted(recipients), sorted(expected))
+    self.assertEqual(DigestEmail.query.count(), 0)
+    self.assertEqual(Notification.query.filter(
+        Notification.sent_at.is_(None)
+    ).count(), 0)
+
+  @patch("ggrc.notifications.common.send_email")
+  def test_resume_unsent_shards(self, send_email):
+    """Emails stored by an interrupted job are sent once by the next job."""
+    recipients = common.create_digest_emails(workers=2)
+    self.assertEqual(DigestEmail.query.count(), len(recipients))
+    self.assertFalse(common.get_daily_notifications()[1])
+
+    common.send_daily_digest_notifications()
+
+    sent = [call[0][0] for call in send_email.call_args_list]
+    self.assertEqual(sorted(sent), recipients)
+    self.assertEqual(DigestEmail.query.count(), 0)
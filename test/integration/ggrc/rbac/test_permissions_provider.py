@@ -0,0 +1,130 @@
+# Copyright (C) 2019 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""Tests for compiled and memoized permission checks."""
+
+import flask
+import mock
+
+from ggrc.rbac.permissions_provider import DefaultUserPermissions
+from ggrc.rbac.permissions_provider import Permission
+
+from integration.ggrc import TestCase
+from integration.ggrc.models import factories
+
+
+class TestCompiledPermissions(TestCase):
+  """Tests for permission index and memoization of permission checks."""
+
+  def setUp(self):
+    super(TestCompiledPermissions, self).setUp()
+    self.addCleanup(self._clear_permissions)
+    self.user_permissions = DefaultUserPermissions()
+
+  @staticmethod
+  def _clear_permissions():
+    """Remove permissions set by the test from the request scope."""
+    for name in ("_request_permissions", "_compiled_permissions"):
+      if hasattr(flask.g, name):
+        delattr(flask.g, name)
+
+  @staticmethod
+  def _set_permissions(resources=(), contexts=()):
+    """Set read permissions for Control into the request scope."""
+    flask.g._request_permissions = {  # pylint: disable=protected-access
+        "read": {
+            "Control": {
+                "resources": set(resources),
+                "contexts": list(contexts),
+            },
+        },
+    }
+
+  def test_permission_index(self):
+    """Context and resource permissions are checked with compiled index."""
+    self._set_permissions(resources=[5], contexts=[3])
+    allowed = self.user_permissions.is_allowed_read
+    self.assertTrue(allowed("Control", 5, None))
+    self.assertTrue(allowed("Control", 6, 3))
+    self.assertFalse(allowed("Control", 6, 4))
+    self.assertFalse(allowed("Market", 5, 3))
+
+    decisions = flask.g._compiled_permissions.decisions
+    self.assertTrue(decisions[Permission("read", "Control", 5, None)])
+    self.assertFalse(decisions[Permission("read", "Control", 6, 4)])
+
+  def test_instance_check_memoized(self):
+    """Instance permission checks are evaluated once per request."""
+    control = factories.ControlFactory()
+    self._set_permissions(resources=[control.id])
+    with mock.patch.object(
+        DefaultUserPermissions,
+        "_check_instance",
+        autospec=True,
+        side_effect=DefaultUserPermissions._check_instance,
+    ) as check:
+      for _ in range(3):
+        self.assertTrue(self.user_permissions.is_allowed_read_for(control))
+      self.assertEqual(check.call_count, 1)
+
+      # Flush of any changes drops memoized instance checks
+      factories.ControlFactory()
+      self.assertTrue(self.user_permissions.is_allowed_read_for(control))
+      self.assertEqual(check.call_count, 2)
+
+  def test_permissions_reload(self):
+    """Memoized checks are dropped once permissions are replaced."""
+    control = factories.ControlFactory()
+    self._set_permissions(resources=[control.id])
+    self.assertTrue(self.user_permissions.is_allowed_read_for(control))
+
+    self._set_permissions()
+    self.assertFalse(self.user_permissions.is_allowed_read_for(control))
+
+  def test_modified_instance_not_memoized(self):
+    """Checks of modified instances are not memoized."""
+    control = factories.ControlFactory()
+    self._set_permissions(resources=[control.id])
+    control.title = "modified title"
+    self.assertTrue(self.user_permissions.is_allowed_read_for(control))
+    self.assertEqual(flask.g._compiled_permissions.instance_decisions, {})
+
+  def test_bulk_checks(self):
+    """Bulk checks match checks of single resources."""
+    self._set_permissions(resources=[5], contexts=[3])
+    decisions = self.user_permissions.is_allowed_bulk(
+        "read", [("Control", 5), ("Control", 6), ("Market", 5)])
+    self.assertEqual(decisions, {
+        ("Control", 5): True,
+        ("Control", 6): False,
+        ("Market", 5): False,
+    })
+
+  def test_bulk_instance_checks(self):
+    """Bulk instance checks load only objects with conditions."""
+    with factories.single_commit():
+      controls = [
+          factories.ControlFactory(title=title)
+          for title in ("granted", "allowed", "denied")
+      ]
+    self._set_permissions(resources=[controls[0].id])
+    flask.g._request_permissions["read"]["Control"]["conditions"] = {
+        None: [{
+            "condition": "is",
+            "terms": {"property_name": "title", "value": "allowed"},
+        }],
+    }
+    stubs = [("Control", control.id) for control in controls]
+    stubs.append(("Control", controls[-1].id + 1))
+    decisions = self.user_permissions.is_allowed_for_bulk("read", stubs)
+    self.assertEqual(decisions, {
+        stubs[0]: True,
+        stubs[1]: True,
+        stubs[2]: False,
+        stubs[3]: False,
+    })
+    for control in controls:
+      self.assertEqual(
+          decisions[("Control", control.id)],
+          self.user_permissions.is_allowed_read_for(control),
+      )
@@ -19,7 +19,9 @@ import ddt
 import mock
 
 from ggrc import db
+from ggrc.converters.base import ExportConverter
 from ggrc.models import all_models
+from ggrc.models import import_export as ie_model
 from ggrc.notifications import import_export
 
 from integration.ggrc import api_helper
@@ -304,6 +306,117 @@ class TestImportExports(TestImportExportBase):
         headers=self.headers)
     self.assert200(response)
 
+  def test_export_content_chunks(self):
+    """Test export content written in chunks matches one-piece export."""
+    user = all_models.Person.query.first()
+    with factories.single_commit():
+      control_ids = [factories.ControlFactory().id for _ in range(5)]
+    objects = [{
+        "object_name": "Control",
+        "filters": {"expression": {}},
+        "fields": "all",
+    }]
+    self.headers["X-export-view"] = "blocks"
+    expected = self.export_csv(objects).data
+
+    with mock.patch("ggrc.views.converters.check_for_previous_run"):
+      with mock.patch("ggrc.settings.EXPORT_CHUNK_SIZE", new=100):
+        response = self.client.post(
+            "/api/people/{}/exports".format(user.id),
+            data=json.dumps({
+                "objects": objects,
+                "current_time": str(datetime.now())}),
+            headers=self.headers)
+    self.assert200(response)
+
+    ie_job = all_models.ImportExport.query.get(
+        json.loads(response.data)["id"])
+    self.assertEqual(ie_job.status, "Finished")
+    self.assertEqual(ie_model.get_content(ie_job).encode("utf-8"), expected)
+    for control_id in control_ids:
+      control = all_models.Control.query.get(control_id)
+      self.assertIn(control.slug, expected)
+
+  def test_parallel_export(self):
+    """Test export built by block tasks matches serial export."""
+    user = all_models.Person.query.first()
+    with factories.single_commit():
+      for _ in range(3):
+        factories.ControlFactory()
+        factories.ProgramFactory()
+    objects = [{
+        "object_name": "Control",
+        "filters": {"expression": {}},
+        "fields": "all",
+    }, {
+        "object_name": "Program",
+        "filters": {"expression": {}},
+        "fields": ["slug", "title"],
+    }]
+    self.headers["X-export-view"] = "blocks"
+    expected = self.export_csv(objects).data
+
+    with mock.patch("ggrc.views.converters.check_for_previous_run"):
+      with mock.patch("ggrc.settings.PARALLEL_EXPORT", new=True):
+        response = self.client.post(
+            "/api/people/{}/exports".format(user.id),
+            data=json.dumps({
+                "objects": objects,
+                "current_time": str(datetime.now())}),
+            headers=self.headers)
+    self.assert200(response)
+
+    ie_job = all_models.ImportExport.query.get(
+        json.loads(response.data)["id"])
+    self.assertEqual(ie_job.status, "Finished")
+    self.assertEqual(ie_model.get_content(ie_job).encode("utf-8"), expected)
+    self.assertEqual(all_models.ExportBlock.query.count(), 0)
+    self.assertFalse(all_models.ContentChunk.query.filter(
+        all_models.ContentChunk.export_block_id.isnot(None)
+    ).count())
+
+  def test_parallel_export_failure(self):
+    """Test blocks of a failed parallel export are deleted."""
+    user = all_models.Person.query.first()
+    with factories.single_commit():
+      factories.ControlFactory()
+      factories.ProgramFactory()
+    objects = [{
+        "object_name": "Control",
+        "filters": {"expression": {}},
+        "fields": "all",
+    }, {
+        "object_name": "Program",
+        "filters": {"expression": {}},
+        "fields": ["slug", "title"],
+    }]
+    stream_csv_data = ExportConverter.stream_csv_data
+    calls = []
+
+    def fail_second_block(converter, write):
+      calls.append(converter)
+      if len(calls) == 2:
+        raise Exception("failed block")
+      stream_csv_data(converter, write)
+
+    with mock.patch("ggrc.views.converters.check_for_previous_run"), \
+        mock.patch("ggrc.settings.PARALLEL_EXPORT", new=True), \
+        mock.patch.object(ExportConverter, "stream_csv_data",
+                          new=fail_second_block):
+      response = self.client.post(
+          "/api/people/{}/exports".format(user.id),
+          data=json.dumps({
+              "objects": objects,
+              "current_time": str(datetime.now())}),
+          headers=self.headers)
+    self.assert200(response)
+
+    ie_job = all_models.ImportExport.query.get(
+        json.loads(response.data)["id"])
+    self.assertEqual(ie_job.status, "Failed")
+    self.assertEqual(all_models.ExportBlock.query.count(), 0)
+    self.assertEqual(all_models.ContentChunk.query.count(), 0)
+
   @ddt.data("Import", "Export")
   def test_download(self, job_type):
     """Test imports/exports download"""
@@ -405,6 +518,9 @@ class TestImportExports(TestImportExportBase):
           bg_task_id=bg_task.id,
           bg_operation_type=export_op_type,
       )
+      db.session.add(all_models.ExportBlock(import_export_id=ie_job.id,
+                                            block_index=0))
+    ie_id = ie_job.id
 
     with mock.patch("ggrc.settings.APPENGINE_INSTANCE", new=instance_name):
       with mock.patch("ggrc.cloud_api.task_queue.delete_task") as delete_task:
@@ -425,6 +541,9 @@ class TestImportExports(TestImportExportBase):
             bg_task.status,
             all_models.BackgroundTask.STOPPED_STATUS
         )
+    self.assertFalse(all_models.ExportBlock.query.filter_by(
+        import_export_id=ie_id
+    ).count())
 
   @ddt.data(("Not Started", True),
             ("Blocked", True),
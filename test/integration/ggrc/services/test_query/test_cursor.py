@@ -0,0 +1,83 @@
+# Copyright (C) 2019 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""Tests for cursor pagination of /query and REST collections."""
+
+import json
+
+from integration.ggrc import TestCase
+from integration.ggrc.models import factories
+from integration.ggrc.query_helper import WithQueryApi
+
+
+class TestCursorPagination(WithQueryApi, TestCase):
+  """Tests for cursor pagination."""
+
+  OBJECT_COUNT = 7
+
+  def setUp(self):
+    super(TestCursorPagination, self).setUp()
+    self.client.get("/login")
+    with factories.single_commit():
+      self.ids = [
+          factories.MarketFactory(title="Market {}".format(idx % 3)).id
+          for idx in range(self.OBJECT_COUNT)
+      ]
+
+  def _query_page(self, cursor, page_size, order_by=None):
+    """Query a page of Market ids following the cursor."""
+    query = self._make_query_dict("Market", type_="ids", order_by=order_by)
+    query["cursor"] = cursor
+    query["page_size"] = page_size
+    response = self._post(query)
+    self.assert200(response)
+    return json.loads(response.data)[0]["Market"]
+
+  def _query_all_pages(self, page_size, order_by=None):
+    """Query all pages and return all ids and totals of the pages."""
+    ids, totals = [], []
+    cursor = ""
+    while cursor is not None:
+      result = self._query_page(cursor, page_size, order_by)
+      ids.extend(result["ids"])
+      totals.append(result["total"])
+      cursor = result["next_cursor"]
+    return ids, totals
+
+  def test_query_pages(self):
+    """Pages of /query follow each other without gaps and duplicates."""
+    ids, totals = self._query_all_pages(3)
+    self.assertEqual(ids, sorted(self.ids))
+    self.assertEqual(totals, [self.OBJECT_COUNT] * 3)
+
+  def test_query_pages_order_by(self):
+    """Cursor pages keep order by non unique fields."""
+    order_by = [{"name": "title", "desc": True}]
+    ids, _ = self._query_all_pages(2, order_by)
+    expected = self._get_first_result_set(
+        self._make_query_dict("Market", type_="ids", order_by=order_by +
+                              [{"name": "id"}]),
+        "Market", "ids",
+    )
+    self.assertEqual(ids, expected)
+
+  def test_query_invalid_cursor(self):
+    """Invalid cursor is rejected."""
+    query = self._make_query_dict("Market", type_="ids")
+    query["cursor"] = "invalid"
+    query["page_size"] = 3
+    self.assert400(self._post(query))
+
+  def test_collection_pages(self):
+    """Pages of REST collection follow each other."""
+    ids = []
+    url = "/api/markets?__cursor=&__page_size=3"
+    while url:
+      response = self.client.get(url)
+      self.assert200(response)
+      collection = response.json["markets_collection"]
+      ids.extend(market["id"] for market in collection["markets"])
+      self.assertEqual(collection["paging"]["total"], self.OBJECT_COUNT)
+      url = collection["paging"].get("next")
+    self.assertEqual(sorted(ids), sorted(self.ids))
+    self.assertEqual(len(ids), self.OBJECT_COUNT)
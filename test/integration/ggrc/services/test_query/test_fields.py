@@ -0,0 +1,78 @@
+# Copyright (C) 2019 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""Tests for "fields" projection of /query "values" requests."""
+
+import json
+
+import ddt
+
+from ggrc.utils import QueryCounter
+
+from integration.ggrc import TestCase
+from integration.ggrc.models import factories
+from integration.ggrc.query_helper import WithQueryApi
+
+
+@ddt.ddt
+class TestQueryFields(WithQueryApi, TestCase):
+  """Tests for /query with the list of requested fields."""
+
+  OBJECT_COUNT = 20
+
+  def setUp(self):
+    super(TestQueryFields, self).setUp()
+    self.client.get("/login")
+
+  def _query_values(self, model_name, fields=None):
+    """Query all objects of model_name and return values and query count."""
+    query = self._make_query_dict(
+        model_name,
+        type_="values",
+        limit=[0, self.OBJECT_COUNT],
+        order_by=[{"name": "id"}],
+    )
+    if fields:
+      query["fields"] = fields
+    with QueryCounter() as counter:
+      response = self._post(query)
+      self.assert200(response)
+    return json.loads(response.data)[0][model_name], counter.get
+
+  @ddt.data(
+      ("Control", ["id", "type", "title", "slug", "status"]),
+      ("Control", ["id", "title", "access_control_list", "selfLink"]),
+      ("Control", ["id", "custom_attribute_values", "viewLink"]),
+      ("Assessment", ["id", "title", "labels", "audit"]),
+  )
+  @ddt.unpack
+  def test_fields_projection(self, model_name, fields):
+    """Projected values match the full representation of objects."""
+    factory = factories.get_model_factory(model_name)
+    with factories.single_commit():
+      for _ in range(self.OBJECT_COUNT):
+        factory()
+
+    full, full_count = self._query_values(model_name)
+    projected, projected_count = self._query_values(model_name, fields)
+
+    self.assertEqual(projected["count"], full["count"])
+    self.assertEqual(projected["total"], full["total"])
+    self.assertEqual(
+        projected["values"],
+        [{field: obj.get(field) for field in fields}
+         for obj in full["values"]],
+    )
+    self.assertLessEqual(projected_count, full_count)
+
+  def test_fields_query_count(self):
+    """Projection of plain columns does not load any relationships."""
+    with factories.single_commit():
+      for _ in range(self.OBJECT_COUNT):
+        factories.ControlFactory()
+
+    _, full_count = self._query_values("Control")
+    _, projected_count = self._query_values(
+        "Control", ["id", "title", "slug", "status"])
+
+    self.assertLess(projected_count, full_count)
@@ -5,7 +5,10 @@
 
 import ddt
 
+from ggrc import db
 from ggrc.models import all_models
+from ggrc.query import custom_operators
+from ggrc.utils import QueryCounter
 
 from integration.ggrc import TestCase
 from integration.ggrc.query_helper import WithQueryApi
@@ -128,3 +131,67 @@ class TestRelevant(TestCase, WithQueryApi):
     self.assertIn(evidence1_id, ids)
     self.assertIn(evidence2_id, ids)
     self.assertNotIn(evidence3_id, ids)
+
+  def test_relevant_subquery(self):
+    """Relevant filter is evaluated by the database in a single query."""
+    with factories.single_commit():
+      program = factories.ProgramFactory()
+      market_ids = []
+      for _ in range(3):
+        market = factories.MarketFactory()
+        factories.RelationshipFactory(source=program, destination=market)
+        market_ids.append(market.id)
+      factories.MarketFactory()
+    program_id = program.id
+
+    with QueryCounter() as counter:
+      clause = custom_operators.build_expression(
+          {
+              "object_name": "Program",
+              "op": {"name": "relevant"},
+              "ids": [program_id],
+          },
+          all_models.Market,
+          all_models.Market,
+          [],
+      )
+      self.assertEqual(counter.get, 0)
+    ids = [row.id for row in
+           db.session.query(all_models.Market.id).filter(clause)]
+    self.assertEqual(sorted(ids), sorted(market_ids))
+
+  def test_relevant_subquery_memoized(self):
+    """Relevant filter of the same objects is built once per request."""
+    program_id = factories.ProgramFactory().id
+    clause = custom_operators.build_expression(
+        {
+            "object_name": "Program",
+            "op": {"name": "relevant"},
+            "ids": [program_id],
+        },
+        all_models.Market,
+        all_models.Market,
+        [],
+    )
+    previous_clause = custom_operators.build_expression(
+        {
+            "object_name": "__previous__",
+            "op": {"name": "relevant"},
+            "ids": [0],
+        },
+        all_models.Market,
+        all_models.Market,
+        [{"object_name": "Program", "ids": [program_id]}],
+    )
+    other_clause = custom_operators.build_expression(
+        {
+            "object_name": "Program",
+            "op": {"name": "relevant"},
+            "ids": [program_id],
+        },
+        all_models.Facility,
+        all_models.Facility,
+        [],
+    )
+    self.assertIs(previous_clause, clause)
+    self.assertIsNot(other_clause, clause)
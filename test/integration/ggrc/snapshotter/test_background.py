@@ -0,0 +1,161 @@
+# Copyright (C) 2019 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""Tests for background creation of large snapshot scopes."""
+
+import mock
+
+from ggrc import db
+from ggrc import views
+from ggrc.app import app
+import ggrc.models as models
+from ggrc.snapshotter import background
+from ggrc.snapshotter.datastructures import Stub
+
+from integration.ggrc.snapshotter import SnapshotterBaseTestCase
+
+
+class TestBackgroundScope(SnapshotterBaseTestCase):
+  """Test chunked snapshot scope creation."""
+
+  CONTROL_COUNT = 3
+
+  def setUp(self):
+    super(TestBackgroundScope, self).setUp()
+    self.program = self.create_object(models.Program, {
+        "title": "Test Program Snapshot 1",
+    })
+    self.control_ids = []
+    for idx in range(self.CONTROL_COUNT):
+      control = self.create_object(models.Control, {
+          "title": "Test Control Snapshot {}".format(idx),
+      })
+      self.create_mapping(self.program, control)
+      self.control_ids.append(control.id)
+    self.program = self.refresh_object(self.program)
+
+  @staticmethod
+  def _audit_snapshot_rels(audit_id):
+    return models.Relationship.query.filter(
+        models.Relationship.source_type == "Audit",
+        models.Relationship.source_id == audit_id,
+        models.Relationship.destination_type == "Snapshot",
+    ).count()
+
+  @staticmethod
+  def _snapshotted_ids(audit_id):
+    return sorted(
+        child_id for child_id, in db.session.query(
+            models.Snapshot.child_id
+        ).filter(
+            models.Snapshot.parent_type == "Audit",
+            models.Snapshot.parent_id == audit_id,
+        )
+    )
+
+  @mock.patch("ggrc.settings.SNAPSHOT_SCOPE_CHUNK_SIZE", new=1)
+  @mock.patch("ggrc.settings.SNAPSHOT_SCOPE_BACKGROUND_THRESHOLD", new=1)
+  def test_audit_scope_in_background(self):
+    """Large audit scope is created by a background task in chunks."""
+    audit = self.create_audit(self.program)
+    self.assertEqual(self._snapshotted_ids(audit.id), self.control_ids)
+
+    operation = models.BackgroundOperation.query.filter_by(
+        object_type="Audit", object_id=audit.id,
+    ).one()
+    self.assertEqual(operation.bg_task.status, "Success")
+    self.assertEqual(operation.checkpoint["done"], self.CONTROL_COUNT)
+    self.assertEqual(operation.checkpoint["total"], self.CONTROL_COUNT)
+
+    audit_snapshot_rels = models.Relationship.query.filter(
+        models.Relationship.source_type == "Audit",
+        models.Relationship.source_id == audit.id,
+        models.Relationship.destination_type == "Snapshot",
+    ).count()
+    self.assertEqual(audit_snapshot_rels, self.CONTROL_COUNT)
+
+    response = self.client.get(
+        "/background_task_status/audit/{}".format(audit.id))
+    self.assert200(response)
+    self.assertEqual(response.json["progress"]["done"], self.CONTROL_COUNT)
+
+  def test_small_scope_is_synchronous(self):
+    """Scope below the threshold does not start a background task."""
+    audit = self.create_audit(self.program)
+    self.assertEqual(self._snapshotted_ids(audit.id), self.control_ids)
+    self.assertFalse(models.BackgroundOperation.query.filter_by(
+        object_type="Audit", object_id=audit.id,
+    ).count())
+
+  def test_resume_from_checkpoint(self):
+    """Creation continues after the checkpoint and skips existing pairs."""
+    with mock.patch("ggrc.settings.SNAPSHOT_SCOPE_BACKGROUND_THRESHOLD",
+                    new=0):
+      audit = self.create_audit(self.program)
+    first, second, third = self.control_ids
+    models.Snapshot.query.filter(
+        models.Snapshot.parent_id == audit.id,
+        models.Snapshot.child_id.in_([first, third]),
+    ).delete(synchronize_session=False)
+    db.session.commit()
+
+    operation = mock.MagicMock(checkpoint={
+        "child_type": "Control",
+        "last_id": second,
+        "done": 2,
+        "total": self.CONTROL_COUNT,
+    })
+    event = models.Event(action="BULK")
+    db.session.add(event)
+    db.session.commit()
+    background.create_scope(Stub("Audit", audit.id), event, operation,
+                            chunk_size=1)
+
+    self.assertEqual(self._snapshotted_ids(audit.id), [second, third])
+    self.assertEqual(operation.checkpoint["last_id"], third)
+    self.assertEqual(operation.checkpoint["done"], self.CONTROL_COUNT)
+
+  @mock.patch("ggrc.settings.SNAPSHOT_SCOPE_CHUNK_SIZE", new=1)
+  @mock.patch("ggrc.settings.SNAPSHOT_SCOPE_BACKGROUND_THRESHOLD", new=1)
+  def test_failed_task_retried(self):
+    """Failed task keeps committed chunks and continues on retry."""
+    # pylint: disable=protected-access
+    save_checkpoint = background._save_checkpoint
+    calls = []
+
+    def fail_second_chunk(*args):
+      calls.append(args)
+      if len(calls) == 2:
+        raise Exception("failed chunk")
+      save_checkpoint(*args)
+
+    with mock.patch("ggrc.snapshotter.background._save_checkpoint",
+                    side_effect=fail_second_chunk):
+      audit = self.create_audit(self.program)
+    audit_id = audit.id
+    self.assertEqual(self._snapshotted_ids(audit_id), self.control_ids[:1])
+    self.assertEqual(self._audit_snapshot_rels(audit_id), 1)
+    task = models.BackgroundOperation.query.filter_by(
+        object_type="Audit", object_id=audit_id,
+    ).one().bg_task
+    self.assertEqual(task.status, "Failure")
+
+    retry_headers = {"X-Appengine-Taskretrycount": "0"}
+    with mock.patch("ggrc.settings.APP_ENGINE", new=True, create=True):
+      with mock.patch("ggrc.snapshotter.background._save_checkpoint",
+                      side_effect=Exception("failed chunk")):
+        with app.test_request_context(headers=retry_headers):
+          response = views.create_snapshots_scope(task)
+      self.assertEqual(response.status_code, 503)
+
+      with app.test_request_context(headers=retry_headers):
+        response = views.create_snapshots_scope(task)
+      self.assert200(response)
+
+    self.assertEqual(self._snapshotted_ids(audit_id), self.control_ids)
+    self.assertEqual(self._audit_snapshot_rels(audit_id), self.CONTROL_COUNT)
+    operation = models.BackgroundOperation.query.filter_by(
+        object_type="Audit", object_id=audit_id,
+    ).one()
+    self.assertEqual(operation.bg_task.status, "Success")
+    self.assertEqual(operation.checkpoint["done"], self.CONTROL_COUNT)
@@ -0,0 +1,110 @@
+# Copyright (C) 2019 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""Tests for outdated snapshots detection and bulk update."""
+
+import mock
+
+import ggrc.models as models
+from ggrc.snapshotter import helpers
+from ggrc.snapshotter.datastructures import Pair
+from ggrc.snapshotter.datastructures import Stub
+
+from integration.ggrc.snapshotter import SnapshotterBaseTestCase
+
+
+class TestOutdatedSnapshots(SnapshotterBaseTestCase):
+  """Test outdated snapshots API."""
+
+  def setUp(self):
+    super(TestOutdatedSnapshots, self).setUp()
+    self.client.get("/login")
+    program = self.create_object(models.Program, {
+        "title": "Test Program Snapshot 1",
+    })
+    self.controls = []
+    for idx in range(3):
+      control = self.create_object(models.Control, {
+          "title": "Test Control Snapshot {}".format(idx),
+      })
+      self.create_mapping(program, control)
+      self.controls.append(control)
+    program = self.refresh_object(program)
+    self.audit = self.create_audit(program)
+    self.url = "/api/audits/{}/outdated_snapshots".format(self.audit.id)
+
+  def _get_snapshot(self, control):
+    return models.Snapshot.query.filter_by(
+        parent_id=self.audit.id,
+        child_type="Control",
+        child_id=control.id,
+    ).one()
+
+  def test_outdated_snapshots(self):
+    """Modified and deleted originals are reported by a single query."""
+    modified, deleted, _ = self.controls
+    self.api.modify_object(self.refresh_object(modified), {
+        "title": "Test Control Snapshot EDIT",
+    })
+    self.api.delete(self.refresh_object(deleted))
+
+    pairs = helpers.get_outdated_pairs({Stub("Audit", self.audit.id)})
+    self.assertEqual(pairs, {
+        Pair(Stub("Audit", self.audit.id), Stub("Control", control.id))
+        for control in self.controls[:2]
+    })
+
+    response = self.client.get(self.url)
+    self.assert200(response)
+    modified_snapshot = self._get_snapshot(modified)
+    deleted_snapshot = self._get_snapshot(deleted)
+    self.assertEqual(response.json, {
+        "count": 1,
+        "ids": [modified_snapshot.id],
+        "deleted_ids": [deleted_snapshot.id],
+    })
+    self.assertFalse(modified_snapshot.is_latest_revision)
+    self.assertTrue(deleted_snapshot.original_object_deleted)
+    self.assertTrue(self._get_snapshot(self.controls[2]).is_latest_revision)
+
+  def test_update_outdated_snapshots(self):
+    """Bulk update points only outdated snapshots to latest revisions."""
+    modified, _, unchanged = self.controls
+    self.api.modify_object(self.refresh_object(modified), {
+        "title": "Test Control Snapshot EDIT",
+    })
+    unchanged_revision_id = self._get_snapshot(unchanged).revision_id
+
+    response = self.client.put(self.url)
+    self.assert200(response)
+    self.assertEqual(response.json, {"count": 1})
+
+    self.assertEqual(self.client.get(self.url).json["count"], 0)
+    snapshot = self._get_snapshot(modified)
+    self.assertTrue(snapshot.is_latest_revision)
+    self.assertEqual(snapshot.revision.content["title"],
+                     "Test Control Snapshot EDIT")
+    self.assertEqual(self._get_snapshot(unchanged).revision_id,
+                     unchanged_revision_id)
+
+  @mock.patch("ggrc.snapshotter.indexer.reindex_pairs_bg")
+  def test_update_skips_deleted(self, reindex_pairs_bg):
+    """Snapshots of deleted originals are not counted or reindexed."""
+    modified, deleted, _ = self.controls
+    self.api.modify_object(self.refresh_object(modified), {
+        "title": "Test Control Snapshot EDIT",
+    })
+    self.api.delete(self.refresh_object(deleted))
+    reindex_pairs_bg.reset_mock()
+
+    response = self.client.put(self.url)
+    self.assert200(response)
+    self.assertEqual(response.json, {"count": 1})
+    reindex_pairs_bg.assert_called_once_with({
+        Pair(Stub("Audit", self.audit.id), Stub("Control", modified.id)),
+    })
+
+  def test_update_not_found(self):
+    """Bulk update of a missing audit returns 404."""
+    response = self.client.put("/api/audits/0/outdated_snapshots")
+    self.assert404(response)
@@ -0,0 +1,62 @@
+# Copyright (C) 2019 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""Tests for cached maintenance mode state."""
+
+import mock
+
+from ggrc import db
+from ggrc import settings
+from ggrc.models.maintenance import Maintenance
+from ggrc.utils import maintenance_state
+
+from integration.ggrc import TestCase
+
+
+@mock.patch.object(settings, "MAINTENANCE_CACHE_TTL", 60)
+class TestMaintenanceState(TestCase):
+  """Tests for maintenance mode check before requests."""
+
+  def setUp(self):
+    super(TestMaintenanceState, self).setUp()
+    self.addCleanup(maintenance_state.invalidate)
+    maintenance_state.invalidate()
+    self.client.get("/login")
+
+  @staticmethod
+  def _set_maintenance(under_maintenance):
+    """Set maintenance flag directly in the database."""
+    db_row = db.session.query(Maintenance).get(1)
+    if db_row is None:
+      db_row = Maintenance(id=1)
+      db.session.add(db_row)
+    db_row.under_maintenance = under_maintenance
+    db.session.commit()
+
+  def _assert_maintenance(self, under_maintenance):
+    """Check if requests are redirected to the maintenance page."""
+    response = self.client.get("/dashboard")
+    if under_maintenance:
+      self.assertEqual(response.status_code, 302)
+      self.assertTrue(response.location.endswith("/maintenance_"))
+    else:
+      self.assert200(response)
+
+  def test_state_cached(self):
+    """Maintenance flag is not read from the database on every request."""
+    self._set_maintenance(True)
+    self._assert_maintenance(True)
+
+    self._set_maintenance(False)
+    self._assert_maintenance(True)
+
+    maintenance_state.invalidate()
+    self._assert_maintenance(False)
+
+  def test_cache_disabled(self):
+    """Maintenance flag is read on every request if the TTL is 0."""
+    with mock.patch.object(settings, "MAINTENANCE_CACHE_TTL", 0):
+      self._set_maintenance(True)
+      self._assert_maintenance(True)
+      self._set_maintenance(False)
+      self._assert_maintenance(False)
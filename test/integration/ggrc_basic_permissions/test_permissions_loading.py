@@ -6,6 +6,7 @@ import mock
 
 from appengine import base
 
+from ggrc import db
 from ggrc.models import all_models
 from ggrc.cache import utils as cache_utils
 from integration.ggrc import TestCase, generator
@@ -73,8 +74,8 @@ class TestPermissionsCacheFlushing(TestMemcacheBase):
     """
 
     with mock.patch(
-        'ggrc_basic_permissions._load_permissions_from_database',
-        return_value=new_perms
+        'ggrc_basic_permissions._load_segments_from_database',
+        return_value={"user_roles": new_perms},
     ):
 
       mock_user = mock.Mock()
@@ -96,8 +97,11 @@ class TestPermissionsCacheFlushing(TestMemcacheBase):
     client = cache_utils.get_cache_manager().cache_object.memcache_client
     client.flush_all()
 
+    perms_a = {"read": {"Control": {"contexts": [1]}}}
+    perms_b = {"read": {"Control": {"contexts": [2]}}}
+
     # load perms and store them in memcache
-    self.load_perms(11, {"11": "a"})
+    self.load_perms(11, perms_a)
 
     # emulate situation when a new object is created
     # this procedure cleans memcache in the end
@@ -110,7 +114,111 @@ class TestPermissionsCacheFlushing(TestMemcacheBase):
     # this step is omitted
 
     # load permission on behalf of worker #2, before step 2 of worker #1
-    result = self.load_perms(11, {"11": "b"})
+    result = self.load_perms(11, perms_b)
 
     # ensure that new permissions were returned instead of old ones
-    self.assertEquals(result, {"11": "b"})
+    self.assertEquals(result, perms_b)
+
+
+class TestPermissionSegments(TestMemcacheBase):
+  """Test segmented permissions cache."""
+
+  SEGMENTS = {
+      "user_roles": {"read": {"Program": {"contexts": [5]}}},
+      "acl:Control": {"read": {"Control": {"resources": {1, 2}}}},
+      "acl:Market": {"update": {"Market": {"resources": {3}}}},
+  }
+
+  def setUp(self):
+    super(TestPermissionSegments, self).setUp()
+    self.client = cache_utils.get_cache_manager().cache_object.memcache_client
+    self.client.flush_all()
+    self.user = mock.Mock(id=12)
+
+  def _load(self):
+    """Load permissions with stubbed segment loading."""
+    def load_segments(_, segments=None):
+      if segments is None:
+        segments = self.SEGMENTS.keys()
+      return {name: self.SEGMENTS.get(name, {}) for name in segments}
+
+    with mock.patch(
+        "ggrc_basic_permissions._load_segments_from_database",
+        side_effect=load_segments,
+    ) as load:
+      permissions = ggrc_basic_permissions.load_permissions_for(self.user)
+    return permissions, load
+
+  def test_segment_invalidation(self):
+    """Only dropped segments are loaded from the database."""
+    expected, load = self._load()
+    self.assertEqual(expected, {
+        "read": {
+            "Program": {"contexts": [5]},
+            "Control": {"resources": {1, 2}},
+        },
+        "update": {"Market": {"resources": {3}}},
+    })
+    load.assert_called_once_with(self.user, None)
+
+    permissions, load = self._load()
+    self.assertEqual(permissions, expected)
+    load.assert_not_called()
+
+    cache_utils.clear_permission_segments({self.user.id: {"acl:Control"}})
+    permissions, load = self._load()
+    self.assertEqual(permissions, expected)
+    load.assert_called_once_with(self.user, ["acl:Control"])
+
+  def test_new_segment_invalidation(self):
+    """Segment dropped before it has been cached is loaded as well."""
+    self._load()
+    cache_utils.clear_permission_segments({self.user.id: {"acl:Audit"}})
+    _, load = self._load()
+    load.assert_called_once_with(self.user, ["acl:Audit"])
+
+  def test_cache_metrics(self):
+    """Cache hits, misses and rebuilds are counted."""
+    self._load()
+    self._load()
+    self._load()
+    metrics = ggrc_basic_permissions.get_cache_metrics()
+    self.assertEqual(metrics["hits"], 6)
+    self.assertEqual(metrics["misses"], 3)
+    self.assertEqual(metrics["rebuilds"], 1)
+
+
+class TestPropagatedPermissionsInvalidation(TestMemcacheBase):
+  """Test dropping of cached permissions removed with raw SQL."""
+
+  def setUp(self):
+    super(TestPropagatedPermissionsInvalidation, self).setUp()
+    self.api = Api()
+    client = cache_utils.get_cache_manager().cache_object.memcache_client
+    client.flush_all()
+    _, self.reader = generator.ObjectGenerator().generate_person(
+        user_role="Creator")
+    role = all_models.AccessControlRole.query.filter_by(
+        object_type="Program",
+        name="Program Readers",
+    ).one()
+    with factories.single_commit():
+      audit = factories.AuditFactory()
+      relationship = factories.RelationshipFactory(
+          source=audit.program,
+          destination=audit,
+      )
+      audit.program.add_person_with_role(self.reader, role)
+    self.audit_id = audit.id
+    self.relationship_id = relationship.id
+
+  def test_unmap_program_from_audit(self):
+    """Propagated reader loses access to an unmapped audit right away."""
+    self.api.set_user(self.reader)
+    self.assert200(self.api.get(all_models.Audit, self.audit_id))
+
+    db.session.delete(
+        all_models.Relationship.query.get(self.relationship_id))
+    db.session.commit()
+
+    self.assert403(self.api.get(all_models.Audit, self.audit_id))
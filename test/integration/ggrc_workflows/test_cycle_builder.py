@@ -0,0 +1,179 @@
+# Copyright (C) 2019 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""Tests for bulk building of recurring cycles."""
+
+import datetime
+
+import mock
+import sqlalchemy as sa
+from freezegun import freeze_time
+
+from ggrc import db
+from ggrc import models
+from ggrc.utils import QueryCounter
+from ggrc.utils.log_event import log_event
+from ggrc_workflows import build_cycle, notification
+from ggrc_workflows import cycle_builder
+from ggrc_workflows import start_recurring_cycles, models as wf_models
+from integration.ggrc import TestCase
+from integration.ggrc.models import factories
+from integration.ggrc_workflows import WorkflowsGenerator
+
+
+def generate_workflows(count, task_count=1, object_count=2):
+  """Generate active weekly workflows and return their ids."""
+  wf_generator = WorkflowsGenerator()
+  workflow_ids = []
+  with freeze_time("2018-01-17"):
+    for _ in range(count):
+      _, workflow = wf_generator.generate_workflow(data={
+          "unit": "week",
+          "repeat_every": 1,
+      })
+      _, task_group = wf_generator.generate_task_group(workflow=workflow)
+      for _ in range(task_count):
+        wf_generator.generate_task_group_task(task_group=task_group, data={
+            "start_date": "2018-01-17",
+            "end_date": "2018-01-17",
+        })
+      for _ in range(object_count):
+        wf_generator.generate_task_group_object(
+            task_group=task_group, obj=factories.MarketFactory())
+      wf_generator.activate_workflow(workflow)
+      workflow_ids.append(workflow.id)
+  return workflow_ids
+
+
+class TestBulkCycleBuilder(TestCase):
+  """Cycles built by the cron job match cycles started through the API."""
+
+  WORKFLOW_COUNT = 2
+
+  def setUp(self):
+    super(TestBulkCycleBuilder, self).setUp()
+    self.workflow_ids = generate_workflows(self.WORKFLOW_COUNT)
+
+  @staticmethod
+  def _cycle_tree(cycle):
+    """Date independent representation of a cycle tree."""
+    tasks = []
+    for task in cycle.cycle_task_group_object_tasks:
+      tasks.append((
+          task.cycle_task_group.title,
+          task.title,
+          task.status,
+          sorted((acl.ac_role.name, person.id)
+                 for person, acl in task.access_control_list),
+          sorted((rel.destination_type, rel.destination_id)
+                 for rel in task.related_destinations),
+      ))
+    return (cycle.title, cycle.status, sorted(tasks))
+
+  def test_recurring_cycles(self):
+    """Cron job builds cycles equal to cycles built through the API."""
+    with freeze_time("2018-01-24"):
+      start_recurring_cycles()
+
+    for workflow_id in self.workflow_ids:
+      cycles = wf_models.Cycle.query.filter_by(
+          workflow_id=workflow_id,
+      ).order_by(wf_models.Cycle.id).all()
+      self.assertEqual(len(cycles), 2)
+      api_cycle, cron_cycle = cycles
+      self.assertEqual(self._cycle_tree(cron_cycle),
+                       self._cycle_tree(api_cycle))
+
+  def test_relationship_revisions(self):
+    """Relationships inserted by the cron job have revisions."""
+    with freeze_time("2018-01-24"):
+      start_recurring_cycles()
+
+    event = models.Event.query.filter_by(action="BULK").one()
+    rel_ids = {rel_id for rel_id, in db.session.query(
+        models.Revision.resource_id
+    ).filter(
+        models.Revision.event_id == event.id,
+        models.Revision.resource_type == "Relationship",
+        models.Revision.destination_type == "Market",
+    )}
+    expected = {rel_id for rel_id, in db.session.query(
+        models.Relationship.id
+    ).join(
+        wf_models.CycleTaskGroupObjectTask,
+        wf_models.CycleTaskGroupObjectTask.id ==
+        models.Relationship.source_id,
+    ).join(
+        wf_models.Cycle,
+        wf_models.Cycle.id ==
+        wf_models.CycleTaskGroupObjectTask.cycle_id,
+    ).filter(
+        models.Relationship.source_type == "CycleTaskGroupObjectTask",
+        models.Relationship.destination_type == "Market",
+        wf_models.Cycle.created_at >= "2018-01-24",
+    )}
+    self.assertEqual(len(expected), 2 * self.WORKFLOW_COUNT)
+    self.assertEqual(rel_ids, expected)
+    latest = models.LatestRevision.query.filter(
+        models.LatestRevision.resource_type == "Relationship",
+        models.LatestRevision.resource_id.in_(expected),
+    ).count()
+    self.assertEqual(latest, len(expected))
+
+  def test_failed_workflow(self):
+    """Workflow failing to start a cycle doesn't affect other workflows."""
+    failed_id = self.workflow_ids[0]
+    # pylint: disable=protected-access
+    insert_rows = cycle_builder._insert_rows
+
+    def failing_insert_rows(model, rows):
+      if any(getattr(row, "workflow_id", None) == failed_id for row in rows):
+        raise sa.exc.SQLAlchemyError("Insert has failed")
+      insert_rows(model, rows)
+
+    with freeze_time("2018-01-24"):
+      with mock.patch.object(cycle_builder, "_insert_rows",
+                             failing_insert_rows):
+        start_recurring_cycles()
+
+    for workflow_id in self.workflow_ids:
+      cycles_count = wf_models.Cycle.query.filter_by(
+          workflow_id=workflow_id,
+      ).count()
+      self.assertEqual(cycles_count, 1 if workflow_id == failed_id else 2)
+    failed_workflow = wf_models.Workflow.query.get(failed_id)
+    self.assertEqual(failed_workflow.next_cycle_start_date,
+                     datetime.date(2018, 1, 24))
+
+
+class TestBulkCycleBuilderQueries(TestCase):
+  """Query count of the cron job compared to building cycles one by one."""
+
+  WORKFLOW_COUNT = 4
+
+  def setUp(self):
+    super(TestBulkCycleBuilderQueries, self).setUp()
+    self.workflow_ids = generate_workflows(
+        2 * self.WORKFLOW_COUNT, task_count=3, object_count=3)
+
+  def test_query_count(self):
+    """Cron job needs fewer queries than build_cycle for the same cycles."""
+    with freeze_time("2018-01-24"):
+      with QueryCounter() as counter:
+        for workflow in wf_models.Workflow.query.filter(
+            wf_models.Workflow.id.in_(self.workflow_ids[:self.WORKFLOW_COUNT])
+        ):
+          cycle = build_cycle(workflow)
+          db.session.add(cycle)
+          notification.handle_cycle_created(cycle, False)
+          notification.handle_workflow_modify(None, workflow)
+          log_event(db.session)
+          db.session.commit()
+        build_cycle_count = counter.get
+
+      with QueryCounter() as counter:
+        start_recurring_cycles()
+        bulk_count = counter.get
+
+    self.assertEqual(wf_models.Cycle.query.count(), 4 * self.WORKFLOW_COUNT)
+    self.assertLess(bulk_count, build_cycle_count)
@@ -0,0 +1,90 @@
+# Copyright (C) 2019 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""Test batched REST resource cache"""
+
+from unittest import TestCase
+
+import mock
+
+from appengine import base
+from ggrc.cache import resource_cache
+
+
+class TestLRUCache(TestCase):
+  """Test per-process LRU cache"""
+
+  def test_eviction(self):
+    """Least recently used keys are evicted"""
+    cache = resource_cache.LRUCache(2, 10)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    self.assertEqual(cache.get("a"), 1)
+    self.assertIsNone(cache.get("b"))
+    self.assertEqual(cache.get("c"), 3)
+
+  def test_expiration(self):
+    """Expired keys are not returned"""
+    cache = resource_cache.LRUCache(2, 10)
+    with mock.patch("time.time", return_value=100):
+      cache.set("a", 1)
+    with mock.patch("time.time", return_value=109):
+      self.assertEqual(cache.get("a"), 1)
+    with mock.patch("time.time", return_value=110):
+      self.assertIsNone(cache.get("a"))
+
+
+@base.with_memcache
+class TestResourceCache(TestCase):
+  """Test batched resource cache access"""
+
+  def test_get_multi(self):
+    """Resources are read with a single call, DeleteOp keys are blocked"""
+    self.memcache_client.set_multi({
+        "collection:markets:1": "market 1",
+        "collection:markets:2": "market 2",
+        "DeleteOp:collection:markets:2": "InProgress",
+    })
+    cache = resource_cache.ResourceCache(self.memcache_client)
+    with mock.patch.object(self.memcache_client, "get_multi",
+                           wraps=self.memcache_client.get_multi) as get_multi:
+      values, blocked = cache.get_multi([
+          "collection:markets:1",
+          "collection:markets:2",
+          "collection:markets:3",
+      ])
+    get_multi.assert_called_once()
+    self.assertEqual(values, {"collection:markets:1": "market 1"})
+    self.assertEqual(blocked, {"collection:markets:2"})
+    self.assertEqual((cache.hits, cache.misses, cache.keys), (1, 2, 3))
+
+  @mock.patch("ggrc.cache.resource_cache._L1_CACHE",
+              resource_cache.LRUCache(10, 10))
+  def test_get_multi_l1_blocked(self):
+    """Resources in the per-process cache are blocked by DeleteOp keys"""
+    self.memcache_client.set("collection:markets:1", "market 1")
+    cache = resource_cache.ResourceCache(self.memcache_client)
+    values, _ = cache.get_multi(["collection:markets:1"])
+    self.assertEqual(values, {"collection:markets:1": "market 1"})
+
+    self.memcache_client.set("DeleteOp:collection:markets:1", "InProgress")
+    values, blocked = cache.get_multi(["collection:markets:1"])
+    self.assertEqual(values, {})
+    self.assertEqual(blocked, {"collection:markets:1"})
+    self.assertIsNone(
+        resource_cache._L1_CACHE.get(  # pylint: disable=protected-access
+            "collection:markets:1"))
+
+  def test_add_multi(self):
+    """Resources are added without overwriting cached values"""
+    self.memcache_client.set("collection:markets:1", "cached")
+    cache = resource_cache.ResourceCache(self.memcache_client)
+    cache.add_multi({
+        "collection:markets:1": "new",
+        "collection:markets:2": "new",
+    })
+    self.assertEqual(self.memcache_client.get("collection:markets:1"),
+                     "cached")
+    self.assertEqual(self.memcache_client.get("collection:markets:2"), "new")
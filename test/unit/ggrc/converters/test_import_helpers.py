@@ -185,3 +185,78 @@ class TestModelColumntHandler(unittest.TestCase):
       self.assertEqual(
           {"col_a": test_custom_handler, "col_b": test_handler},
           model_column_handlers(test_custom_class))
+
+
+class TestCsvStreamBuilder(unittest.TestCase):
+  """Tests for streaming csv builder."""
+
+  LINES = [
+      [u"Object type", u"Code", u"Title"],
+      [u"", u"CONTROL-1", u"Control \u0441\u0438\u043c"],
+      [u"", u"CONTROL-2"],
+      [],
+  ]
+
+  def _build_string(self):
+    """Build csv with the regular string builder."""
+    builder = import_helper.CsvStringBuilder(3)
+    for line in self.LINES:
+      builder.append_line(list(line))
+    return builder.get_csv_string()
+
+  def test_stream_equals_string(self):
+    """Streamed chunks join into the same csv as built in memory."""
+    chunks = []
+    builder = import_helper.CsvStreamBuilder(3, chunks.append, chunk_size=10)
+    for line in self.LINES:
+      builder.append_line(list(line))
+    builder.flush()
+
+    self.assertGreater(len(chunks), 1)
+    self.assertEqual("".join(chunks), self._build_string())
+
+  def test_buffer_is_bounded(self):
+    """Buffer is flushed as soon as it reaches chunk size."""
+    chunks = []
+    builder = import_helper.CsvStreamBuilder(3, chunks.append, chunk_size=10)
+    for line in self.LINES:
+      builder.append_line(list(line))
+      self.assertLess(builder.output_buffer.tell(), 10)
+
+  def test_empty_flush(self):
+    """Flush of an empty buffer does not call the sink."""
+    sink = mock.MagicMock()
+    builder = import_helper.CsvStreamBuilder(3, sink, chunk_size=10)
+    builder.flush()
+    sink.assert_not_called()
+
+
+class TestPadCsvChunks(unittest.TestCase):
+  """Tests for padding of csv data given in chunks."""
+
+  def test_pad_chunks(self):
+    """Padded chunks match csv built with the wider table."""
+    lines = [
+        [u"Object type", u"Code"],
+        [u"", u"multi\nline \u0441\u0438\u043c, value"],
+        [],
+    ]
+    narrow = import_helper.CsvStringBuilder(2)
+    wide = import_helper.CsvStringBuilder(4)
+    for line in lines:
+      narrow.append_line(list(line))
+      wide.append_line(list(line))
+    data = narrow.get_csv_string()
+    chunks = [data[i:i + 7] for i in range(0, len(data), 7)]
+
+    result = []
+    import_helper.pad_csv_chunks(chunks, 4, result.append)
+    self.assertEqual("".join(result), wide.get_csv_string())
+
+  def test_iter_csv_lines(self):
+    """Lines split across chunks are joined back."""
+    chunks = ["a,b\r", "\nc,", "d\r\n", "e"]
+    self.assertEqual(
+        list(import_helper.iter_csv_lines(chunks)),
+        ["a,b\r\n", "c,d\r\n", "e"],
+    )
@@ -60,3 +60,52 @@ class TestQueryHelper(unittest.TestCase):
 
     for expected_result, expression in expressions:
       self.assertEqual(expected_result, helper._expression_keys(expression))
+
+  @staticmethod
+  def _previous_query(object_name, index):
+    """Make object query relevant to the object query with given index."""
+    return {
+        "object_name": object_name,
+        "filters": {"expression": {
+            "object_name": "__previous__",
+            "op": {"name": "relevant"},
+            "ids": [str(index)],
+        }},
+    }
+
+  def test_evaluation_order(self):
+    """Referenced object queries are evaluated first."""
+    # pylint: disable=protected-access
+    query = [
+        self._previous_query("Control", 2),
+        self._previous_query("Audit", 2),
+        {"object_name": "Program", "filters": {"expression": {}}},
+    ]
+    helper = builder.QueryHelper(query)
+    self.assertEqual(helper._get_evaluation_order(),
+                     [query[2], query[0], query[1]])
+
+  def test_circular_reference(self):
+    """Circular __previous__ references are rejected."""
+    # pylint: disable=protected-access
+    helper = builder.QueryHelper([
+        self._previous_query("Control", 1),
+        self._previous_query("Audit", 0),
+    ])
+    with self.assertRaises(builder.BadQueryException):
+      helper._get_evaluation_order()
+
+  def test_shared_results(self):
+    """Object queries with the same filters are evaluated once."""
+    # pylint: disable=protected-access
+    query = [
+        {"object_name": "Control", "type": "ids", "filters": {}},
+        {"object_name": "Control", "type": "count", "filters": {}},
+        {"object_name": "Audit", "type": "ids", "filters": {}},
+    ]
+    helper = builder.QueryHelper(query)
+    with mock.patch.object(helper, "_query_ids",
+                           return_value=[1, 2]) as query_ids:
+      for object_query in query:
+        self.assertEqual(helper._get_ids(object_query), [1, 2])
+    self.assertEqual(query_ids.call_count, 2)